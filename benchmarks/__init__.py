@@ -0,0 +1 @@
+"""Gas benchmarks for the protocol entry points (see `benchmarks.gas`)."""
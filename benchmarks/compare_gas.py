@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Compare two gas reports written by `benchmarks.gas`.
+
+A measurement regresses when its gas grows by more than both `--threshold-pct`
+percent and `--threshold-gas` units. The exit status is 1 if anything
+regressed, so the script can gate CI.
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+KEY = ("market", "function", "n_bands", "skipped_bands")
+
+
+def load_report(path: Path) -> dict[tuple, int]:
+    rows = json.loads(path.read_text())
+    return {tuple(row[k] for k in KEY): row["gas"] for row in rows}
+
+
+def format_key(key: tuple) -> str:
+    market, function, n_bands, skipped_bands = key
+    return f"| {market} | {function} | {n_bands} | {skipped_bands} "
+
+
+def build_report(
+    base: dict[tuple, int],
+    head: dict[tuple, int],
+    threshold_pct: float,
+    threshold_gas: int,
+) -> tuple[str, int]:
+    regressions = 0
+    changed = []
+    for key in sorted(set(base) | set(head)):
+        if key not in head:
+            changed.append(format_key(key) + f"| {base[key]} | - | - | removed |")
+            continue
+        if key not in base:
+            changed.append(format_key(key) + f"| - | {head[key]} | - | new |")
+            continue
+        delta = head[key] - base[key]
+        if delta == 0:
+            continue
+        pct = delta / base[key] * 100
+        status = ""
+        if delta > threshold_gas and pct > threshold_pct:
+            status = "regression"
+            regressions += 1
+        changed.append(
+            format_key(key)
+            + f"| {base[key]} | {head[key]} | {delta:+d} ({pct:+.2f}%) | {status} |"
+        )
+
+    lines = [
+        "## Gas changes",
+        "",
+        f"- Threshold: +{threshold_pct}% and +{threshold_gas} gas",
+        f"- Regressions: {regressions}",
+    ]
+    if changed:
+        lines.extend(
+            [
+                "",
+                "| Market | Function | N | Skipped bands | Base | Head | Delta | |",
+                "| --- | --- | --- | --- | --- | --- | --- | --- |",
+                *changed,
+            ]
+        )
+    else:
+        lines.extend(["", "_No gas changes detected._"])
+    return "\n".join(lines) + "\n", regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare gas reports.")
+    parser.add_argument("--base", required=True, help="Baseline gas.json path.")
+    parser.add_argument("--head", required=True, help="New gas.json path.")
+    parser.add_argument(
+        "--threshold-pct",
+        type=float,
+        default=0.5,
+        help="Relative gas increase (in %%) tolerated per measurement.",
+    )
+    parser.add_argument(
+        "--threshold-gas",
+        type=int,
+        default=100,
+        help="Absolute gas increase tolerated per measurement.",
+    )
+    parser.add_argument("--output", help="Write report to file instead of stdout.")
+    args = parser.parse_args()
+
+    report, regressions = build_report(
+        load_report(Path(args.base)),
+        load_report(Path(args.head)),
+        args.threshold_pct,
+        args.threshold_gas,
+    )
+    if args.output:
+        Path(args.output).write_text(report)
+    else:
+        print(report, end="")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+Gas benchmarks for Controller, AMM and Vault (ERC4626) entry points.
+
+Markets are deployed once and every measurement runs inside `boa.env.anchor()`
+starting from the same state. The reported number is the execution gas the
+transaction is charged: intrinsic gas (21000 + calldata) is not included,
+refunds are capped at 1/5 of the gas used (EIP-3529) and all accounts and
+storage slots start cold.
+
+    python -m benchmarks.gas --update-baseline .tmp/gas-baseline.json
+    # ... change contracts ...
+    python -m benchmarks.gas --output-dir .tmp/gas
+    python -m benchmarks.compare_gas --base .tmp/gas-baseline.json --head .tmp/gas/gas.json
+
+With `--lm-callback` every market has an LMCallback gauge attached, which AMM
+deposits, withdrawals and exchanges checkpoint.
+"""
+
+import argparse
+import csv
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import boa
+from boa.util.abi import Address
+
+from tests.utils import max_approve
+from tests.utils.constants import ZERO_ADDRESS
+from tests.utils.deployers import (
+    AMM_DEPLOYER,
+    AMM_PACKED_DEPLOYER,
+    ERC20_CRV_DEPLOYER,
+    ERC20_MOCK_DEPLOYER,
+    GAUGE_CONTROLLER_DEPLOYER,
+    LM_CALLBACK_DEPLOYER,
+    LM_CALLBACK_FACTORY_DEPLOYER,
+    MINTER_DEPLOYER,
+    VOTING_ESCROW_DEPLOYER,
+)
+from tests.utils.protocols import Llamalend
+
+MARKETS = ("mint", "lending")
+N_BANDS = (4, 10, 20, 30, 40, 50)
+# Controller puts the top band at most 1024 - N bands above the active band
+SKIP_BANDS = (0, 16, 128, 512, 960)
+
+A = 100
+FEE = 10**16
+LOAN_DISCOUNT = 9 * 10**16
+LIQUIDATION_DISCOUNT = 6 * 10**16
+PRICE = 3000 * 10**18
+LIQUIDITY = 10**9 * 10**18
+COLLATERAL = 10 * 10**18
+LIQUIDATION_BATCH = 10
+VAULT_DEPOSIT = 10**6 * 10**18
+WEEK = 7 * 86400
+
+# LMCallback has the mainnet addresses of these hardcoded
+CRV_ADDRESS = "0xD533a949740bb3306d119CC777fa900bA034cd52"
+GAUGE_CONTROLLER_ADDRESS = "0x2F50D538606Fa9EDD2B11E2446BEb18C9D5846bB"
+MINTER_ADDRESS = "0xd061D61a4d941c39E5453435B6345Dc261C2fcE0"
+
+
+@dataclass
+class Market:
+    name: str
+    controller: object
+    amm: object
+    collateral_token: object
+    borrowed_token: object
+    price_oracle: object
+    admin: str
+    vault: object = None
+
+
+def deploy_markets(names, amm_deployer=AMM_DEPLOYER, lm_callback=False) -> list[Market]:
+    proto = Llamalend(PRICE, amm_deployer)
+    markets = []
+    for name in names:
+        collateral_token = ERC20_MOCK_DEPLOYER.deploy(18)
+        if name == "mint":
+            borrowed_token = proto.crvUSD
+            market = proto.create_mint_market(
+                collateral_token=collateral_token,
+                price_oracle=proto.price_oracle,
+                monetary_policy=proto.mint_monetary_policy,
+                A=A,
+                amm_fee=FEE,
+                loan_discount=LOAN_DISCOUNT,
+                liquidation_discount=LIQUIDATION_DISCOUNT,
+                debt_ceiling=LIQUIDITY,
+            )
+        elif name == "lending":
+            borrowed_token = ERC20_MOCK_DEPLOYER.deploy(18)
+            market = proto.create_lending_market(
+                borrowed_token=borrowed_token,
+                collateral_token=collateral_token,
+                A=A,
+                fee=FEE,
+                loan_discount=LOAN_DISCOUNT,
+                liquidation_discount=LIQUIDATION_DISCOUNT,
+                price_oracle=proto.price_oracle,
+                min_borrow_rate=10**15 // (365 * 86400),
+                max_borrow_rate=10**18 // (365 * 86400),
+                seed_amount=LIQUIDITY,
+            )
+            proto.configurator.set_borrow_cap(
+                market["controller"], LIQUIDITY, sender=proto.admin
+            )
+        else:
+            raise ValueError(f"Unknown market type: {name}")
+        markets.append(
+            Market(
+                name=name,
+                controller=market["controller"],
+                amm=market["amm"],
+                collateral_token=collateral_token,
+                borrowed_token=borrowed_token,
+                price_oracle=proto.price_oracle,
+                admin=proto.admin,
+                vault=market.get("vault"),
+            )
+        )
+    if lm_callback:
+        attach_lm_callbacks(proto, markets)
+    return markets
+
+
+def attach_lm_callbacks(proto: Llamalend, markets: list[Market]):
+    """
+    Attach an LMCallback with gauge weight to every market, so that AMM calls
+    pay for the CRV emission checkpoints.
+    """
+    admin = proto.admin
+    with boa.env.prank(admin):
+        crv = ERC20_CRV_DEPLOYER.deploy(
+            "Curve DAO Token", "CRV", 18, override_address=CRV_ADDRESS
+        )
+        voting_escrow = VOTING_ESCROW_DEPLOYER.deploy(
+            crv, "Voting-escrowed CRV", "veCRV", "veCRV_0.99"
+        )
+        gauge_controller = GAUGE_CONTROLLER_DEPLOYER.deploy(
+            crv, voting_escrow, override_address=GAUGE_CONTROLLER_ADDRESS
+        )
+        gauge_controller.add_type("crvUSD Market")
+        gauge_controller.change_type_weight(0, 10**18)
+        minter = MINTER_DEPLOYER.deploy(
+            crv, gauge_controller, override_address=MINTER_ADDRESS
+        )
+        crv.set_minter(minter)
+        factory = LM_CALLBACK_FACTORY_DEPLOYER.deploy(
+            admin, LM_CALLBACK_DEPLOYER.deploy_as_blueprint()
+        )
+        lm_callbacks = []
+        for market in markets:
+            lm_callback = LM_CALLBACK_DEPLOYER.at(
+                factory.deploy_lm_callback(market.amm)
+            )
+            lm_callbacks.append(lm_callback)
+            proto.configurator.set_callback(market.controller, lm_callback)
+            gauge_controller.add_gauge(lm_callback.address, 0, 10**18)
+    # Gauge weights apply from the next week on. Meanwhile interest raised the
+    # base prices: the oracle follows, so that loans can start at the active band
+    boa.env.time_travel(WEEK)
+    price = max(market.amm.get_base_price() for market in markets)
+    proto.price_oracle.set_price(price, sender=admin)
+    # A gauge that has been running for a while: the callbacks checkpointed
+    # this week already. They only integrate while the AMM holds collateral.
+    for market, lm_callback in zip(markets, lm_callbacks):
+        boa.deal(market.collateral_token, market.amm, 1)
+        lm_callback.user_checkpoint(ZERO_ADDRESS)
+
+
+def tx_gas(contract) -> int:
+    """Execution gas of the last call to `contract` after refunds."""
+    computation = contract._computation
+    used = computation.get_gas_used()
+    return used - min(computation.get_gas_refund(), used // 5)
+
+
+def cold_start(sender, to):
+    """Forget accounts and slots warmed up by setup calls, like a new transaction."""
+    db = boa.env.evm.vm.state._account_db
+    # Cleared through the journal, so the enclosing anchor can still revert it
+    db._journal_accessed_state.clear()
+    db.mark_address_warm(Address(sender).canonical_address)
+    db.mark_address_warm(Address(to).canonical_address)
+
+
+def measure(contract, method: str, *args, sender) -> int:
+    cold_start(sender, contract.address)
+    getattr(contract, method)(*args, sender=sender)
+    return tx_gas(contract)
+
+
+def debt_for_skip(market: Market, collateral: int, n: int, skip: int) -> int:
+    """
+    Debt which puts the top band of the loan `skip` bands above the active one
+    (below it if `skip` is negative).
+    """
+    controller = market.controller
+    n0 = market.amm.active_band()
+    debt = controller.max_borrowable(collateral, n)
+    if skip > 0:
+        debt = debt * (A - 1) ** skip // A**skip
+    for _ in range(8):
+        dn = controller.calculate_debt_n1(collateral, debt, n) - n0
+        if dn == skip:
+            return debt
+        # One band up or down changes the supported debt by A / (A - 1)
+        if dn > skip:
+            debt = debt * A ** (dn - skip) // (A - 1) ** (dn - skip) + 1
+        else:
+            debt = debt * (A - 1) ** (skip - dn) // A ** (skip - dn)
+    raise ValueError(f"Cannot place a loan {skip} bands above the active band")
+
+
+def new_user(market: Market) -> str:
+    user = boa.env.generate_address()
+    boa.deal(market.collateral_token, user, 2 * COLLATERAL)
+    max_approve(market.collateral_token, market.controller, sender=user)
+    max_approve(market.borrowed_token, market.controller, sender=user)
+    return user
+
+
+def open_loan(market: Market, n: int, skip: int = 0) -> tuple[str, int]:
+    user = new_user(market)
+    debt = debt_for_skip(market, COLLATERAL, n, skip)
+    market.controller.create_loan(COLLATERAL, debt, n, sender=user)
+    return user, debt
+
+
+def bench_create_loan(market: Market, n: int, skip: int) -> int:
+    user = new_user(market)
+    debt = debt_for_skip(market, COLLATERAL, n, skip)
+    return measure(market.controller, "create_loan", COLLATERAL, debt, n, sender=user)
+
+
+def bench_create_loan_skip(market: Market, n: int, skip: int) -> int:
+    # The oracle went up: the loan is placed `skip` bands below the active band
+    # and the AMM checks that the bands in between are empty before skipping them
+    n0 = market.amm.active_band()
+    market.price_oracle.set_price(
+        market.amm.p_oracle_up(n0 - skip - 16), sender=market.admin
+    )
+    boa.env.time_travel(3600)
+    user = new_user(market)
+    debt = debt_for_skip(market, COLLATERAL, n, -skip)
+    return measure(market.controller, "create_loan", COLLATERAL, debt, n, sender=user)
+
+
+def bench_borrow_more(market: Market, n: int, skip: int) -> int:
+    user, debt = open_loan(market, n, skip)
+    return measure(market.controller, "borrow_more", COLLATERAL, debt // 2, sender=user)
+
+
+def bench_repay_partial(market: Market, n: int, skip: int) -> int:
+    user, debt = open_loan(market, n, skip)
+    return measure(market.controller, "repay", debt // 2, sender=user)
+
+
+def bench_repay_full(market: Market, n: int, skip: int) -> int:
+    user, _ = open_loan(market, n, skip)
+    debt = market.controller.debt(user)
+    return measure(market.controller, "repay", debt, sender=user)
+
+
+def bench_liquidate(market: Market, n: int, skip: int) -> int:
+    user, _ = open_loan(market, n, skip)
+    market.price_oracle.set_price(market.price_oracle.price() // 2, sender=market.admin)
+    assert market.controller.health(user) < 0
+    liquidator = boa.env.generate_address()
+    boa.deal(
+        market.borrowed_token,
+        liquidator,
+        market.controller.tokens_to_liquidate(user),
+    )
+    max_approve(market.borrowed_token, market.controller, sender=liquidator)
+    return measure(market.controller, "liquidate", user, 0, sender=liquidator)
+
+
+def bench_liquidate_many(market: Market, n: int, skip: int) -> int | None:
+    # Gas per user when LIQUIDATION_BATCH users are liquidated in one transaction
+    if not hasattr(market.controller, "liquidate_many"):
+        return None
+    # One band above the active one: the loans of the batch share their bands,
+    # and the top band of a loan can't be placed below the ones of the others
+    users = [open_loan(market, n, skip + 1)[0] for _ in range(LIQUIDATION_BATCH)]
+    market.price_oracle.set_price(market.price_oracle.price() // 2, sender=market.admin)
+    liquidator = boa.env.generate_address()
+    boa.deal(
+        market.borrowed_token,
+        liquidator,
+        sum(market.controller.tokens_to_liquidate(user) for user in users),
+    )
+    max_approve(market.borrowed_token, market.controller, sender=liquidator)
+    gas = measure(
+        market.controller,
+        "liquidate_many",
+        users,
+        [0] * len(users),
+        sender=liquidator,
+    )
+    return gas // len(users)
+
+
+def bench_exchange(market: Market, n: int, skip: int) -> int:
+    # Buys out all N bands after walking `skip` empty bands. The oracle follows
+    # the price down to the bands as the AMM only trades around it.
+    user, _ = open_loan(market, n, skip)
+    n1 = market.amm.read_user_tick_numbers(user)[0]
+    market.price_oracle.set_price(market.amm.p_oracle_up(n1), sender=market.admin)
+    boa.env.time_travel(3600)
+    trader = boa.env.generate_address()
+    amount = 10 * COLLATERAL * PRICE // 10**18
+    boa.deal(market.borrowed_token, trader, amount)
+    max_approve(market.borrowed_token, market.amm, sender=trader)
+    return measure(market.amm, "exchange", 0, 1, amount, 0, sender=trader)
+
+
+def vault_lender(market: Market, n: int) -> str | None:
+    """
+    Lender holding VAULT_DEPOSIT of vault shares and as much borrowed token, in
+    a vault with an open N band loan which accrued a day of interest.
+    """
+    if market.vault is None:
+        return None
+    open_loan(market, n)
+    boa.env.time_travel(86400)
+    lender = boa.env.generate_address()
+    boa.deal(market.borrowed_token, lender, 2 * VAULT_DEPOSIT)
+    max_approve(market.borrowed_token, market.vault, sender=lender)
+    market.vault.deposit(VAULT_DEPOSIT, sender=lender)
+    return lender
+
+
+def bench_vault(method: str, *args: str):
+    # Vault calls take "amount" (half of the lender's deposit) and/or "lender"
+    def bench(market: Market, n: int, skip: int) -> int | None:
+        lender = vault_lender(market, n)
+        if lender is None:
+            # Mint markets have no vault
+            return None
+        values = {"amount": VAULT_DEPOSIT // 2, "lender": lender}
+        return measure(
+            market.vault, method, *(values[a] for a in args), sender=lender
+        )
+
+    return bench
+
+
+# function -> (benchmark, whether it is swept over skipped bands)
+BENCHMARKS = {
+    "create_loan": (bench_create_loan, False),
+    "create_loan_skip": (bench_create_loan_skip, True),
+    "borrow_more": (bench_borrow_more, False),
+    "repay_partial": (bench_repay_partial, False),
+    "repay_full": (bench_repay_full, False),
+    "liquidate": (bench_liquidate, False),
+    "liquidate_many": (bench_liquidate_many, False),
+    "exchange": (bench_exchange, True),
+    "vault_deposit": (bench_vault("deposit", "amount"), False),
+    "vault_mint": (bench_vault("mint", "amount"), False),
+    "vault_withdraw": (bench_vault("withdraw", "amount"), False),
+    "vault_redeem": (bench_vault("redeem", "amount"), False),
+    "vault_total_assets": (bench_vault("totalAssets"), False),
+    "vault_max_withdraw": (bench_vault("maxWithdraw", "lender"), False),
+    "vault_max_redeem": (bench_vault("maxRedeem", "lender"), False),
+    "vault_lend_apr": (bench_vault("lend_apr"), False),
+}
+
+
+def run(markets: list[Market], functions, n_bands, skip_bands) -> list[dict]:
+    rows = []
+    for market in markets:
+        for function in functions:
+            bench, sweep_skip = BENCHMARKS[function]
+            for n in n_bands:
+                for skip in skip_bands if sweep_skip else (0,):
+                    with boa.env.anchor():
+                        gas = bench(market, n, skip)
+                    if gas is None:
+                        # Not supported by the measured contracts
+                        continue
+                    rows.append(
+                        {
+                            "market": market.name,
+                            "function": function,
+                            "n_bands": n,
+                            "skipped_bands": skip,
+                            "gas": gas,
+                        }
+                    )
+                    print(f"{market.name} {function} N={n} skip={skip}: {gas}")
+    return rows
+
+
+def write_reports(rows: list[dict], output_dir: Path):
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / "gas.json").write_text(json.dumps(rows, indent=2) + "\n")
+
+    with (output_dir / "gas.csv").open("w", newline="") as f:
+        writer = csv.DictWriter(
+            f, fieldnames=["market", "function", "n_bands", "skipped_bands", "gas"]
+        )
+        writer.writeheader()
+        writer.writerows(rows)
+
+    md_lines = [
+        "# Gas report",
+        "",
+        "| Market | Function | N | Skipped bands | Gas |",
+        "| --- | --- | --- | --- | --- |",
+    ]
+    for row in rows:
+        md_lines.append(
+            f"| {row['market']} | {row['function']} | {row['n_bands']} "
+            f"| {row['skipped_bands']} | {row['gas']} |"
+        )
+    (output_dir / "gas-report.md").write_text("\n".join(md_lines) + "\n")
+
+
+def int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",")]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure gas of Controller, AMM and Vault entry points."
+    )
+    parser.add_argument(
+        "--output-dir",
+        default=".tmp/gas-run",
+        help="Output directory for gas.json, gas.csv and gas-report.md.",
+    )
+    parser.add_argument(
+        "--markets",
+        default=",".join(MARKETS),
+        help="Comma-separated market types to benchmark.",
+    )
+    parser.add_argument(
+        "--functions",
+        default=",".join(BENCHMARKS),
+        help="Comma-separated functions to benchmark.",
+    )
+    parser.add_argument(
+        "--n-bands",
+        type=int_list,
+        default=N_BANDS,
+        help="Comma-separated numbers of bands to sweep.",
+    )
+    parser.add_argument(
+        "--skip-bands",
+        type=int_list,
+        default=SKIP_BANDS,
+        help="Comma-separated numbers of empty bands to sweep for create_loan_skip and exchange.",
+    )
+    parser.add_argument(
+        "--packed-amm",
+        action="store_true",
+        help="Deploy markets with the packed band storage AMM (AMMPacked.vy).",
+    )
+    parser.add_argument(
+        "--lm-callback",
+        action="store_true",
+        help="Attach an LMCallback with gauge weight to every market.",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        metavar="PATH",
+        help="Also write the results to this baseline file.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print titanoboa call and line gas profiles of the measured calls.",
+    )
+    args = parser.parse_args()
+
+    functions = args.functions.split(",")
+    for function in functions:
+        if function not in BENCHMARKS:
+            parser.error(f"unknown function: {function}")
+
+    markets = deploy_markets(
+        args.markets.split(","),
+        AMM_PACKED_DEPLOYER if args.packed_amm else AMM_DEPLOYER,
+        args.lm_callback,
+    )
+    if args.profile:
+        boa.env.enable_gas_profiling()
+    rows = run(markets, functions, args.n_bands, args.skip_bands)
+
+    output_dir = Path(args.output_dir)
+    write_reports(rows, output_dir)
+    if args.update_baseline:
+        Path(args.update_baseline).write_text(json.dumps(rows, indent=2) + "\n")
+
+    if args.profile:
+        from rich.console import Console
+
+        from boa.profiling import get_call_profile_table, get_line_profile_table
+
+        console = Console()
+        console.print(get_call_profile_table())
+        console.print(get_line_profile_table())
+
+    print(output_dir / "gas.json")
+    print(output_dir / "gas.csv")
+    print(output_dir / "gas-report.md")
+
+
+if __name__ == "__main__":
+    main()
@@ -576,13 +576,15 @@ def can_skip_bands(n_end: int256) -> bool:
     @return True if no liquidity exists between active_band and n_end, False otherwise
     """
     n: int256 = self.active_band
+    # Bands below min_band are empty: they are not read
+    min_band: int256 = self.min_band
     for i: uint256 in range(MAX_SKIP_TICKS_UINT):
         if n_end > n:
             if self.bands_y[n] != 0:
                 return False
             n = unsafe_add(n, 1)
         else:
-            if self.bands_x[n] != 0:
+            if n >= min_band and self.bands_x[n] != 0:
                 return False
             n = unsafe_sub(n, 1)
         if n == n_end:  # not including n_end
@@ -670,13 +672,14 @@ def deposit_range(user: address, amount: uint256, n1: int256, n2: int256):
 
     lm: ILMCallback = self._liquidity_mining_callback
 
-    # Autoskip bands if we can
+    # Autoskip bands if we can. Bands below min_band are empty: they are not read
+    min_band: int256 = self.min_band
     for i: uint256 in range(MAX_SKIP_TICKS_UINT + 1):
         if n1 > n0:
             if i != 0:
                 self.active_band = n0
             break
-        assert self.bands_x[n0] == 0 and i < MAX_SKIP_TICKS_UINT  # dev: Deposit below current band
+        assert (n0 < min_band or self.bands_x[n0] == 0) and i < MAX_SKIP_TICKS_UINT  # dev: Deposit below current band
         n0 -= 1
 
     for i: int256 in range(MAX_TICKS):
@@ -707,7 +710,7 @@ def deposit_range(user: address, amount: uint256, n1: int256, n2: int256):
             # If initial s == 0 - s becomes equal to y which is > 100 => nonzero
             collateral_shares.append(unsafe_div(total_y * 10**18, s))
 
-    self.min_band = min(self.min_band, n1)
+    self.min_band = min(min_band, n1)
     self.max_band = max(self.max_band, n2)
 
     self.save_user_shares(user, user_shares)
@@ -346,6 +346,8 @@ def users_with_health(
     Enumerate controller loans and return positions with health < threshold.
     Optionally require controller.approval(user, _approval_spender).
     Returns IController.Position entries (user, x, y, debt, health).
+    Health is computed inline against the AMM (same math as controller.health)
+    with the oracle price and active band read once per scan rather than once per user.
     """
     AMM_: IAMM = staticcall _controller.amm()
 
@@ -353,17 +355,55 @@ def users_with_health(
     limit: uint256 = _limit if _limit != 0 else n_loans
     ix: uint256 = _from
     out: DynArray[IController.Position, 1000] = []
+
+    p_o: uint256 = 0
+    active_band: int256 = 0
+    collateral_precision: uint256 = 0
+    borrowed_precision: uint256 = 0
+    if _full:
+        p_o = staticcall AMM_.price_oracle()
+        active_band = staticcall AMM_.active_band()
+        collateral_precision = pow_mod256(
+            10, 18 - convert(staticcall (staticcall _controller.collateral_token()).decimals(), uint256)
+        )
+        borrowed_precision = pow_mod256(
+            10, 18 - convert(staticcall (staticcall _controller.borrowed_token()).decimals(), uint256)
+        )
+
     for i: uint256 in range(10**6):
         if ix >= n_loans or i == limit:
             break
         user: address = staticcall _controller.loans(ix)
+        ix += 1
         if _require_approval and not (user == _approval_spender or staticcall _controller.approval(user, _approval_spender)):
-            ix += 1
             continue
-        h: int256 = staticcall _controller.health(user, _full)
+
+        debt: uint256 = staticcall _controller.debt(user)
+        if debt == 0:
+            continue
+        h: int256 = SWAD - convert(staticcall _controller.liquidation_discounts(user), int256)
+        h = unsafe_div(convert(staticcall AMM_.get_x_down(user), int256) * h, convert(debt, int256)) - SWAD
+
+        xy: uint256[2] = empty(uint256[2])
+        xy_read: bool = False
+        if _full:
+            ns0: int256 = (staticcall AMM_.read_user_tick_numbers(user))[0]
+            if ns0 > active_band:  # Not in soft-liquidation
+                p_up: uint256 = staticcall AMM_.p_oracle_up(ns0)
+                if p_o > p_up:
+                    xy = staticcall AMM_.get_sum_xy(user)
+                    xy_read = True
+                    h += convert(
+                        unsafe_div(
+                            unsafe_sub(p_o, p_up) * xy[1] * collateral_precision,
+                            debt * borrowed_precision,
+                        ),
+                        int256,
+                    )
+
         if h < _threshold:
-            xy: uint256[2] = staticcall AMM_.get_sum_xy(user)
-            debt: uint256 = staticcall _controller.debt(user)
+            if not xy_read:
+                xy = staticcall AMM_.get_sum_xy(user)
             out.append(
                 IController.Position(
                     user=user, x=xy[0], y=xy[1], debt=debt, health=h
@@ -371,7 +411,6 @@ def users_with_health(
             )
             if len(out) == 1000:
                 break
-        ix += 1
     return out
 
 
@@ -0,0 +1,226 @@
+# pragma version 0.4.3
+"""
+@title Market Lens
+@author Curve.Finance
+@license Copyright (c) Curve.Finance, 2020-2026 - all rights reserved
+@notice Batched snapshots of many mint and lend markets, and of loans in them,
+        in a single call. Meant for dashboards, indexers and bots.
+@dev Holds no state, so it can be used without deploying it by overriding the
+     code of any address in an `eth_call`. Results are decoded by
+     `curve_stablecoin.sim.lens`.
+@custom:security security@curve.finance
+@custom:kill Stateless contract doesn't need to be killed.
+"""
+
+from curve_stablecoin.interfaces import IAMM
+from curve_stablecoin.interfaces import IController
+from curve_stablecoin.interfaces import IControllerFactory
+from curve_stablecoin.interfaces import ILendFactory
+from curve_stablecoin.interfaces import IVault
+from curve_stablecoin import constants as c
+
+
+# https://github.com/vyperlang/vyper/issues/4723
+MAX_TICKS_UINT: constant(uint256) = c.MAX_TICKS_UINT
+MAX_MARKETS: constant(uint256) = 50
+MAX_USERS: constant(uint256) = 500
+# Bands on each side of the active band, and the active band itself
+MAX_BANDS: constant(uint256) = 2 * MAX_TICKS_UINT + 1
+
+
+struct MarketSnapshot:
+    controller: IController
+    amm: IAMM
+    vault: IVault  # empty for mint markets
+    price_oracle: uint256
+    amm_price: uint256
+    base_price: uint256
+    fee: uint256
+    rate: uint256
+    rate_mul: uint256
+    active_band: int256
+    min_band: int256
+    max_band: int256
+    total_debt: uint256
+    n_loans: uint256
+    available_balance: uint256
+    admin_fees: uint256
+    vault_total_supply: uint256
+    band_from: int256  # band of bands_x[0] and bands_y[0]
+    bands_x: DynArray[uint256, MAX_BANDS]
+    bands_y: DynArray[uint256, MAX_BANDS]
+
+
+struct UserSnapshot:
+    controller: IController
+    user: address
+    loan_exists: bool
+    collateral: uint256
+    borrowed: uint256
+    debt: uint256
+    N: uint256
+    n1: int256
+    n2: int256
+    p_up: uint256
+    p_down: uint256
+    health: int256  # full health
+
+
+@internal
+@view
+def _vault(_controller: IController) -> IVault:
+    # Only lend controllers have a vault
+    success: bool = False
+    response: Bytes[32] = b""
+    success, response = raw_call(
+        _controller.address,
+        method_id("vault()"),
+        max_outsize=32,
+        is_static_call=True,
+        revert_on_failure=False,
+    )
+    if success and len(response) == 32:
+        return IVault(abi_decode(response, address))
+    return empty(IVault)
+
+
+@internal
+@view
+def _market(_controller: IController, _n_bands: uint256) -> MarketSnapshot:
+    amm: IAMM = staticcall _controller.amm()
+    s: MarketSnapshot = MarketSnapshot(
+        controller=_controller,
+        amm=amm,
+        vault=self._vault(_controller),
+        price_oracle=staticcall amm.price_oracle(),
+        amm_price=staticcall amm.get_p(),
+        base_price=staticcall amm.get_base_price(),
+        fee=staticcall amm.fee(),
+        rate=staticcall amm.rate(),
+        rate_mul=staticcall amm.get_rate_mul(),
+        active_band=staticcall amm.active_band(),
+        min_band=staticcall amm.min_band(),
+        max_band=staticcall amm.max_band(),
+        total_debt=staticcall _controller.total_debt(),
+        n_loans=staticcall _controller.n_loans(),
+        available_balance=staticcall _controller.available_balance(),
+        admin_fees=staticcall _controller.admin_fees(),
+        vault_total_supply=0,
+        band_from=0,
+        bands_x=[],
+        bands_y=[],
+    )
+    if s.vault.address != empty(address):
+        s.vault_total_supply = staticcall s.vault.totalSupply()
+
+    radius: int256 = convert(_n_bands, int256)
+    s.band_from = max(s.active_band - radius, s.min_band)
+    band_to: int256 = min(s.active_band + radius, s.max_band)
+    for i: uint256 in range(MAX_BANDS):
+        n: int256 = s.band_from + convert(i, int256)
+        if n > band_to:
+            break
+        s.bands_x.append(staticcall amm.bands_x(n))
+        s.bands_y.append(staticcall amm.bands_y(n))
+    return s
+
+
+@external
+@view
+def markets(
+    _controllers: DynArray[IController, MAX_MARKETS], _n_bands: uint256
+) -> DynArray[MarketSnapshot, MAX_MARKETS]:
+    """
+    @notice Snapshot of the AMM, controller and vault of every market
+    @param _controllers Controllers of the markets
+    @param _n_bands Number of bands returned on each side of the active band
+    @return Snapshots in the order of `_controllers`
+    """
+    assert _n_bands <= MAX_TICKS_UINT, "Too many bands"
+    snapshots: DynArray[MarketSnapshot, MAX_MARKETS] = []
+    for controller: IController in _controllers:
+        snapshots.append(self._market(controller, _n_bands))
+    return snapshots
+
+
+@external
+@view
+def lend_markets(
+    _factory: ILendFactory, _from: uint256, _limit: uint256, _n_bands: uint256
+) -> DynArray[MarketSnapshot, MAX_MARKETS]:
+    """
+    @notice Snapshot of the markets `_from`..`_from + _limit` of a lend factory
+    @param _factory Lend factory
+    @param _from Index of the first market
+    @param _limit Maximum number of markets
+    @param _n_bands Number of bands returned on each side of the active band
+    @return Snapshots in the order of the factory
+    """
+    assert _n_bands <= MAX_TICKS_UINT, "Too many bands"
+    snapshots: DynArray[MarketSnapshot, MAX_MARKETS] = []
+    end: uint256 = min(_from + _limit, staticcall _factory.market_count())
+    for i: uint256 in range(_from, end, bound=MAX_MARKETS):
+        market: ILendFactory.Market = staticcall _factory.markets(i)
+        snapshots.append(self._market(market.controller, _n_bands))
+    return snapshots
+
+
+@external
+@view
+def mint_markets(
+    _factory: IControllerFactory, _from: uint256, _limit: uint256, _n_bands: uint256
+) -> DynArray[MarketSnapshot, MAX_MARKETS]:
+    """
+    @notice Snapshot of the markets `_from`..`_from + _limit` of a mint factory
+    @param _factory Mint controller factory
+    @param _from Index of the first market
+    @param _limit Maximum number of markets
+    @param _n_bands Number of bands returned on each side of the active band
+    @return Snapshots in the order of the factory
+    """
+    assert _n_bands <= MAX_TICKS_UINT, "Too many bands"
+    snapshots: DynArray[MarketSnapshot, MAX_MARKETS] = []
+    end: uint256 = min(_from + _limit, staticcall _factory.n_collaterals())
+    for i: uint256 in range(_from, end, bound=MAX_MARKETS):
+        controller: IController = IController(staticcall _factory.controllers(i))
+        snapshots.append(self._market(controller, _n_bands))
+    return snapshots
+
+
+@external
+@view
+def users(
+    _controllers: DynArray[IController, MAX_USERS],
+    _users: DynArray[address, MAX_USERS],
+) -> DynArray[UserSnapshot, MAX_USERS]:
+    """
+    @notice Loan state of `_users[i]` in `_controllers[i]` for every `i`
+    @dev Users without a loan only have `loan_exists` set to False
+    @param _controllers Controller of every user
+    @param _users Users
+    @return Snapshots in the order of `_users`
+    """
+    assert len(_controllers) == len(_users), "Length mismatch"
+    snapshots: DynArray[UserSnapshot, MAX_USERS] = []
+    for i: uint256 in range(len(_users), bound=MAX_USERS):
+        controller: IController = _controllers[i]
+        user: address = _users[i]
+        s: UserSnapshot = empty(UserSnapshot)
+        s.controller = controller
+        s.user = user
+        s.loan_exists = staticcall controller.loan_exists(user)
+        if s.loan_exists:
+            state: uint256[4] = staticcall controller.user_state(user)
+            s.collateral = state[0]
+            s.borrowed = state[1]
+            s.debt = state[2]
+            s.N = state[3]
+            ns: int256[2] = staticcall (staticcall controller.amm()).read_user_tick_numbers(user)
+            s.n1 = ns[0]
+            s.n2 = ns[1]
+            prices: uint256[2] = staticcall controller.user_prices(user)
+            s.p_up = prices[0]
+            s.p_down = prices[1]
+            s.health = staticcall controller.health(user, True)
+        snapshots.append(s)
+    return snapshots
@@ -54,6 +54,7 @@ MIN_TICKS_UINT: constant(uint256) = c.MIN_TICKS_UINT
 MAX_TICKS_UINT: constant(uint256) = c.MAX_TICKS_UINT
 MIN_TICKS: constant(int256) = c.MIN_TICKS
 CALLDATA_MAX_SIZE: constant(uint256) = c.CALLDATA_MAX_SIZE
+MAX_LIQUIDATIONS: constant(uint256) = c.MAX_LIQUIDATIONS
 SKIP_CONFIG_UINT256: constant(uint256) = c.SKIP_CONFIG_UINT256
 SKIP_CONFIG_ADDRESS: constant(address) = c.SKIP_CONFIG_ADDRESS
 
@@ -204,6 +205,12 @@ def available_balance() -> uint256:
     return staticcall BORROWED_TOKEN.balanceOf(self)
 
 
+@internal
+@view
+def _rate_mul() -> uint256:
+    return staticcall AMM.get_rate_mul()
+
+
 @internal
 @view
 def _get_total_debt() -> uint256:
@@ -211,7 +218,7 @@ def _get_total_debt() -> uint256:
     @notice Total debt of this controller
     @return Total outstanding debt with accrued interest
     """
-    rate_mul: uint256 = staticcall AMM.get_rate_mul()
+    rate_mul: uint256 = self._rate_mul()
     loan: IController.Loan = self._total_debt
     return loan.initial_debt * rate_mul // loan.rate_mul
 
@@ -343,7 +350,7 @@ def _debt(_user: address) -> (uint256, uint256):
     @param _user User address
     @return (debt, rate_mul)
     """
-    rate_mul: uint256 = staticcall AMM.get_rate_mul()
+    rate_mul: uint256 = self._rate_mul()
     loan: IController.Loan = self.loan[_user]
     if loan.initial_debt == 0:
         return (0, rate_mul)
@@ -429,11 +436,34 @@ def _get_y_effective(
         ),
         unsafe_mul(_SQRT_BAND_RATIO, _N),
     )
-    y_effective: uint256 = d_y_effective
-    for _: uint256 in range(1, _N, bound=MAX_TICKS_UINT):
-        d_y_effective = unsafe_div(d_y_effective * unsafe_sub(_A, 1), _A)
-        y_effective = unsafe_add(y_effective, d_y_effective)
-    return y_effective
+    return self._geometric_sum(d_y_effective, _N, _A)
+
+
+@internal
+@pure
+def _geometric_sum(_d: uint256, _N: uint256, _A: uint256) -> uint256:
+    """
+    @notice Sum of _N terms of a geometric series which starts from _d
+            and has a ratio of (A - 1) / A
+    @dev sum_{0..N-1}(d * ((A-1) / A)**k) = d * A * (1 - ((A-1) / A)**N).
+         The power is taken by squaring at 1e36 base. The result is rounded down,
+         so it never exceeds the exact sum and is below it by at most 2 * d / 1e18 + 1.
+         Adding the terms one by one, rounding each of them down,
+         would be below the exact sum by up to N * (N - 1) / 2 instead.
+    @param _d First term of the series
+    @param _N Number of terms, not more than MAX_TICKS (to be checked by the caller)
+    @param _A Band width factor
+    @return The sum
+    """
+    one: uint256 = 10**36
+    r: uint256 = unsafe_div(unsafe_mul(unsafe_sub(_A, 1), one), _A)
+    r_n: uint256 = one
+    # MAX_TICKS < 2**6
+    for i: uint256 in range(6):
+        if (_N >> i) & 1 != 0:
+            r_n = unsafe_div(unsafe_mul(r_n, r), one)
+        r = unsafe_div(unsafe_mul(r, r), one)
+    return unsafe_div(_d * unsafe_sub(unsafe_div(unsafe_mul(_A, unsafe_sub(one, r_n)), WAD), 1), WAD)
 
 
 @external
@@ -537,10 +567,7 @@ def _calculate_debt_n1(
     n1 = unsafe_div(n1, LOGN_A_RATIO)
 
     n1 = min(n1, 1024 - convert(_N, int256)) + n0
-    if n1 <= n0:
-        assert staticcall AMM.can_skip_bands(n1 - 1), "Debt too high"
-
-    assert (
+    assert (n1 > n0 or staticcall AMM.can_skip_bands(n1 - 1)) and (
         staticcall AMM.p_oracle_up(n1) <= staticcall AMM.price_oracle()
     ), "Debt too high"
 
@@ -681,7 +708,7 @@ def create_loan(
     n1: int256 = self._calculate_debt_n1(total_collateral, _debt, _N, _for)
     n2: int256 = n1 + convert(unsafe_sub(_N, 1), int256)
 
-    rate_mul: uint256 = staticcall AMM.get_rate_mul()
+    rate_mul: uint256 = self._rate_mul()
     self.loan[_for] = IController.Loan(initial_debt=_debt, rate_mul=rate_mul)
 
     n_loans: uint256 = self.n_loans
@@ -1250,55 +1277,106 @@ def liquidate_health_preview(
     )
 
 
-@external
-def liquidate(
-    _user: address,
-    _min_x: uint256,
-    _frac: uint256 = 10**18,
-    _callbacker: address = empty(address),
-    _calldata: Bytes[CALLDATA_MAX_SIZE] = b"",
+@internal
+def _liquidate(
+    _users: DynArray[address, MAX_LIQUIDATIONS],
+    _min_xs: DynArray[uint256, MAX_LIQUIDATIONS],
+    _frac: uint256,
+    _callbacker: address,
+    _calldata: Bytes[CALLDATA_MAX_SIZE],
+    _skip_healthy: bool,
 ):
     """
-    @notice Perform a bad liquidation (or self-liquidation) of user if health is not good
-    @param _user Address of the user to liquidate
-    @param _min_x Minimal amount of borrowed asset to receive (to avoid liquidators being sandwiched)
-    @param _frac Fraction to liquidate; 100% = 10**18
-    @param _callbacker Address of the callback contract
-    @param _calldata Any data for callbacker
+    @notice Liquidate users and settle tokens, total debt and rate once for all of them
+    @param _skip_healthy Skip users who can't be liquidated instead of reverting
     """
-    approval: bool = self._has_approval(_user)
-    liquidation_discount: uint256 = self.liquidation_discounts[_user]
-    debt: uint256 = 0
-    rate_mul: uint256 = 0
-    debt, rate_mul = self._debt(_user)
+    assert _frac <= WAD, "frac>100%"
 
-    health_before: int256 = self._health(_user, debt, True, liquidation_discount)
-    health_limit: uint256 = 0
-    if not approval:
-        assert health_before < 0, "Not enough rekt"
-        health_limit = liquidation_discount
+    rate_mul: uint256 = 0
+    # Total debt repaid and [stable, collateral] withdrawn from AMM
+    debt: uint256 = 0
+    xy: uint256[2] = empty(uint256[2])
+    for i: uint256 in range(len(_users), bound=MAX_LIQUIDATIONS):
+        user: address = _users[i]
+        approval: bool = self._has_approval(user)
+        liquidation_discount: uint256 = self.liquidation_discounts[user]
+        user_debt: uint256 = 0
+        user_debt, rate_mul = self._debt(user)
+        if _skip_healthy and user_debt == 0:
+            continue
+
+        health_before: int256 = self._health(user, user_debt, True, liquidation_discount)
+        health_limit: uint256 = 0
+        if not approval:
+            if _skip_healthy and health_before >= 0:
+                continue
+            assert health_before < 0, "Not enough rekt"
+            health_limit = liquidation_discount
+
+        final_debt: uint256 = user_debt
+        user_debt = unsafe_div(user_debt * _frac + (WAD - 1), WAD)
+        assert user_debt > 0
+        final_debt = unsafe_sub(final_debt, user_debt)
+
+        # If liquidating entire debt, ensure full collateral withdrawal
+        f_remove: uint256 = self._get_f_remove(_frac, health_limit)
+        if final_debt == 0:
+            f_remove = WAD
+
+        # Withdraw sender's borrowed and collateral to our contract
+        # When frac is set - we withdraw a bit less for the same debt fraction
+        # f_remove = ((1 + h/2) / (1 + h) * (1 - frac) + frac) * frac
+        # where h is health limit.
+        # This is less than full h discount but more than no discount
+        user_xy: uint256[2] = extcall AMM.withdraw(user, f_remove)  # [stable, collateral]
+
+        # x increase in same block -> price up -> good
+        # x decrease in same block -> price down -> bad
+        assert user_xy[0] >= _min_xs[i], "Slippage"
+
+        debt += user_debt
+        xy[0] += user_xy[0]
+        xy[1] += user_xy[1]
+
+        self.loan[user] = IController.Loan(initial_debt=final_debt, rate_mul=rate_mul)
+
+        log IController.Repay(
+            caller=msg.sender, user=user, collateral_decrease=user_xy[1], loan_decrease=user_debt
+        )
+        log IController.Liquidate(
+            liquidator=msg.sender,
+            user=user,
+            collateral_received=user_xy[1],
+            borrowed_received=user_xy[0],
+            debt=user_debt,
+        )
+        if final_debt == 0:
+            log IController.UserState(
+                user=user, collateral=0, borrowed=0, debt=0, n1=0, n2=0, liquidation_discount=0
+            )
+            self._remove_from_list(user)
+        else:
+            if health_before >= 0:
+                liquidation_discount = self._update_user_liquidation_discount(user, approval, final_debt)
+            else:
+                # Passing new_debt == 0 means the action can end with unhealthy state
+                liquidation_discount = self._update_user_liquidation_discount(user, approval, 0)
+
+            user_xy = staticcall AMM.get_sum_xy(user)
+            ns: int256[2] = staticcall AMM.read_user_tick_numbers(user)  # ns[1] > ns[0]
+            log IController.UserState(
+                user=user,
+                collateral=user_xy[1],
+                borrowed=user_xy[0],
+                debt=final_debt,
+                n1=ns[0],
+                n2=ns[1],
+                liquidation_discount=liquidation_discount
+            )
 
-    final_debt: uint256 = debt
-    assert _frac <= WAD, "frac>100%"
-    debt = unsafe_div(debt * _frac + (WAD - 1), WAD)
-    assert debt > 0
-    final_debt = unsafe_sub(final_debt, debt)
-
-    # If liquidating entire debt, ensure full collateral withdrawal
-    f_remove: uint256 = self._get_f_remove(_frac, health_limit)
-    if final_debt == 0:
-        f_remove = WAD
-
-    # Withdraw sender's borrowed and collateral to our contract
-    # When frac is set - we withdraw a bit less for the same debt fraction
-    # f_remove = ((1 + h/2) / (1 + h) * (1 - frac) + frac) * frac
-    # where h is health limit.
-    # This is less than full h discount but more than no discount
-    xy: uint256[2] = extcall AMM.withdraw(_user, f_remove)  # [stable, collateral]
-
-    # x increase in same block -> price up -> good
-    # x decrease in same block -> price down -> bad
-    assert xy[0] >= _min_x, "Slippage"
+    if debt == 0:
+        # Nothing was liquidated in the batch
+        return
 
     min_amm_burn: uint256 = min(xy[0], debt)
 
@@ -1320,7 +1398,7 @@ def liquidate(
             cb: IController.CallbackData = self._execute_callback(
                 _callbacker,
                 CALLBACK_LIQUIDATE,
-                _user,
+                _users[0],
                 xy[0],
                 xy[1],
                 debt,
@@ -1337,44 +1415,44 @@ def liquidate(
         # xy[0] >= debt
         tkn.transfer_from(BORROWED_TOKEN, AMM.address, msg.sender, unsafe_sub(xy[0], debt))
 
-    self.loan[_user] = IController.Loan(initial_debt=final_debt, rate_mul=rate_mul)
     self._update_total_debt(debt, rate_mul, False)
     self.repaid += debt
     self._save_rate()
 
-    log IController.Repay(
-        caller=msg.sender, user=_user, collateral_decrease=xy[1], loan_decrease=debt
-    )
-    log IController.Liquidate(
-        liquidator=msg.sender,
-        user=_user,
-        collateral_received=xy[1],
-        borrowed_received=xy[0],
-        debt=debt,
-    )
-    if final_debt == 0:
-        log IController.UserState(
-            user=_user, collateral=0, borrowed=0, debt=0, n1=0, n2=0, liquidation_discount=0
-        )
-        self._remove_from_list(_user)
-    else:
-        if health_before >= 0:
-            liquidation_discount = self._update_user_liquidation_discount(_user, approval, final_debt)
-        else:
-            # Passing new_debt == 0 means the action can end with unhealthy state
-            liquidation_discount = self._update_user_liquidation_discount(_user, approval, 0)
-
-        xy = staticcall AMM.get_sum_xy(_user)
-        ns: int256[2] = staticcall AMM.read_user_tick_numbers(_user)  # ns[1] > ns[0]
-        log IController.UserState(
-            user=_user,
-            collateral=xy[1],
-            borrowed=xy[0],
-            debt=final_debt,
-            n1=ns[0],
-            n2=ns[1],
-            liquidation_discount=liquidation_discount
-        )
+
+@external
+def liquidate(
+    _user: address,
+    _min_x: uint256,
+    _frac: uint256 = 10**18,
+    _callbacker: address = empty(address),
+    _calldata: Bytes[CALLDATA_MAX_SIZE] = b"",
+):
+    """
+    @notice Perform a bad liquidation (or self-liquidation) of user if health is not good
+    @param _user Address of the user to liquidate
+    @param _min_x Minimal amount of borrowed asset to receive (to avoid liquidators being sandwiched)
+    @param _frac Fraction to liquidate; 100% = 10**18
+    @param _callbacker Address of the callback contract
+    @param _calldata Any data for callbacker
+    """
+    self._liquidate([_user], [_min_x], _frac, _callbacker, _calldata, False)
+
+
+@external
+def liquidate_many(
+    _users: DynArray[address, MAX_LIQUIDATIONS],
+    _min_xs: DynArray[uint256, MAX_LIQUIDATIONS],
+    _frac: uint256 = 10**18,
+):
+    """
+    @notice Liquidate several users at once, skipping the ones who are healthy or have no loan
+    @dev Tokens, total debt and rate are settled once for the whole batch
+    @param _users Addresses of the users to liquidate
+    @param _min_xs Minimal amounts of borrowed asset to receive from each user
+    @param _frac Fraction to liquidate for every user; 100% = 10**18
+    """
+    self._liquidate(_users, _min_xs, _frac, empty(address), b"", True)
 
 
 @external
@@ -1515,7 +1593,7 @@ def configure(
 @internal
 @view
 def _admin_fees() -> uint256:
-    return self._stored_admin_fees + self._preview_total_debt(staticcall AMM.get_rate_mul(), self._total_debt)[1]
+    return self._stored_admin_fees + self._preview_total_debt(self._rate_mul(), self._total_debt)[1]
 
 
 @external
@@ -1535,7 +1613,7 @@ def collect_fees() -> uint256:
     @notice Collect the fees charged as interest.
     @return Amount of fees collected and transferred to the fee receiver
     """
-    rate_mul: uint256 = staticcall AMM.get_rate_mul()
+    rate_mul: uint256 = self._rate_mul()
     self._update_total_debt(0, rate_mul, False)
 
     # self._stored_admin_fees == self.admin_fees() after _update_total_debt
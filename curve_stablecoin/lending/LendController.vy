@@ -47,6 +47,7 @@ exports: (
     core.repay,
     core.set_extra_health,
     core.liquidate,
+    core.liquidate_many,
     core.save_rate,
     core.collect_fees,
     # Related contracts getters
@@ -104,6 +105,20 @@ def available_balance() -> uint256:
     return self._available_balance
 
 
+@external
+@view
+@reentrant
+def vault_state() -> (uint256, uint256, uint256):
+    """
+    @notice Balances the vault accounts for, at a single rate multiplier
+    @return (available_balance, total_debt, admin_fees)
+    """
+    debt: uint256 = 0
+    fees: uint256 = 0
+    debt, fees = core._preview_total_debt(core._rate_mul(), core._total_debt)
+    return self._available_balance, debt, core._stored_admin_fees + fees
+
+
 # https://github.com/vyperlang/vyper/issues/4721
 @external
 @view
@@ -179,7 +194,7 @@ def configure_lend(_borrow_cap: uint256, _admin_percentage: uint256):
     if _borrow_cap != core.SKIP_CONFIG_UINT256:
         self.borrow_cap = _borrow_cap
     if _admin_percentage != core.SKIP_CONFIG_UINT256:
-        rate_mul: uint256 = staticcall core.AMM.get_rate_mul()
+        rate_mul: uint256 = core._rate_mul()
         core._update_total_debt(0, rate_mul, False)
         core.admin_percentage = _admin_percentage
 
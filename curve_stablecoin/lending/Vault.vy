@@ -158,11 +158,14 @@ def lend_apr() -> uint256:
     @notice Lending APR (annualized and 1e18-based), net of admin fees
     @return Current annualized lending rate scaled by 1e18, after admin fee deduction
     """
-    debt: uint256 = staticcall self._controller.total_debt()
+    available: uint256 = 0
+    debt: uint256 = 0
+    fees: uint256 = 0
+    available, debt, fees = self._vault_state()
     if debt == 0:
         return 0
 
-    gross_apr: uint256 = staticcall self._amm.rate() * (365 * 86400) * debt // self._total_assets()
+    gross_apr: uint256 = staticcall self._amm.rate() * (365 * 86400) * debt // (available + debt - fees)
     admin_pct: uint256 = staticcall ILendController(self._controller.address).admin_percentage()
     return gross_apr * (c.WAD - admin_pct) // c.WAD
 
@@ -177,14 +180,21 @@ def asset() -> IERC20:
     return self._borrowed_token
 
 
+@internal
+@view
+def _vault_state() -> (uint256, uint256, uint256):
+    # (available_balance, total_debt, admin_fees) of the controller in one call
+    return staticcall ILendController(self._controller.address).vault_state()
+
+
 @internal
 @view
 def _total_assets() -> uint256:
-    return (
-        staticcall self._controller.available_balance()
-        + staticcall self._controller.total_debt()
-        - staticcall self._controller.admin_fees()
-    )
+    available: uint256 = 0
+    debt: uint256 = 0
+    fees: uint256 = 0
+    available, debt, fees = self._vault_state()
+    return available + debt - fees
 
 
 @external
@@ -391,15 +401,6 @@ def mint(_shares: uint256, _receiver: address = msg.sender) -> uint256:
     return assets
 
 
-@internal
-@view
-def _available_balance() -> uint256:
-    return crv_math.sub_or_zero(
-        staticcall self._controller.available_balance(),
-        staticcall self._controller.admin_fees(),
-    )
-
-
 @external
 @view
 def maxWithdraw(_owner: address) -> uint256:
@@ -408,9 +409,13 @@ def maxWithdraw(_owner: address) -> uint256:
     @param _owner Address of the share owner
     @return Maximum withdrawable asset amount
     """
+    available: uint256 = 0
+    debt: uint256 = 0
+    fees: uint256 = 0
+    available, debt, fees = self._vault_state()
     return min(
-        self._convert_to_assets(self.balanceOf[_owner]),
-        self._available_balance(),
+        self._convert_to_assets(self.balanceOf[_owner], True, available + debt - fees),
+        crv_math.sub_or_zero(available, fees),
     )
 
 
@@ -461,8 +466,12 @@ def maxRedeem(_owner: address) -> uint256:
     @param _owner Address of the share owner
     @return Maximum redeemable share amount given the owner's balance and available liquidity
     """
+    available: uint256 = 0
+    debt: uint256 = 0
+    fees: uint256 = 0
+    available, debt, fees = self._vault_state()
     return min(
-        self._convert_to_shares(self._available_balance(), False),
+        self._convert_to_shares(crv_math.sub_or_zero(available, fees), False, available + debt - fees),
         self.balanceOf[_owner],
     )
 
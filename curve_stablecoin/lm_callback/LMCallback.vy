@@ -61,6 +61,10 @@ collateral_per_share: public(HashMap[int256, uint256])
 # Tracking of mining period
 inflation_rate: public(uint256)
 future_epoch_time: public(uint256)
+# Gauge weight of the week it was last read for, as `weight | week << 128`.
+# A week's weight is final once the week has started and most checkpoints
+# land in the same week as the previous one, so those skip GAUGE_CONTROLLER
+week_weight: uint256
 
 
 # Running integrals
@@ -84,6 +88,10 @@ I_rpc: public(ILMCallback.IntegralRPC)
 
 # Rewards per share:
 # I_rps[i] = integral(cs[i] * rrpc * dt) = sum(cs[i] * delta(I_rpc))
+#
+# A band only has to be brought up to date before cs[i] changes or before a
+# user's shares in it are checkpointed: in between I_rps[i] grows linearly
+# with I_rpc. Swaps and withdrawals leave the other bands stale.
 
 I_rps: public(HashMap[int256, ILMCallback.IntegralRPS])
 
@@ -144,9 +152,11 @@ def _attached() -> bool:
 def _checkpoint_collateral_shares(n_start: int256, collateral_per_share: DynArray[uint256, MAX_TICKS_UINT], size: int256):
     """
     @notice Checkpoint for shares in a set of bands
-    @dev Updates the CRV emission shares are entitled to receive
+    @dev Updates the CRV emission shares are entitled to receive. Bands are
+         only written when their collateral per share changes
     @param n_start Index of the first band to checkpoint
-    @param collateral_per_share Collateral per share ratio by bands
+    @param collateral_per_share New collateral per share ratio by bands, empty
+                                if it didn't change
     @param size The number of bands to checkpoint starting from `n_start`
     """
     if not self._attached():
@@ -168,12 +178,20 @@ def _checkpoint_collateral_shares(n_start: int256, collateral_per_share: DynArra
     delta_rpc: uint256 = 0
 
     if total_collateral > 0 and block.timestamp > I_rpc.t:
-        extcall GAUGE_CONTROLLER.checkpoint_gauge(self)
+        week_weight: uint256 = self.week_weight
+        week: uint256 = week_weight >> 128
+        w: uint256 = week_weight % 2**128
+        # I_rpc.t is not earlier than the week cached, so if that is the
+        # current week the gauge isn't needed at all
+        if week != block.timestamp // WEEK:
+            extcall GAUGE_CONTROLLER.checkpoint_gauge(self)
         prev_week_time: uint256 = I_rpc.t
         week_time: uint256 = min(unsafe_div(prev_week_time + WEEK, WEEK) * WEEK, block.timestamp)
 
         for week_iter: uint256 in range(500):
-            w: uint256 = staticcall GAUGE_CONTROLLER.gauge_relative_weight(self, prev_week_time)
+            if prev_week_time // WEEK != week:
+                week = prev_week_time // WEEK
+                w = staticcall GAUGE_CONTROLLER.gauge_relative_weight(self, prev_week_time)
 
             if prev_future_epoch >= prev_week_time and prev_future_epoch < week_time:
                 # If we went across one or multiple epochs, apply the rate
@@ -198,25 +216,43 @@ def _checkpoint_collateral_shares(n_start: int256, collateral_per_share: DynArra
             prev_week_time = week_time
             week_time = min(week_time + WEEK, block.timestamp)
 
-    # * Record the collateral per share values
-    # * Record integrals of rewards per share
+        if week != week_weight >> 128:
+            self.week_weight = w | (week << 128)
+
     I_rpc.t = block.timestamp
     I_rpc.rpc += delta_rpc
     self.I_rpc = I_rpc
     log ILMCallback.CheckpointRPC(rpc=I_rpc.rpc, t=I_rpc.t)
 
+    # Record the new collateral per share values. Integrals of rewards per
+    # share only have to be brought up to date where the value changes
     for i: int256 in range(size, bound=MAX_TICKS_INT):
+        if i >= convert(len(collateral_per_share), int256):
+            break
         _n: int256 = n_start + i
-
+        cps: uint256 = collateral_per_share[i]
         old_cps: uint256 = self.collateral_per_share[_n]
-        if len(collateral_per_share) > 0:
-            self.collateral_per_share[_n] = collateral_per_share[i]
+        if cps != old_cps:
+            self._checkpoint_band(_n, old_cps, I_rpc.rpc)
+            self.collateral_per_share[_n] = cps
 
-        I_rps: ILMCallback.IntegralRPS = self.I_rps[_n]
-        I_rps.rps += unsafe_div(old_cps * unsafe_sub(I_rpc.rpc, I_rps.rpc), 10**18)
-        I_rps.rpc = I_rpc.rpc
-        self.I_rps[_n] = I_rps
-        log ILMCallback.CheckpointBand(n=_n, rps=I_rps.rps, collateral_per_share=old_cps)
+
+@internal
+def _checkpoint_band(n: int256, cps: uint256, rpc: uint256) -> uint256:
+    """
+    @notice Bring the integral of rewards per share of band `n` up to `rpc`
+    @param n Index of the band
+    @param cps Collateral per share of the band since its last checkpoint
+    @param rpc Current integral of rewards per collateral
+    @return Rewards per share of the band
+    """
+    I_rps: ILMCallback.IntegralRPS = self.I_rps[n]
+    if I_rps.rpc != rpc:
+        I_rps.rps += unsafe_div(cps * unsafe_sub(rpc, I_rps.rpc), 10**18)
+        I_rps.rpc = rpc
+        self.I_rps[n] = I_rps
+        log ILMCallback.CheckpointBand(n=n, rps=I_rps.rps, collateral_per_share=cps)
+    return I_rps.rps
 
 
 @internal
@@ -233,6 +269,7 @@ def _checkpoint_user_shares(user: address, n_start: int256, old_user_shares: Dyn
         return
 
     rpu: uint256 = self.integrate_fraction[user]
+    rpc: uint256 = self.I_rpc.rpc
     for i: int256 in range(size, bound=MAX_TICKS_INT):
         _n: int256 = n_start + i
 
@@ -241,7 +278,7 @@ def _checkpoint_user_shares(user: address, n_start: int256, old_user_shares: Dyn
             old_user_shares_i = old_user_shares[i]
 
         I_rpu: ILMCallback.IntegralRPU = self.I_rpu[user][_n]
-        I_rps: uint256 = self.I_rps[_n].rps
+        I_rps: uint256 = self._checkpoint_band(_n, self.collateral_per_share[_n], rpc)
         d_rpu: uint256 = unsafe_div(old_user_shares_i * unsafe_sub(I_rps, I_rpu.rps), 10**18)
         I_rpu.rpu += d_rpu
         I_rpu.rps = I_rps
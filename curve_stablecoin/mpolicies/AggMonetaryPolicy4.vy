@@ -10,6 +10,11 @@
 # This version uses min(last day) debt when calculating per-market rates
 # Should be used for Controllers which update borrow rate too early (not at the end of every call)
 
+# Total debt is a running total of the debts of all controllers cached by rate_write():
+# every call only re-reads the debt of the calling controller, and all of them are
+# re-read once the total is older than debt_refresh_time (interest, or controllers
+# which use another policy, change the debt without calling rate_write here)
+
 from curve_std import ema
 from snekmate.utils import math
 
@@ -54,6 +59,9 @@ event SetExtraConst:
 event SetDebtRatioEmaTime:
     debt_ratio_ema_time: uint256
 
+event SetDebtRefreshTime:
+    debt_refresh_time: uint256
+
 
 admin: public(address)
 
@@ -72,6 +80,13 @@ MAX_CONTROLLERS: constant(uint256) = 50000
 n_controllers: public(uint256)
 controllers: public(address[MAX_CONTROLLERS])
 
+# Cache for debts of the controllers
+controller_debts: public(HashMap[address, uint256])
+is_cached_controller: HashMap[address, bool]
+cached_total_debt: public(uint256)
+last_debt_refresh: public(uint256)
+debt_refresh_time: public(uint256)
+
 
 struct DebtCandle:
     candle0: uint256  # earlier 1/2 day candle
@@ -92,6 +107,8 @@ MAX_EXP: constant(uint256) = 1000 * 10**18
 MAX_RATE: constant(uint256) = 43959106799  # 300% APY
 TARGET_REMAINDER: constant(uint256) = 10**17  # rate is x1.9 when 10% left before ceiling
 MAX_EXTRA_CONST: constant(uint256) = MAX_RATE
+DEFAULT_DEBT_REFRESH_TIME: constant(uint256) = 3600
+MAX_DEBT_REFRESH_TIME: constant(uint256) = DEBT_CANDLE_TIME
 
 
 @deploy
@@ -130,6 +147,7 @@ def __init__(admin: address,
     self.sigma = sigma
     self.target_debt_fraction = target_debt_fraction
     self.extra_const = extra_const
+    self.debt_refresh_time = DEFAULT_DEBT_REFRESH_TIME
 
     ema.__init__([ema.EMAConfig(ema_id=DEBT_RATIO_EMA_ID, initial_value=target_debt_fraction, ema_time=_debt_ratio_ema_time)])
 
@@ -200,6 +218,16 @@ def exp(power: int256) -> uint256:
     return convert(math._wad_exp(power), uint256)
 
 
+@internal
+@view
+def controller_debt(_controller: address) -> uint256:
+    # Broken controllers (reverting or not returning anything) count as zero debt
+    success: bool = False
+    res: Bytes[32] = empty(Bytes[32])
+    success, res = raw_call(_controller, method_id("total_debt()"), max_outsize=32, is_static_call=True, revert_on_failure=False)
+    return convert(res, uint256)
+
+
 @internal
 @view
 def get_total_debt(_for: address, ro: bool) -> (uint256, uint256):
@@ -215,10 +243,7 @@ def get_total_debt(_for: address, ro: bool) -> (uint256, uint256):
         if i >= n_cached_controllers:
             controller = staticcall CONTROLLER_FACTORY.controllers(i)
 
-        success: bool = False
-        res: Bytes[32] = empty(Bytes[32])
-        success, res = raw_call(controller, method_id("total_debt()"), max_outsize=32, is_static_call=True, revert_on_failure=False)
-        debt: uint256 = convert(res, uint256)
+        debt: uint256 = self.controller_debt(controller)
         total_debt += debt
         if controller == _for:
             debt_for = debt
@@ -226,6 +251,75 @@ def get_total_debt(_for: address, ro: bool) -> (uint256, uint256):
     return total_debt, debt_for
 
 
+@internal
+@view
+def get_cached_total_debt(_for: address) -> (uint256, uint256):
+    """
+    @notice Read-only version of the debts rate_write() would cache now
+    @dev Same result as get_total_debt(_for, True) if the debts of the controllers
+         other than _for did not change since they were cached
+    """
+    if block.timestamp >= self.last_debt_refresh + self.debt_refresh_time:
+        return self.get_total_debt(_for, True)
+
+    total_debt: uint256 = self.cached_total_debt
+    debt_for: uint256 = 0
+    if self.is_cached_controller[_for]:
+        debt_for = self.controller_debt(_for)
+        total_debt = total_debt + debt_for - self.controller_debts[_for]
+
+    # Controllers added to the factory after the last rate_write()
+    n_controllers: uint256 = self.n_controllers
+    n_factory_controllers: uint256 = staticcall CONTROLLER_FACTORY.n_collaterals()
+    for i: uint256 in range(n_controllers, n_factory_controllers, bound=MAX_CONTROLLERS):
+        controller: address = staticcall CONTROLLER_FACTORY.controllers(i)
+        debt: uint256 = self.controller_debt(controller)
+        total_debt += debt
+        if controller == _for:
+            debt_for = debt
+
+    return total_debt, debt_for
+
+
+@internal
+def update_total_debt(_for: address) -> (uint256, uint256):
+    """
+    @notice Update the cached debts and return the total debt and the debt of _for
+    @dev Only the debt of _for is read unless the cache is older than debt_refresh_time
+    """
+    n_controllers: uint256 = self.n_controllers
+    total_debt: uint256 = self.cached_total_debt
+
+    if block.timestamp >= self.last_debt_refresh + self.debt_refresh_time:
+        total_debt = 0
+        for i: uint256 in range(n_controllers, bound=MAX_CONTROLLERS):
+            controller: address = self.controllers[i]
+            debt: uint256 = self.controller_debt(controller)
+            self.controller_debts[controller] = debt
+            total_debt += debt
+        self.last_debt_refresh = block.timestamp
+
+    elif self.is_cached_controller[_for]:
+        debt: uint256 = self.controller_debt(_for)
+        total_debt = total_debt + debt - self.controller_debts[_for]
+        self.controller_debts[_for] = debt
+
+    # Update controller list
+    n_factory_controllers: uint256 = staticcall CONTROLLER_FACTORY.n_collaterals()
+    for i: uint256 in range(n_controllers, n_factory_controllers, bound=MAX_CONTROLLERS):
+        controller: address = staticcall CONTROLLER_FACTORY.controllers(i)
+        debt: uint256 = self.controller_debt(controller)
+        self.controllers[i] = controller
+        self.controller_debts[controller] = debt
+        self.is_cached_controller[controller] = True
+        total_debt += debt
+    if n_factory_controllers > n_controllers:
+        self.n_controllers = n_factory_controllers
+
+    self.cached_total_debt = total_debt
+    return total_debt, self.controller_debts[_for]
+
+
 @internal
 @view
 def read_candle(_for: address) -> uint256:
@@ -274,7 +368,7 @@ def read_debt(_for: address, ro: bool) -> (uint256, uint256):
     fresh_for: uint256 = 0
 
     if ro:
-        fresh_total, fresh_for = self.get_total_debt(_for, ro)
+        fresh_total, fresh_for = self.get_cached_total_debt(_for)
         if debt_total > 0:
             debt_total = min(debt_total, fresh_total)
         else:
@@ -286,7 +380,9 @@ def read_debt(_for: address, ro: bool) -> (uint256, uint256):
 
     else:
         if debt_total == 0 or debt_for == 0:
-            fresh_total, fresh_for = self.get_total_debt(_for, ro)
+            # Cached by rate_write() just before
+            fresh_total = self.cached_total_debt
+            fresh_for = self.controller_debts[_for]
             if debt_total == 0:
                 debt_total = fresh_total
             if debt_for == 0:
@@ -369,21 +465,10 @@ def rate_write(_for: address = msg.sender) -> uint256:
     """
     assert _for != TOTAL_DEBT_KEY  # dev: invalid controller
 
-    # Update controller list
-    n_controllers: uint256 = self.n_controllers
-    n_factory_controllers: uint256 = staticcall CONTROLLER_FACTORY.n_collaterals()
-    if n_factory_controllers > n_controllers:
-        self.n_controllers = n_factory_controllers
-        for i: uint256 in range(MAX_CONTROLLERS):
-            self.controllers[n_controllers] = staticcall CONTROLLER_FACTORY.controllers(n_controllers)
-            n_controllers += 1
-            if n_controllers >= n_factory_controllers:
-                break
-
     # Update candles
     total_debt: uint256 = 0
     debt_for: uint256 = 0
-    total_debt, debt_for = self.get_total_debt(_for, False)
+    total_debt, debt_for = self.update_total_debt(_for)
     self.save_candle(TOTAL_DEBT_KEY, total_debt)
     self.save_candle(_for, debt_for)
 
@@ -459,6 +544,19 @@ def set_debt_ratio_ema_time(_debt_ratio_ema_time: uint256):
     log SetDebtRatioEmaTime(debt_ratio_ema_time=_debt_ratio_ema_time)
 
 
+@external
+def set_debt_refresh_time(_debt_refresh_time: uint256):
+    """
+    @notice Set the maximum age of the cached total debt
+    @param _debt_refresh_time Time in seconds after which rate_write() re-reads the debts of all controllers
+    """
+    assert msg.sender == self.admin  # dev: only admin
+    assert _debt_refresh_time <= MAX_DEBT_REFRESH_TIME  # dev: debt refresh time too high
+
+    self.debt_refresh_time = _debt_refresh_time
+    log SetDebtRefreshTime(debt_refresh_time=_debt_refresh_time)
+
+
 @external
 @view
 def debt_ratio_ema_time() -> uint256:
@@ -31,6 +31,9 @@ BASE_IDX: public(immutable(uint256))
 QUOTE_IDX: public(immutable(uint256))
 NO_ARGUMENT: public(immutable(bool))
 
+# Price returned by `price_w` earlier in the current transaction (0 if none)
+cached_price: transient(uint256)
+
 
 @deploy
 def __init__(
@@ -106,9 +109,13 @@ def _price() -> uint256:
 def price() -> uint256:
     """
     @notice Price of the BASE coin denominated in the QUOTE coin (1e18-scaled).
+    @dev Reuses the price read by `price_w` in the same transaction, if any.
     @return The price reported by the configured pool.
     """
-    return self._price()
+    p: uint256 = self.cached_price
+    if p == 0:
+        p = self._price()
+    return p
 
 
 @external
@@ -116,6 +123,12 @@ def price_w() -> uint256:
     """
     @notice Stateful entrypoint mirroring `price` (as expected by controllers).
     @dev This oracle holds no state, so the returned value equals `price`.
+         The pool is only read by the first call in a transaction, the
+         following ones return the same price from transient storage.
     @return The price reported by the configured pool.
     """
-    return self._price()
+    p: uint256 = self.cached_price
+    if p == 0:
+        p = self._price()
+        self.cached_price = p
+    return p
@@ -26,6 +26,9 @@ COLLATERAL_IXS: public(immutable(DynArray[uint256, MAX_POOLS]))
 NO_ARGUMENT: public(immutable(DynArray[bool, MAX_POOLS]))
 POOL_COUNT: public(immutable(uint256))
 
+# Price returned by `price_w` earlier in the current transaction (0 if none)
+cached_price: transient(uint256)
+
 
 @deploy
 def __init__(
@@ -112,9 +115,13 @@ def _price() -> uint256:
 def price() -> uint256:
     """
     @notice Collateral price denominated in the borrowed token (1e18-scaled).
+    @dev Reuses the price read by `price_w` in the same transaction, if any.
     @return The chained price across all configured pools.
     """
-    return self._price()
+    p: uint256 = self.cached_price
+    if p == 0:
+        p = self._price()
+    return p
 
 
 @external
@@ -122,6 +129,12 @@ def price_w() -> uint256:
     """
     @notice Stateful entrypoint mirroring `price` (as expected by controllers).
     @dev This oracle holds no state, so the returned value equals `price`.
+         The pools are only read by the first call in a transaction, the
+         following ones return the same price from transient storage.
     @return The chained price across all configured pools.
     """
-    return self._price()
+    p: uint256 = self.cached_price
+    if p == 0:
+        p = self._price()
+        self.cached_price = p
+    return p
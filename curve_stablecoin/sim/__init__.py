@@ -0,0 +1,7 @@
+"""Off-chain Python models of the protocol contracts.
+
+Modules in this package mirror the on-chain integer math so that quotes and
+simulations can be computed without spinning up an EVM. They only depend on the
+standard library (NumPy is needed for the vectorized helpers, eth_abi for the
+`MarketLens` decoder and pyarrow for reading Parquet log dumps only).
+"""
@@ -0,0 +1,655 @@
+"""Event-sourced reconstruction of AMM bands and loans from logs.
+
+Instead of re-reading contract storage for every user in every block, the
+indexer replays the logs of the markets - `Deposit`, `Withdraw`,
+`TokenExchange` and `SetRate` of the AMM, `UserState` of the controller and
+`SetAmmFee` of the configurator - on top of a local copy of the state. Every
+handler is a transliteration of the contract code, so `bands_x`, `bands_y`,
+`total_shares`, the user ticks and the loans are bit-exact with the contracts
+and can be handed to `sim.llamma` and `sim.scanner` directly.
+
+Logs are read from a local dump, one record per log:
+
+    {"block": 19000000, "log_index": 12, "timestamp": 1705000000,
+     "address": "0x...", "event": "Deposit",
+     "args": {"provider": "0x...", "amount": 10**18, "n1": 3, "n2": 12}}
+
+either as JSON lines or as a Parquet file with the same columns (`args` as a
+struct or a JSON string). Integers may be strings. Two things are not in the
+logs and have to be added by whoever writes the dump:
+
+* `TokenExchange` records need `p_o`, the oracle price and antisandwich fee
+  the AMM traded at (`[price, fee]`, or just the price if the fee is 0),
+  because the band amounts after a trade depend on it. The replayed trade must
+  reproduce the logged amounts, otherwise `IndexerError` is raised.
+* `TokenExchange` and `UserState` records need the block `timestamp`, for
+  the base price of the trade and the rate multiplier of the loan.
+
+Logged amounts are rounded to the token decimals, which leaves two more
+things to infer. Whether a trade was an `exchange` or an `exchange_dy` is
+taken from the first of them reproducing the logged amounts, unless the
+record carries `use_in_amount` (True for `exchange`). `Withdraw` is 100%
+except for partial liquidations, where the smallest fraction reproducing the
+logged amounts is used unless the record carries `frac` (the argument of
+`AMM.withdraw`). Both are exact with 18 decimal tokens; for tokens with few
+decimals a wrong guess leaves the bands off by less than a unit of the token,
+so the dump should have these fields (e.g. from call traces) for them.
+
+`Indexer.sync` applies new records of a dump and periodically writes an
+atomic JSON checkpoint with the state and the read offset of every dump, so a
+restart only reads what was appended since:
+
+    indexer = Indexer.resume("checkpoint.json", [MarketConfig(...)])
+    indexer.sync("logs.jsonl", "checkpoint.json")
+    state = indexer.market(amm).amm_state(p_o, timestamp)
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from math import isqrt
+
+from curve_stablecoin.sim import llamma, scanner
+from curve_stablecoin.sim.evm_math import WAD
+from curve_stablecoin.sim.llamma import DEAD_SHARES, AMMRevert
+
+MAX_UINT256 = 2**256 - 1
+CHECKPOINT_VERSION = 1
+
+
+class IndexerError(Exception):
+    """Raised when a log can't be replayed on top of the indexed state."""
+
+
+def _int(value) -> int:
+    # Dumps store uint256 values as strings more often than not
+    return value if isinstance(value, int) else int(value, 0)
+
+
+def _timestamp(record: dict) -> int:
+    if record.get("timestamp") is None:
+        raise IndexerError(f"{record['event']} record without timestamp")
+    return _int(record["timestamp"])
+
+
+def _set(d: dict, key, value: int):
+    # Zero values are not stored, like in the contract storage
+    if value:
+        d[key] = value
+    else:
+        d.pop(key, None)
+
+
+@dataclass(frozen=True)
+class MarketConfig:
+    """
+    Immutable parameters of a market.
+
+    `base_price` is the `BASE_PRICE` the AMM was deployed with and `fee` the
+    initial AMM fee. `sqrt_band_ratio` defaults to the value computed by the
+    controller.
+    """
+
+    amm: str
+    controller: str
+    A: int
+    base_price: int
+    fee: int
+    borrowed_precision: int = 1
+    collateral_precision: int = 1
+    sqrt_band_ratio: int = 0
+
+    def __post_init__(self):
+        if self.sqrt_band_ratio == 0:
+            ratio = isqrt(10**36 * self.A // (self.A - 1))
+            object.__setattr__(self, "sqrt_band_ratio", ratio)
+
+    @classmethod
+    def from_boa(cls, amm, controller) -> "MarketConfig":
+        """Read the parameters of a titanoboa market."""
+        immutables = amm._immutables
+        return cls(
+            amm=str(amm.address),
+            controller=str(controller.address),
+            A=immutables.A,
+            base_price=immutables.BASE_PRICE,
+            fee=amm.fee(),
+            borrowed_precision=immutables.BORROWED_PRECISION,
+            collateral_precision=immutables.COLLATERAL_PRECISION,
+            sqrt_band_ratio=immutables.SQRT_BAND_RATIO,
+        )
+
+
+@dataclass
+class Loan:
+    """Last `UserState` of a loan and the rate multiplier it was logged at."""
+
+    collateral: int
+    borrowed: int
+    debt: int
+    n1: int
+    n2: int
+    liquidation_discount: int
+    rate_mul: int
+
+
+class MarketIndexer:
+    """Storage of one AMM and its controller, rebuilt from their logs."""
+
+    def __init__(self, config: MarketConfig):
+        self.config = config
+        self.fee = config.fee
+        self.rate = 0
+        self.rate_mul = WAD
+        self.rate_time = 0
+        self.active_band = 0
+        self.min_band = 0
+        self.max_band = 0
+        self.bands_x: dict[int, int] = {}
+        self.bands_y: dict[int, int] = {}
+        self.total_shares: dict[int, int] = {}
+        # user -> (n1, shares in bands n1, n1 + 1, ...)
+        self.user_shares: dict[str, tuple[int, list[int]]] = {}
+        self.loans: dict[str, Loan] = {}
+
+    def get_rate_mul(self, timestamp: int) -> int:
+        """Replicates `get_rate_mul` at `timestamp`."""
+        return self.rate_mul * (WAD + self.rate * (timestamp - self.rate_time)) // WAD
+
+    def amm_state(
+        self, p_o: tuple[int, int], timestamp: int, copy: bool = True
+    ) -> llamma.AMMState:
+        """
+        Snapshot for `sim.llamma` at `timestamp`, with oracle price and
+        antisandwich fee `p_o`. Without `copy` the snapshot shares the band
+        dicts with the indexer and is only valid until the next log.
+        """
+        bands_x = self.bands_x
+        bands_y = self.bands_y
+        total_shares = self.total_shares
+        if copy:
+            bands_x = dict(bands_x)
+            bands_y = dict(bands_y)
+            total_shares = dict(total_shares)
+        return llamma.AMMState(
+            A=self.config.A,
+            base_price=self.config.base_price * self.get_rate_mul(timestamp) // WAD,
+            fee=self.fee,
+            p_o=tuple(p_o),
+            active_band=self.active_band,
+            min_band=self.min_band,
+            max_band=self.max_band,
+            bands_x=bands_x,
+            bands_y=bands_y,
+            borrowed_precision=self.config.borrowed_precision,
+            collateral_precision=self.config.collateral_precision,
+            total_shares=total_shares,
+            sqrt_band_ratio=self.config.sqrt_band_ratio,
+        )
+
+    def user_ticks(self, user: str) -> tuple[tuple[int, int], list[int]]:
+        """Bands and shares of `user`, as `read_user_tick_numbers` and
+        `read_user_ticks` return them (`((0, 0), [])` without liquidity)."""
+        if user not in self.user_shares:
+            return (0, 0), []
+        n1, shares = self.user_shares[user]
+        return (n1, n1 + len(shares) - 1), list(shares)
+
+    def debt(self, user: str, timestamp: int) -> int:
+        """Replicates `debt(user)` at `timestamp`."""
+        loan = self.loans.get(user)
+        if loan is None:
+            return 0
+        rate_mul = self.get_rate_mul(timestamp)
+        return -(-loan.debt * rate_mul // loan.rate_mul)
+
+    def positions(self, timestamp: int) -> list[scanner.Position]:
+        """Positions of all loans at `timestamp`, for `LiquidationScanner`."""
+        out = []
+        for user, loan in self.loans.items():
+            ns, ticks = self.user_ticks(user)
+            out.append(
+                scanner.Position(
+                    user=user,
+                    ns=ns,
+                    ticks=ticks,
+                    debt=self.debt(user, timestamp),
+                    liquidation_discount=loan.liquidation_discount,
+                )
+            )
+        return out
+
+    def apply(self, record: dict):
+        """Apply one log of this market (see the module docstring)."""
+        event = record["event"]
+        args = record["args"]
+        if event == "Deposit":
+            self._deposit(
+                args["provider"],
+                _int(args["amount"]),
+                _int(args["n1"]),
+                _int(args["n2"]),
+            )
+        elif event == "Withdraw":
+            self._withdraw(
+                args["provider"],
+                _int(args["amount_borrowed"]),
+                _int(args["amount_collateral"]),
+                record.get("frac"),
+            )
+        elif event == "TokenExchange":
+            if record.get("p_o") is None:
+                raise IndexerError("TokenExchange record without p_o")
+            p_o = record["p_o"]
+            p_o = (
+                (_int(p_o[0]), _int(p_o[1]))
+                if isinstance(p_o, list)
+                else (_int(p_o), 0)
+            )
+            self._exchange(
+                _int(args["sold_id"]),
+                _int(args["tokens_sold"]),
+                _int(args["tokens_bought"]),
+                p_o,
+                _timestamp(record),
+                record.get("use_in_amount"),
+            )
+        elif event == "SetRate":
+            self.rate = _int(args["rate"])
+            self.rate_mul = _int(args["rate_mul"])
+            self.rate_time = _int(args["time"])
+        elif event == "SetAmmFee":
+            self.fee = _int(args["fee"])
+        elif event == "UserState":
+            self._user_state(args, _timestamp(record))
+        # Other controller logs only explain how UserState came about
+
+    def _deposit(self, user: str, amount: int, n1: int, n2: int):
+        if user in self.user_shares:
+            raise IndexerError(f"Deposit of {user} who has liquidity")
+        n_bands = n2 - n1 + 1
+        y_total = amount * self.config.collateral_precision
+        y_per_band = y_total // n_bands
+
+        # Autoskip of the empty bands above the deposit
+        if n1 <= self.active_band:
+            self.active_band = n1 - 1
+
+        shares = []
+        for i, n in enumerate(range(n1, n2 + 1)):
+            if self.bands_x.get(n, 0) != 0:
+                raise IndexerError(f"Deposit into band {n} which is not empty")
+            y = y_per_band if i != 0 else y_total - y_per_band * (n_bands - 1)
+            total_y = self.bands_y.get(n, 0)
+            s = self.total_shares.get(n, 0)
+            ds = (s + DEAD_SHARES) * y // (total_y + 1)
+            shares.append(ds)
+            _set(self.total_shares, n, s + ds)
+            _set(self.bands_y, n, total_y + y)
+
+        self.min_band = min(self.min_band, n1)
+        self.max_band = max(self.max_band, n2)
+        self.user_shares[user] = (n1, shares)
+
+    def _withdrawal(self, user: str, frac: int):
+        # The contract's `withdraw` without writing to storage
+        n1, shares = self.user_shares[user]
+        min_band = self.min_band
+        max_band = n1 - 1
+        total_x = 0
+        total_y = 0
+        bands = []
+        user_shares = []
+        for i, share in enumerate(shares):
+            n = n1 + i
+            x = self.bands_x.get(n, 0)
+            y = self.bands_y.get(n, 0)
+            ds = frac * share // WAD
+            s = self.total_shares.get(n, 0)
+            if ds > s:
+                raise IndexerError(f"Withdrawal of more shares than band {n} has")
+            new_shares = s - ds
+            s += DEAD_SHARES
+            dx = (x + 1) * ds // s
+            dy = (y + 1) * ds // s
+            x -= dx
+            y -= dy
+            # The last withdrawal leaves the dust in the AMM
+            if new_shares == 0:
+                x = 0
+                y = 0
+            if n == min_band and x == 0 and y == 0:
+                min_band += 1
+            if x > 0 or y > 0:
+                max_band = n
+            bands.append((n, x, y, new_shares))
+            user_shares.append(share - ds)
+            total_x += dx
+            total_y += dy
+        amounts = (
+            total_x // self.config.borrowed_precision,
+            total_y // self.config.collateral_precision,
+        )
+        return amounts, bands, user_shares, min_band, max_band
+
+    def _withdraw(self, user: str, amount_x: int, amount_y: int, frac=None):
+        if user not in self.user_shares:
+            raise IndexerError(f"Withdraw of {user} who has no liquidity")
+        amounts = (amount_x, amount_y)
+        if frac is None:
+            frac = WAD
+            if self._withdrawal(user, WAD)[0] != amounts:
+                # Partial liquidation: both amounts grow with frac
+                lo, hi = 0, WAD
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    x, y = self._withdrawal(user, mid)[0]
+                    if x >= amount_x and y >= amount_y:
+                        hi = mid
+                    else:
+                        lo = mid + 1
+                frac = lo
+        frac = _int(frac)
+
+        result, bands, user_shares, min_band, max_band = self._withdrawal(user, frac)
+        if result != amounts:
+            raise IndexerError(
+                f"Withdraw of {user}: logged {amounts}, replayed {result}"
+            )
+        n1 = self.user_shares[user][0]
+        for n, x, y, s in bands:
+            _set(self.bands_x, n, x)
+            _set(self.bands_y, n, y)
+            _set(self.total_shares, n, s)
+        if frac == WAD:
+            del self.user_shares[user]
+        else:
+            self.user_shares[user] = (n1, user_shares)
+        self.min_band = min_band
+        if self.max_band <= n1 + len(bands) - 1:
+            self.max_band = max_band
+
+    def _exchange(
+        self,
+        i: int,
+        tokens_sold: int,
+        tokens_bought: int,
+        p_o: tuple[int, int],
+        timestamp: int,
+        use_in_amount=None,
+    ):
+        pump = i == 0
+        precisions = (self.config.borrowed_precision, self.config.collateral_precision)
+        if not pump:
+            precisions = precisions[::-1]
+        state = self.amm_state(p_o, timestamp, copy=False)
+
+        # `exchange` spends a given input and `exchange_dy` buys a given
+        # output, and the amount can exceed the liquidity. Only the outcome is
+        # logged, so these are tried until one of them reproduces it
+        candidates = []
+        if use_in_amount is None or use_in_amount:
+            candidates.append((llamma.calc_swap_out, tokens_sold * precisions[0]))
+        if not use_in_amount:
+            candidates.append((llamma.calc_swap_in, tokens_bought * precisions[1]))
+        if use_in_amount is None or use_in_amount:
+            candidates.append((llamma.calc_swap_out, MAX_UINT256))
+        if not use_in_amount:
+            candidates.append((llamma.calc_swap_in, MAX_UINT256))
+        for calc, amount in candidates:
+            try:
+                out = calc(state, pump, amount, p_o, *precisions)
+            except AMMRevert:
+                continue
+            done = (out.in_amount // precisions[0], out.out_amount // precisions[1])
+            if done == (tokens_sold, tokens_bought):
+                break
+        else:
+            raise IndexerError(
+                f"TokenExchange of {tokens_sold} for {tokens_bought} can't be "
+                f"replayed at p_o {p_o}"
+            )
+
+        n = min(out.n1, out.n2)
+        n_diff = abs(out.n2 - out.n1)
+        for k in range(n_diff + 1):
+            last = out.last_tick_j if n == out.n2 else 0
+            if pump:
+                x, y = out.ticks_in[k], last
+            else:
+                x, y = last, out.ticks_in[n_diff - k]
+            _set(self.bands_x, n, x)
+            _set(self.bands_y, n, y)
+            n += 1
+        self.active_band = out.n2
+
+    def _user_state(self, args: dict, timestamp: int):
+        user = args["user"]
+        debt = _int(args["debt"])
+        if debt == 0:
+            self.loans.pop(user, None)
+            return
+        loan = Loan(
+            collateral=_int(args["collateral"]),
+            borrowed=_int(args["borrowed"]),
+            debt=debt,
+            n1=_int(args["n1"]),
+            n2=_int(args["n2"]),
+            liquidation_discount=_int(args["liquidation_discount"]),
+            rate_mul=self.get_rate_mul(timestamp),
+        )
+        if user in self.user_shares and self.user_ticks(user)[0] != (loan.n1, loan.n2):
+            raise IndexerError(f"UserState of {user} doesn't match its bands")
+        self.loans[user] = loan
+
+    def to_dict(self) -> dict:
+        """JSON-serializable state, see `from_dict`."""
+        bands = sorted(set(self.bands_x) | set(self.bands_y) | set(self.total_shares))
+        return {
+            "config": asdict(self.config),
+            "fee": self.fee,
+            "rate": self.rate,
+            "rate_mul": self.rate_mul,
+            "rate_time": self.rate_time,
+            "active_band": self.active_band,
+            "min_band": self.min_band,
+            "max_band": self.max_band,
+            "bands": [
+                [
+                    n,
+                    self.bands_x.get(n, 0),
+                    self.bands_y.get(n, 0),
+                    self.total_shares.get(n, 0),
+                ]
+                for n in bands
+            ],
+            "user_shares": {u: [n1, s] for u, (n1, s) in self.user_shares.items()},
+            "loans": {u: asdict(loan) for u, loan in self.loans.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "MarketIndexer":
+        m = cls(MarketConfig(**d["config"]))
+        for key in (
+            "fee",
+            "rate",
+            "rate_mul",
+            "rate_time",
+            "active_band",
+            "min_band",
+            "max_band",
+        ):
+            setattr(m, key, d[key])
+        for n, x, y, s in d["bands"]:
+            _set(m.bands_x, n, x)
+            _set(m.bands_y, n, y)
+            _set(m.total_shares, n, s)
+        m.user_shares = {u: (n1, s) for u, (n1, s) in d["user_shares"].items()}
+        m.loans = {u: Loan(**loan) for u, loan in d["loans"].items()}
+        return m
+
+
+def _record(row: dict) -> dict:
+    for key in ("args", "p_o"):
+        if isinstance(row.get(key), str):
+            row[key] = json.loads(row[key])
+    return row
+
+
+def read_jsonl(path, offset: int = 0):
+    """
+    Yield `(next_offset, record)` for every line of a JSON lines dump from
+    byte `offset`. A last line without a newline is still being written and
+    is not read.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            if line.strip():
+                yield offset, _record(json.loads(line))
+
+
+def _parquet():
+    try:
+        import pyarrow.parquet
+    except ImportError as e:  # pragma: no cover
+        raise ImportError(
+            "Reading Parquet dumps requires pyarrow (pip install pyarrow)"
+        ) from e
+    return pyarrow.parquet
+
+
+def read_parquet(path, offset: int = 0):
+    """
+    Yield `(next_offset, record)` for every row of a Parquet dump from row
+    `offset`. Row groups before it are not read.
+    """
+    f = _parquet().ParquetFile(path)
+    start = 0
+    for g in range(f.num_row_groups):
+        n_rows = f.metadata.row_group(g).num_rows
+        if start + n_rows > offset:
+            rows = f.read_row_group(g).to_pylist()
+            for i in range(max(offset - start, 0), n_rows):
+                yield start + i + 1, _record(rows[i])
+        start += n_rows
+
+
+def read_dump(path, offset: int = 0):
+    """`read_parquet` for `.parquet` files, `read_jsonl` otherwise."""
+    if str(path).endswith(".parquet"):
+        return read_parquet(path, offset)
+    return read_jsonl(path, offset)
+
+
+class Indexer:
+    """
+    Indexer of several markets fed from the same stream of logs.
+
+    Logs are expected in chain order. Every applied log moves `cursor` to its
+    `(block, log_index)` and older logs are skipped, so overlapping dumps and
+    replays after a crash are harmless. `offsets` keeps how far every dump
+    has been read.
+    """
+
+    def __init__(self, markets: list[MarketConfig]):
+        self.markets: dict[str, MarketIndexer] = {}
+        self.cursor = (-1, -1)
+        self.offsets: dict[str, int] = {}
+        for config in markets:
+            self.add_market(MarketIndexer(config))
+
+    def add_market(self, market: MarketIndexer):
+        self.markets[market.config.amm.lower()] = market
+        # Logs of the controller are routed to the same market
+        self.markets[market.config.controller.lower()] = market
+
+    def market(self, address: str) -> MarketIndexer:
+        """Market of an AMM or controller address."""
+        return self.markets[str(address).lower()]
+
+    def apply(self, record: dict) -> bool:
+        """Apply a log if it is new and belongs to one of the markets."""
+        position = (_int(record["block"]), _int(record["log_index"]))
+        if position <= self.cursor:
+            return False
+        address = (
+            record["args"]["controller"]
+            if record["event"] == "SetAmmFee"
+            else record["address"]
+        )
+        market = self.markets.get(str(address).lower())
+        if market is not None:
+            market.apply(record)
+        self.cursor = position
+        return market is not None
+
+    def sync(self, path, checkpoint=None, every: int = 10000) -> int:
+        """
+        Apply the records appended to the dump at `path` since the last sync,
+        writing a checkpoint every `every` records and at the end.
+
+        @return Number of records read
+        """
+        source = str(path)
+        n = 0
+        for offset, record in read_dump(path, self.offsets.get(source, 0)):
+            self.apply(record)
+            self.offsets[source] = offset
+            n += 1
+            if checkpoint is not None and n % every == 0:
+                self.save(checkpoint)
+        if checkpoint is not None:
+            self.save(checkpoint)
+        return n
+
+    def to_dict(self) -> dict:
+        markets = {id(m): m for m in self.markets.values()}
+        return {
+            "version": CHECKPOINT_VERSION,
+            "cursor": list(self.cursor),
+            "offsets": self.offsets,
+            "markets": [m.to_dict() for m in markets.values()],
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Indexer":
+        if d.get("version") != CHECKPOINT_VERSION:
+            raise IndexerError(f"Unsupported checkpoint version {d.get('version')}")
+        indexer = cls([])
+        indexer.cursor = tuple(d["cursor"])
+        indexer.offsets = dict(d["offsets"])
+        for m in d["markets"]:
+            indexer.add_market(MarketIndexer.from_dict(m))
+        return indexer
+
+    def save(self, path):
+        """Write a checkpoint atomically: a crash leaves the previous one."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.to_dict(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path) -> "Indexer":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def resume(cls, path, markets: list[MarketConfig]) -> "Indexer":
+        """
+        Load the checkpoint at `path` if there is one, otherwise start from
+        scratch. Markets which are not in the checkpoint yet are added.
+        """
+        if not os.path.exists(path):
+            return cls(markets)
+        indexer = cls.load(path)
+        for config in markets:
+            if config.amm.lower() not in indexer.markets:
+                indexer.add_market(MarketIndexer(config))
+        return indexer
@@ -0,0 +1,139 @@
+"""Calldata encoder and result decoder for `MarketLens.vy`.
+
+The lens returns snapshots of many markets (AMM bands around the active band,
+controller totals, rate, vault supply, oracle price) or of many loans in a
+single `eth_call`. It holds no state, so instead of deploying it its runtime
+code can be put at any address with a state override:
+
+    data = lens.encode_markets(controllers, n_bands=10)
+    raw = w3.eth.call({"to": LENS, "data": data}, "latest", {LENS: {"code": code}})
+    markets = lens.decode_markets(raw)
+
+Needs `eth_abi`, which is installed together with titanoboa.
+"""
+
+from dataclasses import dataclass, fields
+
+from eth_abi import decode, encode
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+
+
+@dataclass
+class MarketSnapshot:
+    """Mirror of `MarketLens.MarketSnapshot`."""
+
+    controller: str
+    amm: str
+    vault: str  # zero address for mint markets
+    price_oracle: int
+    amm_price: int
+    base_price: int
+    fee: int
+    rate: int
+    rate_mul: int
+    active_band: int
+    min_band: int
+    max_band: int
+    total_debt: int
+    n_loans: int
+    available_balance: int
+    admin_fees: int
+    vault_total_supply: int
+    band_from: int
+    bands_x: list[int]
+    bands_y: list[int]
+
+    def band(self, n: int) -> tuple[int, int]:
+        """(bands_x[n], bands_y[n]) of the AMM, (0, 0) outside of the snapshot."""
+        i = n - self.band_from
+        if 0 <= i < len(self.bands_x):
+            return self.bands_x[i], self.bands_y[i]
+        return 0, 0
+
+
+@dataclass
+class UserSnapshot:
+    """Mirror of `MarketLens.UserSnapshot`, all zeros but the addresses if the
+    user has no loan."""
+
+    controller: str
+    user: str
+    loan_exists: bool
+    collateral: int
+    borrowed: int
+    debt: int
+    N: int
+    n1: int
+    n2: int
+    p_up: int
+    p_down: int
+    health: int
+
+
+MARKET_SNAPSHOT_TYPE = (
+    "(address,address,address,uint256,uint256,uint256,uint256,uint256,uint256,"
+    "int256,int256,int256,uint256,uint256,uint256,uint256,uint256,int256,"
+    "uint256[],uint256[])"
+)
+USER_SNAPSHOT_TYPE = (
+    "(address,address,bool,uint256,uint256,uint256,uint256,int256,int256,"
+    "uint256,uint256,int256)"
+)
+
+
+def _call(signature: str, types: list[str], args: list) -> bytes:
+    return function_signature_to_4byte_selector(signature) + encode(types, args)
+
+
+def encode_markets(controllers: list[str], n_bands: int) -> bytes:
+    """Calldata of `markets(controllers, n_bands)`."""
+    return _call(
+        "markets(address[],uint256)", ["address[]", "uint256"], [controllers, n_bands]
+    )
+
+
+def encode_lend_markets(factory: str, start: int, limit: int, n_bands: int) -> bytes:
+    """Calldata of `lend_markets(factory, start, limit, n_bands)`."""
+    types = ["address", "uint256", "uint256", "uint256"]
+    return _call(
+        "lend_markets(address,uint256,uint256,uint256)",
+        types,
+        [factory, start, limit, n_bands],
+    )
+
+
+def encode_mint_markets(factory: str, start: int, limit: int, n_bands: int) -> bytes:
+    """Calldata of `mint_markets(factory, start, limit, n_bands)`."""
+    types = ["address", "uint256", "uint256", "uint256"]
+    return _call(
+        "mint_markets(address,uint256,uint256,uint256)",
+        types,
+        [factory, start, limit, n_bands],
+    )
+
+
+def encode_users(controllers: list[str], users: list[str]) -> bytes:
+    """Calldata of `users(controllers, users)`."""
+    return _call(
+        "users(address[],address[])", ["address[]", "address[]"], [controllers, users]
+    )
+
+
+def _decode(cls, abi_type: str, data: bytes) -> list:
+    # eth_abi returns lowercase addresses
+    convert = [to_checksum_address if f.type is str else None for f in fields(cls)]
+    (rows,) = decode([abi_type + "[]"], data)
+    return [cls(*(f(v) if f else v for f, v in zip(convert, row))) for row in rows]
+
+
+def decode_markets(data: bytes) -> list[MarketSnapshot]:
+    """Decode the result of `markets`, `lend_markets` or `mint_markets`."""
+    markets = _decode(MarketSnapshot, MARKET_SNAPSHOT_TYPE, data)
+    for m in markets:
+        m.bands_x, m.bands_y = list(m.bands_x), list(m.bands_y)
+    return markets
+
+
+def decode_users(data: bytes) -> list[UserSnapshot]:
+    """Decode the result of `users`."""
+    return _decode(UserSnapshot, USER_SNAPSHOT_TYPE, data)
@@ -0,0 +1,950 @@
+"""Pure-Python reference engine for the LLAMMA band math in `AMM.vy`.
+
+Every function here is a transliteration of the contract code with the same
+integer rounding, so results are bit-exact with the deployed AMM for the same
+state. The state is captured once in an `AMMState` snapshot (for example with
+`AMMState.from_contract`) and can then be quoted any number of times without
+EVM round trips.
+
+`quote_dxdy_many` / `quote_dydx_many` walk the bands once and then price a
+whole array of trade sizes with NumPy object arrays, which is what bots and
+dashboards quoting many sizes per block should use.
+"""
+
+from dataclasses import dataclass, field
+from math import isqrt
+
+from curve_stablecoin.sim.evm_math import WAD, sdiv, smod, wad_exp, wad_ln
+
+# Mirrored from curve_stablecoin/constants.vy
+MAX_TICKS_UINT = 50
+MAX_SKIP_TICKS_UINT = 1024
+DEAD_SHARES = 1000
+
+# Mirrored from AMM.vy
+PREV_P_O_DELAY = 2 * 60
+MAX_P_O_CHG = 12500 * 10**14
+
+
+class AMMRevert(Exception):
+    """Raised where the contract would revert."""
+
+
+def _sub(a: int, b: int) -> int:
+    # Checked uint256 subtraction
+    if b > a:
+        raise AMMRevert("uint256 underflow")
+    return a - b
+
+
+def _sub_or_zero(a: int, b: int) -> int:
+    return a - b if a > b else 0
+
+
+@dataclass
+class DetailedTrade:
+    """Mirror of `IAMM.DetailedTrade`."""
+
+    in_amount: int = 0
+    out_amount: int = 0
+    n1: int = 0
+    n2: int = 0
+    ticks_in: list[int] = field(default_factory=list)
+    last_tick_j: int = 0
+
+
+@dataclass
+class AMMState:
+    """
+    Snapshot of everything the AMM swap math reads.
+
+    `base_price` is the *current* `get_base_price()` (i.e. with the rate
+    multiplier already applied) and `p_o` is the limited oracle price together
+    with the antisandwich fee, as returned by `_price_oracle_ro()`.
+    """
+
+    A: int
+    base_price: int
+    fee: int
+    p_o: tuple[int, int]
+    active_band: int
+    min_band: int
+    max_band: int
+    bands_x: dict[int, int]
+    bands_y: dict[int, int]
+    borrowed_precision: int = 1
+    collateral_precision: int = 1
+    # Only needed for user-level math (get_xy_up, get_sum_xy)
+    total_shares: dict[int, int] = field(default_factory=dict)
+    sqrt_band_ratio: int = 0
+
+    def __post_init__(self):
+        self.Aminus1 = self.A - 1
+        self.A2 = self.A**2
+        self.Aminus12 = self.Aminus1**2
+        self.log_A_ratio = wad_ln(self.A * WAD // self.Aminus1)
+        pow_ = WAD
+        for _ in range(50):
+            pow_ = pow_ * self.A // self.Aminus1
+        self.max_oracle_dn_pow = pow_
+
+    @classmethod
+    def from_contract(
+        cls, amm, borrowed_token, collateral_token, p_o: tuple[int, int] | None = None
+    ) -> "AMMState":
+        """
+        Read a snapshot from a deployed AMM (any object exposing the AMM ABI).
+
+        The antisandwich fee is not exposed by the AMM ABI, so unless `p_o` is
+        passed explicitly it is assumed to be 0 (which is the case once the
+        oracle has been stable for `PREV_P_O_DELAY`).
+        """
+        if p_o is None:
+            p_o = (amm.price_oracle(), 0)
+        min_band = amm.min_band()
+        max_band = amm.max_band()
+        bands = range(min_band, max_band + 1)
+        return cls(
+            A=amm.A(),
+            base_price=amm.get_base_price(),
+            fee=amm.fee(),
+            p_o=tuple(p_o),
+            active_band=amm.active_band(),
+            min_band=min_band,
+            max_band=max_band,
+            bands_x={n: amm.bands_x(n) for n in bands},
+            bands_y={n: amm.bands_y(n) for n in bands},
+            borrowed_precision=10 ** (18 - borrowed_token.decimals()),
+            collateral_precision=10 ** (18 - collateral_token.decimals()),
+        )
+
+    @classmethod
+    def from_boa(cls, amm, p_o: tuple[int, int] | None = None) -> "AMMState":
+        """
+        Read a full snapshot from a titanoboa AMM in one storage dump,
+        including `total_shares` and `SQRT_BAND_RATIO` which have no getters.
+        """
+        storage = amm._storage
+        immutables = amm._immutables
+        if p_o is None:
+            p_o = (amm.price_oracle(), 0)
+        return cls(
+            A=immutables.A,
+            base_price=amm.get_base_price(),
+            fee=storage.fee.get(),
+            p_o=tuple(p_o),
+            active_band=storage.active_band.get(),
+            min_band=storage.min_band.get(),
+            max_band=storage.max_band.get(),
+            bands_x=dict(storage.bands_x.get()),
+            bands_y=dict(storage.bands_y.get()),
+            borrowed_precision=immutables.BORROWED_PRECISION,
+            collateral_precision=immutables.COLLATERAL_PRECISION,
+            total_shares=dict(storage.total_shares.get()),
+            sqrt_band_ratio=immutables.SQRT_BAND_RATIO,
+        )
+
+    def band_x(self, n: int) -> int:
+        return self.bands_x.get(n, 0)
+
+    def band_y(self, n: int) -> int:
+        return self.bands_y.get(n, 0)
+
+
+def limit_p_o(
+    p: int, old_p_o: int, old_dfee: int, dt_since_update: int
+) -> tuple[int, int]:
+    """Replicates `limit_p_o`, with `dt_since_update = block.timestamp - prev_p_o_time`."""
+    p_new = p
+    dt = PREV_P_O_DELAY - min(PREV_P_O_DELAY, dt_since_update)
+    ratio = 0
+    if dt > 0:
+        if p > old_p_o:
+            ratio = old_p_o * 10**18 // p
+            if ratio < 10**36 // MAX_P_O_CHG:
+                p_new = old_p_o * MAX_P_O_CHG // 10**18
+                ratio = 10**36 // MAX_P_O_CHG
+        else:
+            ratio = p * 10**18 // old_p_o
+            if ratio < 10**36 // MAX_P_O_CHG:
+                p_new = old_p_o * 10**18 // MAX_P_O_CHG
+                ratio = 10**36 // MAX_P_O_CHG
+        ratio = min(
+            (10**18 + old_dfee - ratio**3 // 10**36) * dt // PREV_P_O_DELAY,
+            10**18 - 1,
+        )
+    return p_new, ratio
+
+
+def get_dynamic_fee(state: AMMState, p_o: int, p_o_up: int) -> int:
+    """Replicates `get_dynamic_fee`."""
+    p_c_d = p_o**2 // p_o_up * p_o // p_o_up
+    p_c_u = p_c_d * state.A // state.Aminus1 * state.A // state.Aminus1
+    if p_o < p_c_d:
+        return (p_c_d - p_o) * (10**18 // 4) // p_c_d
+    elif p_o > p_c_u:
+        return (p_o - p_c_u) * (10**18 // 4) // p_o
+    return 0
+
+
+def p_oracle_up(state: AMMState, n: int) -> int:
+    """Replicates `_p_oracle_up`."""
+    exp_result = wad_exp(-n * state.log_A_ratio)
+    if exp_result <= 1000:
+        raise AMMRevert("dev: limit precision of the multiplier")
+    return state.base_price * exp_result // WAD
+
+
+def p_oracle_down(state: AMMState, n: int) -> int:
+    return p_oracle_up(state, n + 1)
+
+
+def p_current_down(state: AMMState, n: int) -> int:
+    """Replicates `_p_current_band(n)`."""
+    p_base = p_oracle_up(state, n)
+    p_o = state.p_o[0]
+    return p_o**2 // p_base * p_o // p_base
+
+
+def p_current_up(state: AMMState, n: int) -> int:
+    return p_current_down(state, n + 1)
+
+
+def get_y0(state: AMMState, x: int, y: int, p_o: int, p_o_up: int) -> int:
+    """Replicates `_get_y0`."""
+    if p_o == 0:
+        raise AMMRevert("p_o == 0")
+    A = state.A
+    b = 0
+    if x != 0:
+        b = p_o_up * state.Aminus1 * x // p_o
+    if y != 0:
+        b += A * p_o**2 // p_o_up * y // 10**18
+    if x > 0 and y > 0:
+        D = b**2 + (4 * A * p_o) * y // 10**18 * x
+        return (b + isqrt(D)) * 10**18 // (2 * A * p_o)
+    return b * 10**18 // (A * p_o)
+
+
+def get_p(
+    state: AMMState, n: int | None = None, x: int | None = None, y: int | None = None
+) -> int:
+    """Replicates `_get_p` (defaults to the active band, i.e. `get_p()`)."""
+    if n is None:
+        n = state.active_band
+    if x is None:
+        x = state.band_x(n)
+    if y is None:
+        y = state.band_y(n)
+    A = state.A
+    p_o_up = p_oracle_up(state, n)
+    p_o = state.p_o[0]
+    if p_o_up == 0:
+        raise AMMRevert("p_o_up == 0")
+
+    if x == 0:
+        if y == 0:
+            return p_o**2 // p_o_up * p_o // p_o_up * A // state.Aminus1
+        return p_o**2 // p_o_up * p_o // p_o_up
+    if y == 0:
+        p_o_up = p_o_up * state.Aminus1 // A
+        return p_o**2 // p_o_up * p_o // p_o_up
+
+    y0 = get_y0(state, x, y, p_o, p_o_up)
+    f = A * y0 * p_o // p_o_up * p_o
+    g = state.Aminus1 * y0 * p_o_up // p_o
+    return (f + x * 10**18) // (g + y)
+
+
+def _band_invariant(
+    state: AMMState, x: int, y: int, p_o: int, p_o_up: int
+) -> tuple[int, int, int]:
+    y0 = get_y0(state, x, y, p_o, p_o_up)
+    f = state.A * y0 * p_o // p_o_up * p_o // 10**18
+    g = state.Aminus1 * y0 * p_o_up // p_o
+    return f, g, (f + x) * (g + y)
+
+
+def _antifee(dynamic_fee: int) -> int:
+    return (10**18) ** 2 // (10**18 - min(dynamic_fee, 10**18 - 1))
+
+
+def calc_swap_out(
+    state: AMMState,
+    pump: bool,
+    in_amount: int,
+    p_o: tuple[int, int],
+    in_precision: int,
+    out_precision: int,
+) -> DetailedTrade:
+    """Replicates `calc_swap_out` (amounts are in 18-decimal internal units)."""
+    A = state.A
+    Aminus1 = state.Aminus1
+    min_band = state.min_band
+    max_band = state.max_band
+    out = DetailedTrade()
+    out.n2 = state.active_band
+    p_o_up = p_oracle_up(state, out.n2)
+    x = state.band_x(out.n2)
+    y = state.band_y(out.n2)
+
+    in_amount_left = in_amount
+    fee = max(state.fee, p_o[1])
+    j = MAX_TICKS_UINT
+
+    for i in range(MAX_TICKS_UINT + MAX_SKIP_TICKS_UINT):
+        f = 0
+        g = 0
+        Inv = 0
+        dynamic_fee = fee
+
+        if x > 0 or y > 0:
+            if j == MAX_TICKS_UINT:
+                out.n1 = out.n2
+                j = 0
+            f, g, Inv = _band_invariant(state, x, y, p_o[0], p_o_up)
+            dynamic_fee = max(get_dynamic_fee(state, p_o[0], p_o_up), fee)
+
+        antifee = _antifee(dynamic_fee)
+
+        if j != MAX_TICKS_UINT:
+            out.ticks_in.append(x if pump else y)
+
+        p_ratio = p_o_up * 10**18 // p_o[0]
+
+        if pump:
+            if y != 0 and g != 0:
+                x_dest = _sub(_sub(Inv // g, f), x)
+                dx = x_dest * antifee // 10**18
+                if dx >= in_amount_left:
+                    x_dest = in_amount_left * 10**18 // antifee
+                    out.last_tick_j = min(_sub(Inv // (f + (x + x_dest)), g) + 1, y)
+                    x += in_amount_left
+                    out.out_amount += _sub(y, out.last_tick_j)
+                    out.ticks_in[j] = x
+                    out.in_amount = in_amount
+                    break
+                else:
+                    dx = max(dx, 1)
+                    in_amount_left -= dx
+                    out.ticks_in[j] = x + dx
+                    out.in_amount += dx
+                    out.out_amount += y
+
+            if i != MAX_TICKS_UINT + MAX_SKIP_TICKS_UINT - 1:
+                if out.n2 == max_band:
+                    break
+                if j == MAX_TICKS_UINT - 1:
+                    break
+                if p_ratio < 10**36 // state.max_oracle_dn_pow:
+                    break
+                out.n2 += 1
+                p_o_up = p_o_up * Aminus1 // A
+                x = 0
+                y = state.band_y(out.n2)
+
+        else:
+            if x != 0 and f != 0:
+                y_dest = _sub(_sub(Inv // f, g), y)
+                dy = y_dest * antifee // 10**18
+                if dy >= in_amount_left:
+                    y_dest = in_amount_left * 10**18 // antifee
+                    out.last_tick_j = min(_sub(Inv // (g + (y + y_dest)), f) + 1, x)
+                    y += in_amount_left
+                    out.out_amount += _sub(x, out.last_tick_j)
+                    out.ticks_in[j] = y
+                    out.in_amount = in_amount
+                    break
+                else:
+                    dy = max(dy, 1)
+                    in_amount_left -= dy
+                    out.ticks_in[j] = y + dy
+                    out.in_amount += dy
+                    out.out_amount += x
+
+            if i != MAX_TICKS_UINT + MAX_SKIP_TICKS_UINT - 1:
+                if out.n2 == min_band:
+                    break
+                if j == MAX_TICKS_UINT - 1:
+                    break
+                if p_ratio > state.max_oracle_dn_pow:
+                    break
+                out.n2 -= 1
+                p_o_up = p_o_up * A // Aminus1
+                x = state.band_x(out.n2)
+                y = 0
+
+        if j != MAX_TICKS_UINT:
+            j += 1
+
+    out.in_amount = (out.in_amount + in_precision - 1) // in_precision * in_precision
+    out.out_amount = out.out_amount // out_precision * out_precision
+    return out
+
+
+def calc_swap_in(
+    state: AMMState,
+    pump: bool,
+    out_amount: int,
+    p_o: tuple[int, int],
+    in_precision: int,
+    out_precision: int,
+) -> DetailedTrade:
+    """Replicates `calc_swap_in` (amounts are in 18-decimal internal units)."""
+    A = state.A
+    Aminus1 = state.Aminus1
+    min_band = state.min_band
+    max_band = state.max_band
+    out = DetailedTrade()
+    out.n2 = state.active_band
+    p_o_up = p_oracle_up(state, out.n2)
+    x = state.band_x(out.n2)
+    y = state.band_y(out.n2)
+
+    out_amount_left = out_amount
+    fee = max(state.fee, p_o[1])
+    j = MAX_TICKS_UINT
+
+    for i in range(MAX_TICKS_UINT + MAX_SKIP_TICKS_UINT):
+        f = 0
+        g = 0
+        Inv = 0
+        dynamic_fee = fee
+
+        if x > 0 or y > 0:
+            if j == MAX_TICKS_UINT:
+                out.n1 = out.n2
+                j = 0
+            f, g, Inv = _band_invariant(state, x, y, p_o[0], p_o_up)
+            dynamic_fee = max(get_dynamic_fee(state, p_o[0], p_o_up), fee)
+
+        antifee = _antifee(dynamic_fee)
+
+        if j != MAX_TICKS_UINT:
+            out.ticks_in.append(x if pump else y)
+
+        p_ratio = p_o_up * 10**18 // p_o[0]
+
+        if pump:
+            if y != 0 and g != 0:
+                if y >= out_amount_left:
+                    out.last_tick_j = y - out_amount_left
+                    x_dest = _sub(_sub(Inv // (g + out.last_tick_j), f), x)
+                    dx = x_dest * antifee // 10**18
+                    out.out_amount = out_amount
+                    out.in_amount += dx
+                    out.ticks_in[j] = x + dx
+                    break
+                else:
+                    x_dest = _sub(_sub(Inv // g, f), x)
+                    dx = max(x_dest * antifee // 10**18, 1)
+                    out_amount_left -= y
+                    out.in_amount += dx
+                    out.out_amount += y
+                    out.ticks_in[j] = x + dx
+
+            if i != MAX_TICKS_UINT + MAX_SKIP_TICKS_UINT - 1:
+                if out.n2 == max_band:
+                    break
+                if j == MAX_TICKS_UINT - 1:
+                    break
+                if p_ratio < 10**36 // state.max_oracle_dn_pow:
+                    break
+                out.n2 += 1
+                p_o_up = p_o_up * Aminus1 // A
+                x = 0
+                y = state.band_y(out.n2)
+
+        else:
+            if x != 0 and f != 0:
+                if x >= out_amount_left:
+                    out.last_tick_j = x - out_amount_left
+                    y_dest = _sub(_sub(Inv // (f + out.last_tick_j), g), y)
+                    dy = y_dest * antifee // 10**18
+                    out.out_amount = out_amount
+                    out.in_amount += dy
+                    out.ticks_in[j] = y + dy
+                    break
+                else:
+                    y_dest = _sub(_sub(Inv // f, g), y)
+                    dy = max(y_dest * antifee // 10**18, 1)
+                    out_amount_left -= x
+                    out.in_amount += dy
+                    out.out_amount += x
+                    out.ticks_in[j] = y + dy
+
+            if i != MAX_TICKS_UINT + MAX_SKIP_TICKS_UINT - 1:
+                if out.n2 == min_band:
+                    break
+                if j == MAX_TICKS_UINT - 1:
+                    break
+                if p_ratio > state.max_oracle_dn_pow:
+                    break
+                out.n2 -= 1
+                p_o_up = p_o_up * A // Aminus1
+                x = state.band_x(out.n2)
+                y = 0
+
+        if j != MAX_TICKS_UINT:
+            j += 1
+
+    out.in_amount = (out.in_amount + in_precision - 1) // in_precision * in_precision
+    out.out_amount = out.out_amount // out_precision * out_precision
+    return out
+
+
+def _precisions(state: AMMState, i: int, j: int) -> tuple[int, int]:
+    if not ((i == 0 and j == 1) or (i == 1 and j == 0)):
+        raise AMMRevert("Wrong index")
+    if i == 0:
+        return state.borrowed_precision, state.collateral_precision
+    return state.collateral_precision, state.borrowed_precision
+
+
+def get_dxdy(
+    state: AMMState, i: int, j: int, amount: int, is_in: bool = True
+) -> DetailedTrade:
+    """Replicates `_get_dxdy` (amounts are in token units)."""
+    in_precision, out_precision = _precisions(state, i, j)
+    if amount == 0:
+        return DetailedTrade()
+    if is_in:
+        out = calc_swap_out(
+            state, i == 0, amount * in_precision, state.p_o, in_precision, out_precision
+        )
+    else:
+        out = calc_swap_in(
+            state,
+            i == 0,
+            amount * out_precision,
+            state.p_o,
+            in_precision,
+            out_precision,
+        )
+    out.in_amount //= in_precision
+    out.out_amount //= out_precision
+    return out
+
+
+def get_dy(state: AMMState, i: int, j: int, in_amount: int) -> int:
+    return get_dxdy(state, i, j, in_amount, True).out_amount
+
+
+def get_dx(state: AMMState, i: int, j: int, out_amount: int) -> int:
+    trade = get_dxdy(state, i, j, out_amount, False)
+    if trade.out_amount != out_amount:
+        raise AMMRevert("not enough liquidity")
+    return trade.in_amount
+
+
+def unpack_ns(ns: int) -> tuple[int, int]:
+    """Replicates `_read_user_tick_numbers` for a packed `UserTicks.ns`."""
+    if ns >= 2**255:
+        ns -= 2**256
+    n2 = sdiv(ns, 2**128)
+    n1 = smod(ns, 2**128)
+    if n1 >= 2**127:
+        n1 -= 2**128
+        n2 += 1
+    return n1, n2
+
+
+def unpack_ticks(ticks: list[int], ns: tuple[int, int]) -> list[int]:
+    """Replicates `_read_user_ticks` for a packed `UserTicks.ticks` array."""
+    size = ns[1] - ns[0] + 1
+    out = []
+    for tick in ticks:
+        for share in (tick & (2**128 - 1), tick >> 128):
+            if len(out) == size:
+                return out
+            out.append(share)
+    return out
+
+
+def get_xy_up(
+    state: AMMState, ns: tuple[int, int], ticks: list[int], use_y: bool
+) -> int:
+    """Replicates `get_xy_up` for a user with bands `ns` and shares `ticks`."""
+    if not ticks or ticks[0] == 0:
+        return 0
+    A = state.A
+    Aminus1 = state.Aminus1
+    p_o = state.p_o[0]
+    if p_o == 0:
+        raise AMMRevert("p_o == 0")
+
+    n_active = state.active_band
+    p_o_down = p_oracle_up(state, ns[0])
+    XY = 0
+
+    for i, n in enumerate(range(ns[0], ns[1] + 1)):
+        x = state.band_x(n) if n <= n_active else 0
+        y = state.band_y(n) if n >= n_active else 0
+        p_o_up = p_o_down
+        p_o_down = p_o_down * Aminus1 // A
+        if x == 0 and y == 0:
+            continue
+
+        total_share = state.total_shares.get(n, 0)
+        user_share = ticks[i]
+        if total_share == 0 or user_share == 0:
+            continue
+        total_share += DEAD_SHARES
+
+        p_current_mid = p_o**2 // p_o_down * p_o // p_o_up
+
+        if x == 0 or y == 0:
+            if p_o > p_o_up:
+                y_equiv = y if y != 0 else x * 10**18 // p_current_mid
+                if use_y:
+                    XY += y_equiv * user_share // total_share
+                else:
+                    XY += (
+                        y_equiv
+                        * p_o_up
+                        // state.sqrt_band_ratio
+                        * user_share
+                        // total_share
+                    )
+                continue
+            elif p_o < p_o_down:
+                x_equiv = x if x != 0 else y * p_current_mid // 10**18
+                if use_y:
+                    XY += (
+                        x_equiv
+                        * state.sqrt_band_ratio
+                        // p_o_up
+                        * user_share
+                        // total_share
+                    )
+                else:
+                    XY += x_equiv * user_share // total_share
+                continue
+
+        y0 = get_y0(state, x, y, p_o, p_o_up)
+        f = A * y0 * p_o // p_o_up * p_o // 10**18
+        g = Aminus1 * y0 * p_o_up // p_o
+        Inv = (f + x) * (g + y)
+
+        if p_o > p_o_up:
+            y_o = _sub_or_zero(Inv // f, g)
+            if use_y:
+                XY += y_o * user_share // total_share
+            else:
+                XY += y_o * p_o_up // state.sqrt_band_ratio * user_share // total_share
+        elif p_o < p_o_down:
+            x_o = _sub_or_zero(Inv // g, f)
+            if use_y:
+                XY += x_o * state.sqrt_band_ratio // p_o_up * user_share // total_share
+            else:
+                XY += x_o * user_share // total_share
+        else:
+            y_o = A * y0 * (p_o - p_o_down) // p_o
+            x_o = _sub_or_zero(Inv // (g + y_o), f)
+            if use_y:
+                XY += (
+                    (y_o + x_o * 10**18 // isqrt(p_o_up * p_o))
+                    * user_share
+                    // total_share
+                )
+            else:
+                XY += (
+                    (x_o + y_o * isqrt(p_o_down * p_o) // 10**18)
+                    * user_share
+                    // total_share
+                )
+
+    if use_y:
+        return XY // state.collateral_precision
+    return XY // state.borrowed_precision
+
+
+def get_x_down(state: AMMState, ns: tuple[int, int], ticks: list[int]) -> int:
+    return get_xy_up(state, ns, ticks, False)
+
+
+def get_y_up(state: AMMState, ns: tuple[int, int], ticks: list[int]) -> int:
+    return get_xy_up(state, ns, ticks, True)
+
+
+def get_sum_xy(
+    state: AMMState, ns: tuple[int, int], ticks: list[int]
+) -> tuple[int, int]:
+    """Replicates `get_sum_xy` for a user with bands `ns` and shares `ticks`."""
+    x = 0
+    y = 0
+    if ticks and ticks[0] != 0:
+        for i, n in enumerate(range(ns[0], ns[1] + 1)):
+            total_shares = state.total_shares.get(n, 0) + DEAD_SHARES
+            x += (state.band_x(n) + 1) * ticks[i] // total_shares
+            y += (state.band_y(n) + 1) * ticks[i] // total_shares
+    return x // state.borrowed_precision, y // state.collateral_precision
+
+
+def get_amount_for_price(state: AMMState, p: int) -> tuple[int, bool]:
+    """Replicates `get_amount_for_price`. Returns (amount, is_pump)."""
+    A = state.A
+    Aminus1 = state.Aminus1
+    min_band = state.min_band
+    max_band = state.max_band
+    n = state.active_band
+    p_o = state.p_o
+    p_o_up = p_oracle_up(state, n)
+    p_down = p_o[0] ** 2 // p_o_up * p_o[0] // p_o_up
+    p_up = p_down * state.A2 // state.Aminus12
+    amount = 0
+    f = 0
+    g = 0
+    Inv = 0
+    j = MAX_TICKS_UINT
+    pump = True
+
+    fee = max(state.fee, p_o[1])
+
+    for i in range(MAX_TICKS_UINT + MAX_SKIP_TICKS_UINT):
+        if p_o_up == 0:
+            raise AMMRevert("p_o_up == 0")
+        x = state.band_x(n)
+        y = state.band_y(n)
+        if i == 0 and p < get_p(state, n, x, y):
+            pump = False
+        dynamic_fee = fee
+        not_empty = x > 0 or y > 0
+
+        if not_empty:
+            f, g, Inv = _band_invariant(state, x, y, p_o[0], p_o_up)
+            if j == MAX_TICKS_UINT:
+                j = 0
+            dynamic_fee = max(get_dynamic_fee(state, p_o[0], p_o_up), fee)
+
+        antifee = _antifee(dynamic_fee)
+
+        if p <= p_up and p >= p_down:
+            if not_empty:
+                ynew = _sub_or_zero(isqrt(Inv * 10**18 // p), g)
+                xnew = _sub_or_zero(Inv // (g + ynew), f)
+                if pump:
+                    amount += _sub_or_zero(xnew, x) * antifee // 10**18
+                else:
+                    amount += _sub_or_zero(ynew, y) * antifee // 10**18
+            break
+
+        p_ratio = p_o_up * 10**18 // p_o[0]
+
+        if pump:
+            if not_empty:
+                amount += _sub(_sub(Inv // g, f), x) * antifee // 10**18
+            if n == max_band:
+                break
+            if j == MAX_TICKS_UINT - 1:
+                break
+            if p_ratio < 10**36 // state.max_oracle_dn_pow:
+                break
+            n += 1
+            p_down = p_up
+            p_up = p_up * state.A2 // state.Aminus12
+            p_o_up = p_o_up * Aminus1 // A
+        else:
+            if not_empty:
+                amount += _sub(_sub(Inv // f, g), y) * antifee // 10**18
+            if n == min_band:
+                break
+            if j == MAX_TICKS_UINT - 1:
+                break
+            if p_ratio > state.max_oracle_dn_pow:
+                break
+            n -= 1
+            p_up = p_down
+            p_down = p_down * state.Aminus12 // state.A2
+            p_o_up = p_o_up * A // Aminus1
+
+        if j != MAX_TICKS_UINT:
+            j += 1
+
+    if amount == 0:
+        return 0, pump
+
+    if pump:
+        amount = (amount - 1) // state.borrowed_precision + 1
+    else:
+        amount = (amount - 1) // state.collateral_precision + 1
+    return amount, pump
+
+
+# --------------------------------------------------------------------------
+# Vectorized quoting
+# --------------------------------------------------------------------------
+
+
+def _walk(state: AMMState, pump: bool) -> list[tuple[int, int, int, int, int, int]]:
+    """
+    Visit bands exactly like `calc_swap_out` / `calc_swap_in` would for an
+    infinitely large trade and return, for every band that can be traded
+    through, `(x, y, f, g, Inv, antifee)`.
+    """
+    A = state.A
+    Aminus1 = state.Aminus1
+    p_o = state.p_o
+    n = state.active_band
+    p_o_up = p_oracle_up(state, n)
+    x = state.band_x(n)
+    y = state.band_y(n)
+    fee = max(state.fee, p_o[1])
+    j = MAX_TICKS_UINT
+    bands = []
+
+    for i in range(MAX_TICKS_UINT + MAX_SKIP_TICKS_UINT):
+        f = g = Inv = 0
+        dynamic_fee = fee
+        if x > 0 or y > 0:
+            if j == MAX_TICKS_UINT:
+                j = 0
+            f, g, Inv = _band_invariant(state, x, y, p_o[0], p_o_up)
+            dynamic_fee = max(get_dynamic_fee(state, p_o[0], p_o_up), fee)
+        p_ratio = p_o_up * 10**18 // p_o[0]
+
+        if pump:
+            if y != 0 and g != 0:
+                bands.append((x, y, f, g, Inv, _antifee(dynamic_fee)))
+        else:
+            if x != 0 and f != 0:
+                bands.append((x, y, f, g, Inv, _antifee(dynamic_fee)))
+
+        if i == MAX_TICKS_UINT + MAX_SKIP_TICKS_UINT - 1:
+            break
+        if j == MAX_TICKS_UINT - 1:
+            break
+        if pump:
+            if n == state.max_band or p_ratio < 10**36 // state.max_oracle_dn_pow:
+                break
+            n += 1
+            p_o_up = p_o_up * Aminus1 // A
+            x = 0
+            y = state.band_y(n)
+        else:
+            if n == state.min_band or p_ratio > state.max_oracle_dn_pow:
+                break
+            n -= 1
+            p_o_up = p_o_up * A // Aminus1
+            x = state.band_x(n)
+            y = 0
+        if j != MAX_TICKS_UINT:
+            j += 1
+
+    return bands
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:  # pragma: no cover
+        raise ImportError(
+            "Vectorized LLAMMA quotes require numpy (pip install numpy)"
+        ) from e
+    return numpy
+
+
+def quote_dxdy_many(state: AMMState, i: int, j: int, in_amounts):
+    """
+    Vectorized `get_dxdy`: quote many input sizes against the same snapshot.
+
+    @param in_amounts Iterable of input amounts in token units
+    @return (in_amounts_used, out_amounts) as NumPy object arrays
+    """
+    np = _numpy()
+    pump = i == 0
+    in_precision, out_precision = _precisions(state, i, j)
+    amounts = np.asarray([int(a) * in_precision for a in in_amounts], dtype=object)
+
+    bands = _walk(state, pump)
+    # Amount of input which exhausts each band and what it gives out
+    caps, full_out = [], []
+    for x, y, f, g, Inv, antifee in bands:
+        if pump:
+            dx = (Inv // g - f - x) * antifee // 10**18
+            caps.append(dx)
+            full_out.append(y)
+        else:
+            dy = (Inv // f - g - y) * antifee // 10**18
+            caps.append(dy)
+            full_out.append(x)
+
+    used = np.zeros(len(amounts), dtype=object)
+    out = np.zeros(len(amounts), dtype=object)
+    left = amounts.copy()
+    done = amounts == 0
+    for k, (x, y, f, g, Inv, antifee) in enumerate(bands):
+        active = ~done
+        if not active.any():
+            break
+        last = active & (left <= caps[k])
+        if last.any():
+            rem = left[last]
+            dest = rem * 10**18 // antifee
+            if pump:
+                tick = np.minimum(Inv // (f + (x + dest)) - g + 1, y)
+                out[last] += y - tick
+            else:
+                tick = np.minimum(Inv // (g + (y + dest)) - f + 1, x)
+                out[last] += x - tick
+            used[last] = amounts[last]
+            done |= last
+        through = active & ~last
+        step = max(caps[k], 1)
+        left[through] -= step
+        used[through] += step
+        out[through] += full_out[k]
+
+    # Zero input is a no-op in the contract
+    used[amounts == 0] = 0
+    used = (used + in_precision - 1) // in_precision * in_precision // in_precision
+    out = out // out_precision
+    return used, out
+
+
+def quote_dydx_many(state: AMMState, i: int, j: int, out_amounts):
+    """
+    Vectorized `get_dydx`: quote the input required for many output sizes.
+
+    @param out_amounts Iterable of desired output amounts in token units
+    @return (out_amounts_received, in_amounts_required) as NumPy object arrays
+    """
+    np = _numpy()
+    pump = i == 0
+    in_precision, out_precision = _precisions(state, i, j)
+    amounts = np.asarray([int(a) * out_precision for a in out_amounts], dtype=object)
+
+    bands = _walk(state, pump)
+
+    need = np.zeros(len(amounts), dtype=object)
+    got = np.zeros(len(amounts), dtype=object)
+    left = amounts.copy()
+    done = amounts == 0
+    for x, y, f, g, Inv, antifee in bands:
+        active = ~done
+        if not active.any():
+            break
+        band_out = y if pump else x
+        last = active & (left <= band_out)
+        if last.any():
+            tick = band_out - left[last]
+            if pump:
+                dest = Inv // (g + tick) - f - x
+            else:
+                dest = Inv // (f + tick) - g - y
+            need[last] += dest * antifee // 10**18
+            got[last] = amounts[last]
+            done |= last
+        through = active & ~last
+        if pump:
+            step = max((Inv // g - f - x) * antifee // 10**18, 1)
+        else:
+            step = max((Inv // f - g - y) * antifee // 10**18, 1)
+        left[through] -= band_out
+        need[through] += step
+        got[through] += band_out
+
+    need[amounts == 0] = 0
+    need = (need + in_precision - 1) // in_precision
+    got = got // out_precision
+    return got, need
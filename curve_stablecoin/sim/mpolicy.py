@@ -0,0 +1,280 @@
+"""Vectorized models of the monetary policies in `curve_stablecoin/mpolicies`.
+
+Unlike `sim.llamma` these are not bit-exact: every function takes NumPy arrays
+(one entry per block or per `rate_write`) and evaluates the rate curves in
+float64, so a year of per-block data replays in well under a second. Values
+keep the units of the contracts - utilization, prices, ratios and rates are
+scaled by 1e18 and rates are per second - so parameters can be copied from
+the deployed contracts and results compared with `rate()` directly. They
+differ from the contracts by the integer rounding of the latter, i.e. by a
+few units in rates of the order of 1e9.
+
+Stateless curves (`semilog_rate`, `kinked_rate`, `secondary_rate`,
+`hyperbolic_dynamic_rate`) map each entry independently. Policies with memory
+(`ema_rate`, `agg_rate`) replay a sequence of `rate_write` calls made at the
+timestamps `t`, which must be non-decreasing.
+"""
+
+from math import log
+from typing import NamedTuple
+
+import numpy as np
+
+WAD = 10**18
+SECONDS_PER_YEAR = 365 * 86400
+
+# Below this power the contracts' `exp` returns 0
+_EXP_UNDERFLOW = -41446531673892821376 / WAD
+
+# Mirrored from EMAMonetaryPolicy.vy
+TEXP = 40000
+MIN_EMA_RATE = 317097920
+MAX_EMA_RATE = 47564687975
+
+# Mirrored from HyperbolicDynamicMP.vy
+MIN_TARGET_RATE = 317097920
+MAX_TARGET_RATE = 47564687975
+
+# Mirrored from AggMonetaryPolicy4.vy
+DEBT_CANDLE_TIME = 86400 // 2
+MAX_EXP = 1000 * WAD
+MAX_RATE = 43959106799
+TARGET_REMAINDER = 10**17
+
+# Largest decay of a single `_linear_scan` step, keeps 1 / prod(a) finite
+_MAX_DECAY = 600.0
+
+
+class CurveParams(NamedTuple):
+    """Parameters of the hyperbolic utilization curve shared by Kinked,
+    Secondary, EMA and HyperbolicDynamicMP."""
+
+    u_inf: int
+    A: int
+    r_minf: int
+
+    @classmethod
+    def from_ratios(
+        cls, target_utilization: int, low_ratio: int, high_ratio: int
+    ) -> "CurveParams":
+        """Integer port of the contracts' `get_params`."""
+        numerator = (high_ratio - WAD) * target_utilization
+        subtrahend = (WAD - target_utilization) * (WAD - low_ratio)
+        if numerator <= subtrahend:
+            raise ValueError("Bad curve parameters")
+        u_inf = numerator // ((numerator - subtrahend) // WAD)
+        A = (WAD - low_ratio) * u_inf // WAD * (u_inf - target_utilization)
+        A //= target_utilization
+        r_minf = low_ratio - A * WAD // u_inf
+        return cls(u_inf, A, r_minf)
+
+
+def utilization(total_debt, total_reserves) -> np.ndarray:
+    """`total_debt / total_reserves` scaled by 1e18, 0 where there are no reserves."""
+    debt = np.asarray(total_debt, dtype=np.float64)
+    reserves = np.asarray(total_reserves, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(reserves > 0, debt * WAD / reserves, 0.0)
+
+
+def hyperbolic_rate(u, params: CurveParams, r0, shift=0) -> np.ndarray:
+    """`r0 * r_minf + A * r0 / (u_inf - u) + shift`, the curve of every
+    utilization based policy except Semilog."""
+    u = np.asarray(u, dtype=np.float64)
+    r0 = np.asarray(r0, dtype=np.float64)
+    return (
+        r0 * (params.r_minf / WAD)
+        + params.A * r0 / (params.u_inf - u)
+        + np.asarray(shift, dtype=np.float64)
+    )
+
+
+def semilog_rate(u, min_rate: int, max_rate: int) -> np.ndarray:
+    """SemilogMonetaryPolicy: log-linear between `min_rate` at u = 0 and
+    `max_rate` at u = 1."""
+    u = np.asarray(u, dtype=np.float64)
+    return min_rate * np.exp(u / WAD * log(max_rate / min_rate))
+
+
+def kinked_rate(u, params: CurveParams, base_rate: int) -> np.ndarray:
+    """KinkedMonetaryPolicy. `base_rate` is the yearly rate at the target
+    utilization, as passed to the contract."""
+    return hyperbolic_rate(u, params, base_rate // SECONDS_PER_YEAR)
+
+
+def secondary_rate(u, params: CurveParams, amm_rate, shift: int = 0) -> np.ndarray:
+    """SecondaryMonetaryPolicy, `amm_rate` being the rate of the AMM it follows."""
+    return hyperbolic_rate(u, params, amm_rate, shift)
+
+
+def hyperbolic_dynamic_rate(
+    u, params: CurveParams, target_rate, shift: int = 0
+) -> np.ndarray:
+    """HyperbolicDynamicMP. `target_rate` is the raw rate of the rate
+    calculator, clamped like the contract does."""
+    r0 = np.clip(
+        np.asarray(target_rate, dtype=np.float64), MIN_TARGET_RATE, MAX_TARGET_RATE
+    )
+    u = np.minimum(np.asarray(u, dtype=np.float64), WAD)
+    return np.maximum(hyperbolic_rate(u, params, r0, shift), 0.0)
+
+
+def _decay(t, ema_time: float, t0: float) -> np.ndarray:
+    # Weight of the previous EMA value at every write, with the contracts' exp
+    # cut-off: after about 41 EMA times the old value is forgotten entirely
+    dt = np.diff(np.asarray(t, dtype=np.float64), prepend=t0)
+    if np.any(dt < 0):
+        raise ValueError("Timestamps must be non-decreasing")
+    power = -dt / ema_time
+    return np.where(power > _EXP_UNDERFLOW, np.exp(power), 0.0)
+
+
+def _linear_scan(a: np.ndarray, b: np.ndarray, y0: float) -> np.ndarray:
+    """`y[i] = a[i] * y[i - 1] + b[i]` with `y[-1] = y0`, for 0 <= a <= 1.
+
+    Within a run of steps the solution is `P * (y0 + cumsum(b / P))` with
+    `P = cumprod(a)`; runs are cut before `P` underflows.
+    """
+    n = len(a)
+    y = np.empty(n)
+    with np.errstate(divide="ignore"):
+        decay = -np.log(a)
+    start = 0
+    while start < n:
+        total = np.cumsum(decay[start:])
+        end = start + max(int(np.searchsorted(total, _MAX_DECAY, side="right")), 1)
+        p = np.exp(-total[: end - start])
+        if end - start == 1:
+            y[start] = a[start] * y0 + b[start]
+        else:
+            y[start:end] = p * (y0 + np.cumsum(b[start:end] / p))
+        y0 = y[end - 1]
+        start = end
+    return y
+
+
+def ema_rate(
+    t, raw_rate, initial_rate: int, t0: int | None = None, texp: int = TEXP
+) -> np.ndarray:
+    """EMA of the rate calculator kept by EMAMonetaryPolicy.
+
+    Replays `ema_rate_w` at every timestamp in `t` with the calculator
+    returning `raw_rate`. `initial_rate` and `t0` are the rate and timestamp
+    stored by the constructor (`t0` defaults to `t[0]`). Several writes in the
+    same block keep the EMA of the first one, like the contract.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    x = np.asarray(raw_rate, dtype=np.float64)
+    alpha = _decay(t, texp, t[0] if t0 is None else t0)
+    # The contract multiplies by 1e18 // TEXP which is exact for TEXP = 40000
+    y = _linear_scan(alpha, (1 - alpha) * x, float(initial_rate))
+
+    # The stored EMA is clamped, so from the first write where the clamp kicks
+    # in the recursion is no longer linear: finish it one write at a time
+    out = np.flatnonzero((y < MIN_EMA_RATE) | (y > MAX_EMA_RATE))
+    if len(out) > 0:
+        prev = y[out[0] - 1] if out[0] > 0 else float(initial_rate)
+        for i in range(out[0], len(y)):
+            prev = alpha[i] * prev + (1 - alpha[i]) * x[i]
+            prev = min(max(prev, MIN_EMA_RATE), MAX_EMA_RATE)
+            y[i] = prev
+    return y
+
+
+def ema_policy_rate(
+    t,
+    u,
+    raw_rate,
+    params: CurveParams,
+    initial_rate: int,
+    shift: int = 0,
+    t0: int | None = None,
+) -> np.ndarray:
+    """EMAMonetaryPolicy: `rate_write` at every timestamp in `t` with
+    utilization `u` and the rate calculator returning `raw_rate`."""
+    return hyperbolic_rate(u, params, ema_rate(t, raw_rate, initial_rate, t0), shift)
+
+
+def min_debt_candles(t, debt) -> np.ndarray:
+    """Debt read back by AggMonetaryPolicy4 right after `save_candle`.
+
+    That is the minimum of the debts written since the start of the previous
+    candle if one was written there, of the current candle otherwise. Where
+    the contract reads 0 it falls back to the fresh debt, so that is returned
+    instead.
+    """
+    t = np.asarray(t, dtype=np.int64)
+    debt = np.broadcast_to(np.asarray(debt, dtype=np.float64), t.shape)
+    out = debt.copy()
+    # Zero debts written before the first non-zero one are not recorded
+    first = int(np.argmax(debt > 0)) if np.any(debt > 0) else len(debt)
+    candle = t[first:] // DEBT_CANDLE_TIME
+    starts = np.flatnonzero(np.diff(candle, prepend=-2))
+    prev_candle, prev_min = None, 0.0
+    for lo, hi in zip(starts, [*starts[1:], len(candle)]):
+        run = np.minimum.accumulate(debt[first + lo : first + hi])
+        if prev_candle == candle[lo] - 1 and prev_min > 0:
+            run = np.minimum(run, prev_min)
+        out[first + lo : first + hi] = np.where(
+            run > 0, run, debt[first + lo : first + hi]
+        )
+        prev_candle, prev_min = candle[lo], float(np.min(debt[first + lo : first + hi]))
+    return out
+
+
+def agg_rate(
+    t,
+    price,
+    pk_debt,
+    total_debt,
+    debt_for,
+    rate0: int,
+    sigma: int,
+    target_debt_fraction: int,
+    extra_const: int = 0,
+    debt_ratio_ema_time: int = 86400,
+    debt_ceiling=0,
+    t0: int | None = None,
+) -> np.ndarray:
+    """AggMonetaryPolicy4: `rate_write` of one controller at every timestamp in `t`.
+
+    `price` is the oracle price, `pk_debt` the total debt of the peg keepers,
+    `total_debt` the debt of all controllers and `debt_for` (and optionally
+    `debt_ceiling`) the debt (and ceiling) of the controller, as seen by each
+    `rate_write`: the contract re-reads the debts of the other controllers
+    only every `debt_refresh_time`. Debts are smoothed with the 12 hour min
+    candles as written by this controller only.
+
+    The peg keeper debt ratio is averaged by an EMA which starts at
+    `target_debt_fraction` at `t0` (defaults to `t[0]`), and every write reads
+    the EMA before adding its own ratio to it.
+    """
+    t = np.asarray(t, dtype=np.int64)
+    price = np.asarray(price, dtype=np.float64)
+    total_debt = min_debt_candles(t, total_debt)
+    debt_for = min_debt_candles(t, debt_for)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(
+            total_debt > 0,
+            np.asarray(pk_debt, dtype=np.float64) * WAD / total_debt,
+            0.0,
+        )
+
+    # ema.read() at write i blends the previous read with the ratio queued by
+    # write i - 1
+    alpha = _decay(t, debt_ratio_ema_time, t[0] if t0 is None else t0)
+    queued = np.concatenate(([float(target_debt_fraction)], ratio[:-1]))
+    debt_ratio = _linear_scan(alpha, (1 - alpha) * queued, float(target_debt_fraction))
+
+    power = (WAD - price) / sigma - debt_ratio / target_debt_fraction
+    # exp() saturates at MAX_EXP instead of overflowing
+    growth = np.exp(np.minimum(power, log(MAX_EXP / WAD)))
+    growth = np.where(power > _EXP_UNDERFLOW, growth, 0.0)
+    rate = rate0 * growth + extra_const
+
+    ceiling = np.asarray(debt_ceiling, dtype=np.float64)
+    f_max = 1 - TARGET_REMAINDER / 1000 / WAD
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f = np.where(ceiling > 0, np.minimum(f_max, debt_for / ceiling), f_max)
+    remainder = TARGET_REMAINDER / WAD
+    return np.minimum(rate * ((1 - remainder) + remainder / (1 - f)), MAX_RATE)
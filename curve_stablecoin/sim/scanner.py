@@ -0,0 +1,244 @@
+"""Off-chain liquidation scanner.
+
+`ControllerView.users_to_liquidate` has to walk every loan on every call. This
+scanner does the same job off-chain on top of `sim.llamma`: positions are read
+in bulk once, and afterwards only positions whose bands the price has reached
+are re-evaluated with the full band walk.
+
+A position is *cold* when its top band is above both the active band and the
+band containing the oracle price. For such a position `get_x_down` does not
+depend on the oracle price and only scales with the base price, so its health
+is re-scaled from the cached value instead of walking the bands again. That
+estimate can be off by a few units of the borrowed token, so cold positions
+whose estimated health gets within that error of the threshold are re-evaluated
+exactly: reported positions always carry the exact on-chain health. Cold positions sit in a min-heap keyed by their top
+band; when the price moves down the heap is popped up to the new threshold
+band and those positions become *hot* and are re-evaluated on every update
+until the price moves away again.
+"""
+
+import heapq
+from dataclasses import dataclass
+from math import log
+
+from curve_stablecoin.sim import llamma
+from curve_stablecoin.sim.evm_math import sdiv
+
+SWAD = 10**18
+# Re-scaled x_down of a cold position is within this many token units of the
+# exact value
+COLD_X_DOWN_ERROR = 4
+
+
+@dataclass
+class Position:
+    user: str
+    ns: tuple[int, int]
+    ticks: list[int]
+    debt: int
+    liquidation_discount: int
+    x_down: int = 0
+    y: int = 0
+    health: int = 0
+    # Base price at which x_down was computed
+    base_price: int = 0
+
+
+def health(state: llamma.AMMState, pos: Position, full: bool = True) -> int:
+    """Replicates `controller._health` for a position (re-computing `x_down`)."""
+    pos.x_down = llamma.get_x_down(state, pos.ns, pos.ticks)
+    pos.y = llamma.get_sum_xy(state, pos.ns, pos.ticks)[1]
+    pos.base_price = state.base_price
+    return _health_from_x_down(state, pos.x_down, pos, full)
+
+
+def _health_from_x_down(
+    state: llamma.AMMState, x_down: int, pos: Position, full: bool
+) -> int:
+    if pos.debt == 0:
+        raise llamma.AMMRevert("Loan doesn't exist")
+    h = sdiv(x_down * (SWAD - pos.liquidation_discount), pos.debt) - SWAD
+    if full and pos.ns[0] > state.active_band:
+        p = state.p_o[0]
+        p_up = llamma.p_oracle_up(state, pos.ns[0])
+        if p > p_up:
+            h += (
+                (p - p_up)
+                * pos.y
+                * state.collateral_precision
+                // (pos.debt * state.borrowed_precision)
+            )
+    return h
+
+
+def cold_error(pos: Position) -> int:
+    """Upper bound of the health error of a re-scaled cold position."""
+    return COLD_X_DOWN_ERROR * SWAD // pos.debt + 1
+
+
+def oracle_band(state: llamma.AMMState) -> int:
+    """Band `n` with `p_oracle_up(n) >= p_o > p_oracle_up(n + 1)`."""
+    p_o = state.p_o[0]
+    base = llamma.p_oracle_up(state, 0)
+    n = int(log(base / p_o) / log(state.A / state.Aminus1))
+    while llamma.p_oracle_up(state, n) < p_o:
+        n -= 1
+    while llamma.p_oracle_up(state, n + 1) >= p_o:
+        n += 1
+    return n
+
+
+class LiquidationScanner:
+    """
+    Price-indexed set of positions of one market.
+
+    @param state AMM snapshot including `total_shares` (see `AMMState.from_boa`)
+    @param positions Positions of all loans of the market
+    @param full Whether to track `health(user, True)` (as `users_to_liquidate` does)
+    @param threshold Health below which positions are reported
+    """
+
+    def __init__(
+        self,
+        state: llamma.AMMState,
+        positions,
+        full: bool = True,
+        threshold: int = 0,
+    ):
+        self.state = state
+        self.full = full
+        self.threshold = threshold
+        self.positions: dict[str, Position] = {}
+        self._cold: list[tuple[int, str]] = []
+        self._hot: set[str] = set()
+        self._band_users: dict[int, set[str]] = {}
+        self.evaluations = 0
+        for pos in positions:
+            self._add(pos)
+            self._evaluate(pos)
+        self._threshold = self._threshold_band()
+        for pos in self.positions.values():
+            self._place(pos)
+
+    @classmethod
+    def from_boa(cls, controller, amm, full: bool = True) -> "LiquidationScanner":
+        """Bulk-read all loans of a titanoboa market."""
+        state = llamma.AMMState.from_boa(amm)
+        user_shares = amm._storage._user_shares.get()
+        positions = []
+        for i in range(controller.n_loans()):
+            user = controller.loans(i)
+            ticks = user_shares[user]
+            ns = llamma.unpack_ns(ticks["ns"])
+            positions.append(
+                Position(
+                    user=user,
+                    ns=ns,
+                    ticks=llamma.unpack_ticks(ticks["ticks"], ns),
+                    debt=controller.debt(user),
+                    liquidation_discount=controller.liquidation_discounts(user),
+                )
+            )
+        return cls(state, positions, full)
+
+    def _threshold_band(self) -> int:
+        return max(self.state.active_band, oracle_band(self.state))
+
+    def _evaluate(self, pos: Position):
+        self.evaluations += 1
+        pos.health = health(self.state, pos, self.full)
+
+    def _add(self, pos: Position):
+        self.positions[pos.user] = pos
+        for n in range(pos.ns[0], pos.ns[1] + 1):
+            self._band_users.setdefault(n, set()).add(pos.user)
+
+    def _discard(self, user: str) -> Position | None:
+        pos = self.positions.pop(user, None)
+        if pos is not None:
+            for n in range(pos.ns[0], pos.ns[1] + 1):
+                self._band_users[n].discard(user)
+        self._hot.discard(user)
+        return pos
+
+    def _place(self, pos: Position):
+        if pos.ns[0] > self._threshold:
+            heapq.heappush(self._cold, (pos.ns[0], pos.user))
+        else:
+            self._hot.add(pos.user)
+
+    def update(
+        self,
+        state: llamma.AMMState,
+        debts: dict[str, int] | None = None,
+        dirty: tuple[Position, ...] = (),
+    ):
+        """
+        Move to a new AMM snapshot.
+
+        @param state New AMM snapshot
+        @param debts New debts by user (e.g. after interest accrual)
+        @param dirty Positions which were created or changed since the last update
+        """
+        self.state = state
+        self._threshold = self._threshold_band()
+
+        # Other positions sharing bands with changed ones see new share totals
+        touched: set[str] = set()
+        for pos in dirty:
+            old = self._discard(pos.user)
+            for p in (old, pos):
+                if p is not None:
+                    for n in range(p.ns[0], p.ns[1] + 1):
+                        touched |= self._band_users.get(n, set())
+            self._add(pos)
+            self._hot.add(pos.user)
+        self._hot |= touched
+
+        if debts:
+            for user, debt in debts.items():
+                self.positions[user].debt = debt
+
+        # Cold positions which the price has reached become hot
+        while self._cold and self._cold[0][0] <= self._threshold:
+            _, user = heapq.heappop(self._cold)
+            if user in self.positions:
+                self._hot.add(user)
+
+        # Band walk only for hot positions
+        hot = self._hot
+        self._hot = set()
+        cold = []
+        for ns0, user in self._cold:
+            pos = self.positions.get(user)
+            if pos is not None and pos.ns[0] == ns0 and user not in hot:
+                cold.append((ns0, user))
+        heapq.heapify(cold)
+        self._cold = cold
+        for user in hot:
+            pos = self.positions.get(user)
+            if pos is not None:
+                self._evaluate(pos)
+                self._place(pos)
+
+        # Cold positions: x_down only scales with the base price
+        for _, user in self._cold:
+            pos = self.positions[user]
+            if pos.base_price == state.base_price:
+                x_down = pos.x_down
+            else:
+                x_down = pos.x_down * state.base_price // pos.base_price
+            pos.health = _health_from_x_down(state, x_down, pos, self.full)
+            if pos.health < self.threshold + cold_error(pos):
+                self._evaluate(pos)
+
+    def remove(self, user: str):
+        """Forget a position (e.g. after repay or hard liquidation)."""
+        self._discard(user)
+
+    def users_to_liquidate(self) -> list[Position]:
+        """Positions with health below the threshold, unhealthiest first."""
+        return sorted(
+            (p for p in self.positions.values() if p.health < self.threshold),
+            key=lambda p: p.health,
+        )
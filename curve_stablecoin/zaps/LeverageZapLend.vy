@@ -14,6 +14,7 @@ from curve_stablecoin.interfaces import IAMM
 from curve_stablecoin.interfaces import ILendFactory
 from curve_stablecoin.interfaces import IController
 from curve_stablecoin import ControllerView
+from curve_stablecoin import controller as ctrl
 from curve_stablecoin.interfaces import ILeverageZap
 from curve_std.interfaces import IERC20
 from curve_std import token as tkn
@@ -65,6 +66,7 @@ def _get_k_effective(_controller: IController, _collateral: uint256, _N: uint256
     @param _N Number of bands the deposit is made into
     @return k_effective
     """
+    assert _N <= MAX_TICKS_UINT  # dev: Need less ticks
     # x_effective = sum_{i=0..N-1}(y / N * p(n_{n1+i})) =
     # = y / N * p_oracle_up(n1) * sqrt((A - 1) / A) * sum_{0..N-1}(((A-1) / A)**k)
     # === d_y_effective * p_oracle_up(n1) * sum(...) === y * k_effective * p_oracle_up(n1)
@@ -78,11 +80,7 @@ def _get_k_effective(_controller: IController, _collateral: uint256, _N: uint256
     d_k_effective: uint256 = WAD * unsafe_sub(
         WAD, min(discount + (DEAD_SHARES * WAD) // max(_collateral // _N, DEAD_SHARES), WAD)
     ) // (SQRT_BAND_RATIO * _N)
-    k_effective: uint256 = d_k_effective
-    for _: uint256 in range(1, _N, bound=MAX_TICKS_UINT):
-        d_k_effective = unsafe_div(d_k_effective * (A - 1), A)
-        k_effective = unsafe_add(k_effective, d_k_effective)
-    return k_effective
+    return ctrl._geometric_sum(d_k_effective, _N, A)
 
 
 @internal
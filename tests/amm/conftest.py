@@ -13,9 +13,9 @@ def borrowed_token():
 
 @pytest.fixture(scope="module")
 def get_amm(price_oracle, admin, accounts):
-    def f(collateral_token, borrowed_token):
+    def f(collateral_token, borrowed_token, deployer=AMM_DEPLOYER):
         with boa.env.prank(admin):
-            amm = AMM_DEPLOYER.deploy(
+            amm = deployer.deploy(
                 borrowed_token.address,
                 10 ** (18 - borrowed_token.decimals()),
                 collateral_token.address,
@@ -0,0 +1,75 @@
+import boa
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from tests.utils.constants import MAX_SKIP_TICKS
+
+
+def can_skip_bands(amm, n_end):
+    # Walks the bands one by one, like the AMM did before it used min_band
+    bands_x = amm._storage.bands_x.get()
+    bands_y = amm._storage.bands_y.get()
+    n = amm.active_band()
+    for _ in range(MAX_SKIP_TICKS):
+        if n_end > n:
+            if bands_y.get(n, 0) != 0:
+                return False
+            n += 1
+        else:
+            if bands_x.get(n, 0) != 0:
+                return False
+            n -= 1
+        if n == n_end:
+            return True
+    return None
+
+
+@given(
+    amounts=st.lists(st.floats(min_value=1, max_value=1e6), min_size=3, max_size=3),
+    ns=st.lists(st.integers(min_value=1, max_value=50), min_size=3, max_size=3),
+    dns=st.lists(st.integers(min_value=0, max_value=20), min_size=3, max_size=3),
+    frac=st.floats(min_value=0, max_value=1),
+    n_ends=st.lists(
+        st.integers(min_value=-1100, max_value=1100), min_size=10, max_size=10
+    ),
+)
+@settings(max_examples=20)
+def test_can_skip_bands(
+    amm,
+    accounts,
+    admin,
+    collateral_token,
+    borrowed_token,
+    amounts,
+    ns,
+    dns,
+    frac,
+    n_ends,
+):
+    trader = accounts[6]
+    with boa.env.anchor():
+        with boa.env.prank(admin):
+            for user, amount, n1, dn in zip(accounts[1:4], amounts, ns, dns):
+                amount = int(amount * 10 ** collateral_token.decimals())
+                amm.deposit_range(user, amount, n1, n1 + dn)
+                boa.deal(
+                    collateral_token,
+                    amm,
+                    collateral_token.balanceOf(amm) + amount,
+                )
+
+        # Buy out a part of the collateral to get bands with borrowed tokens
+        amount = int(frac * collateral_token.balanceOf(amm))
+        if amount > 0:
+            amount = amm.get_dydx(0, 1, amount)[1]
+            boa.deal(borrowed_token, trader, amount)
+            borrowed_token.approve(amm, 2**256 - 1, sender=trader)
+            amm.exchange(0, 1, amount, 0, sender=trader)
+
+        for n_end in n_ends + [amm.min_band() - 1, amm.max_band() + 1]:
+            expected = can_skip_bands(amm, n_end)
+            if expected is None:
+                with boa.reverts("Too deep"):
+                    amm.can_skip_bands(n_end)
+            else:
+                assert amm.can_skip_bands(n_end) == expected
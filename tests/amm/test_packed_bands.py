@@ -0,0 +1,107 @@
+import boa
+import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from tests.utils.deployers import AMM_PACKED_DEPLOYER
+
+
+@pytest.fixture(scope="module")
+def packed_amm(collateral_token, borrowed_token, get_amm):
+    return get_amm(collateral_token, borrowed_token, AMM_PACKED_DEPLOYER)
+
+
+def assert_same_state(amm, packed_amm, users):
+    assert packed_amm.active_band() == amm.active_band()
+    assert packed_amm.min_band() == amm.min_band()
+    assert packed_amm.max_band() == amm.max_band()
+    assert packed_amm.get_p() == amm.get_p()
+    n = amm.active_band()
+    assert packed_amm.bands_x(n) == amm.bands_x(n)
+    assert packed_amm.bands_y(n) == amm.bands_y(n)
+    bands_x = amm._storage.bands_x.get()
+    bands_y = amm._storage.bands_y.get()
+    bands = packed_amm._storage._bands.get()
+    for n in set(bands_x) | set(bands_y) | set(bands):
+        x, y = bands_x.get(n, 0), bands_y.get(n, 0)
+        assert bands.get(n, 0) == x | (y << 128)
+    for user in users:
+        assert packed_amm.get_sum_xy(user) == amm.get_sum_xy(user)
+        assert packed_amm.get_x_down(user) == amm.get_x_down(user)
+
+
+@given(
+    amounts=st.lists(st.floats(min_value=0.01, max_value=1e6), min_size=5, max_size=5),
+    ns=st.lists(st.integers(min_value=1, max_value=20), min_size=5, max_size=5),
+    dns=st.lists(st.integers(min_value=0, max_value=20), min_size=5, max_size=5),
+    trades=st.lists(
+        st.tuples(
+            st.integers(min_value=0, max_value=1),
+            st.booleans(),
+            st.floats(min_value=0, max_value=1),
+        ),
+        min_size=1,
+        max_size=6,
+    ),
+    fracs=st.lists(st.integers(min_value=0, max_value=10**18), min_size=5, max_size=5),
+)
+@settings(max_examples=20)
+def test_packed_matches_amm(
+    amm,
+    packed_amm,
+    accounts,
+    admin,
+    collateral_token,
+    borrowed_token,
+    amounts,
+    ns,
+    dns,
+    trades,
+    fracs,
+):
+    users = accounts[1:6]
+    trader = accounts[6]
+    tokens = [borrowed_token, collateral_token]
+    for contract in (amm, packed_amm):
+        for token in tokens:
+            token.approve(contract, 2**256 - 1, sender=trader)
+
+    with boa.env.anchor():
+        with boa.env.prank(admin):
+            for user, amount, n1, dn in zip(users, amounts, ns, dns):
+                amount = int(amount * 10 ** collateral_token.decimals())
+                try:
+                    amm.deposit_range(user, amount, n1, n1 + dn)
+                except boa.BoaError:
+                    with boa.reverts():
+                        packed_amm.deposit_range(user, amount, n1, n1 + dn)
+                    continue
+                packed_amm.deposit_range(user, amount, n1, n1 + dn)
+                for contract in (amm, packed_amm):
+                    boa.deal(
+                        collateral_token,
+                        contract,
+                        collateral_token.balanceOf(contract) + amount,
+                    )
+        assert_same_state(amm, packed_amm, users)
+
+        for i, use_dy, size in trades:
+            j = 1 - i
+            # Up to the whole balance of the token which is bought
+            amount = int(size * tokens[j].balanceOf(amm))
+            if amount > 0:
+                out_amount, in_amount = amm.get_dydx(i, j, amount)
+                amount = out_amount if use_dy else in_amount
+            boa.deal(tokens[i], trader, 2 * 10**40)
+            method = "exchange_dy" if use_dy else "exchange"
+            limit = 2**256 - 1 if use_dy else 0
+            out = getattr(amm, method)(i, j, amount, limit, sender=trader)
+            packed_out = getattr(packed_amm, method)(i, j, amount, limit, sender=trader)
+            assert packed_out == out
+            assert_same_state(amm, packed_amm, users)
+
+        with boa.env.prank(admin):
+            for user, frac in zip(users, fracs):
+                if amm.has_liquidity(user) and frac > 0:
+                    assert packed_amm.withdraw(user, frac) == amm.withdraw(user, frac)
+        assert_same_state(amm, packed_amm, users)
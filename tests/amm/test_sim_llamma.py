@@ -0,0 +1,115 @@
+import boa
+import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from curve_stablecoin.sim import llamma
+from curve_stablecoin.sim.evm_math import wad_exp, wad_ln
+
+
+def test_p_oracle_up(amm, borrowed_token, collateral_token):
+    s = llamma.AMMState.from_contract(amm, borrowed_token, collateral_token)
+    for n in range(-60, 60, 7):
+        assert llamma.p_oracle_up(s, n) == amm.p_oracle_up(n)
+
+
+@pytest.fixture(scope="module")
+def snekmate_math():
+    return boa.loads(
+        """
+from snekmate.utils import math
+
+@external
+@pure
+def wad_exp(x: int256) -> int256:
+    return math._wad_exp(x)
+
+@external
+@pure
+def wad_ln(x: int256) -> int256:
+    return math._wad_ln(x)
+"""
+    )
+
+
+@given(x=st.integers(min_value=-(10**21), max_value=10**20))
+@settings(max_examples=1000)
+def test_wad_exp(snekmate_math, x):
+    assert wad_exp(x) == snekmate_math.wad_exp(x)
+
+
+@given(x=st.integers(min_value=0, max_value=2**255 - 1))
+@settings(max_examples=1000)
+def test_wad_ln(snekmate_math, x):
+    assert wad_ln(x) == snekmate_math.wad_ln(x)
+
+
+@given(
+    oracle_price=st.integers(min_value=2400 * 10**18, max_value=3750 * 10**18),
+    n1=st.integers(min_value=1, max_value=30),
+    dn=st.integers(min_value=0, max_value=30),
+    deposit_amount=st.integers(min_value=10**12, max_value=10**22),
+    init_trade=st.integers(min_value=0, max_value=10**12),
+    amounts=st.lists(
+        st.integers(min_value=0, max_value=10**24), min_size=1, max_size=5
+    ),
+    i=st.integers(min_value=0, max_value=1),
+)
+@settings(max_examples=200)
+def test_sim_matches_amm(
+    price_oracle,
+    amm,
+    collateral_token,
+    borrowed_token,
+    admin,
+    oracle_price,
+    n1,
+    dn,
+    deposit_amount,
+    init_trade,
+    amounts,
+    i,
+):
+    user = boa.env.generate_address()
+    with boa.env.anchor():
+        with boa.env.prank(admin):
+            price_oracle.set_price(oracle_price)
+        boa.env.time_travel(3600)
+
+        with boa.env.prank(admin):
+            amm.deposit_range(user, deposit_amount, n1, n1 + dn)
+            boa.deal(
+                collateral_token,
+                amm.address,
+                collateral_token.balanceOf(amm.address) + deposit_amount,
+            )
+
+        # Move somewhere inside the bands
+        if init_trade > 0:
+            boa.deal(borrowed_token, user, init_trade)
+            with boa.env.prank(user):
+                borrowed_token.approve(amm.address, 2**256 - 1)
+                amm.exchange(0, 1, init_trade, 0)
+        boa.env.time_travel(600)
+
+        state = llamma.AMMState.from_contract(amm, borrowed_token, collateral_token)
+        assert llamma.get_p(state) == amm.get_p()
+
+        j = 1 - i
+        for amount in amounts:
+            dxdy = llamma.get_dxdy(state, i, j, amount)
+            assert (dxdy.in_amount, dxdy.out_amount) == amm.get_dxdy(i, j, amount)
+            dydx = llamma.get_dxdy(state, i, j, amount, False)
+            assert (dydx.out_amount, dydx.in_amount) == amm.get_dydx(i, j, amount)
+
+        used, out = llamma.quote_dxdy_many(state, i, j, amounts)
+        assert [(u, o) for u, o in zip(used, out)] == [
+            amm.get_dxdy(i, j, a) for a in amounts
+        ]
+        got, need = llamma.quote_dydx_many(state, i, j, amounts)
+        assert [(g, n) for g, n in zip(got, need)] == [
+            amm.get_dydx(i, j, a) for a in amounts
+        ]
+
+        p = amm.get_p() * 11 // 10
+        assert llamma.get_amount_for_price(state, p) == amm.get_amount_for_price(p)
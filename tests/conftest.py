@@ -33,8 +33,13 @@ settings.register_profile(
 settings.load_profile("no-shrink")
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def proto():
+    """
+    Deployed once per session (once per xdist worker). boa anchors every
+    fixture and test, so whatever modules do to the protocol is reverted
+    when their fixtures are torn down.
+    """
     return Llamalend()
 
 
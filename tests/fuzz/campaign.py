@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Resumable fuzz campaign over the stateful and bigfuzz suites.
+
+The campaign is split into rounds. Every round is a separate pytest run of
+all the suites where every test gets a hypothesis seed derived from the
+campaign seed, the round number and the test node id, so the examples of a
+round are the same every time it runs. Rounds run in `--jobs` parallel
+processes and share the example database in `<dir>/examples`, so a failure
+found by one round is replayed first by every round started after it.
+
+    python -m tests.fuzz.campaign --dir .tmp/fuzz --rounds 100 --jobs 8
+
+Completed rounds are recorded in `<dir>/state.json`: running the same command
+again (e.g. after the campaign was interrupted) only runs the rounds that did
+not finish, and raising `--rounds` extends a finished campaign. The output of
+each round is in `<dir>/rounds/<round>/log.txt` and `<dir>/coverage.json` has,
+for every test, the number of examples that passed/failed and how many reported
+each hypothesis event, among which the controller states reached (see
+`tests.fuzz.states`).
+
+A failing example can be reproduced from the example database with
+
+    pytest <suite> --runxfail -p tests.fuzz.campaign_plugin --campaign-database .tmp/fuzz/examples
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from tests.fuzz.campaign_plugin import derive_seed
+from tests.fuzz.states import STATE_EVENT
+
+SUITES = (
+    "tests/stableborrow/test_bigfuzz.py::test_big_fuzz",
+    "tests/lending/test_bigfuzz.py::test_big_fuzz",
+    "tests/fuzz/stateful/test_controller_stateful.py",
+    "tests/fuzz/stateful/test_lend_controller_stateful.py",
+)
+ROOT = Path(__file__).resolve().parents[2]
+
+
+class Campaign:
+    def __init__(self, path: Path, seed: int, suites: list[str]):
+        self.path = path
+        self.state_path = path / "state.json"
+        self.lock = threading.Lock()
+        if self.state_path.exists():
+            self.state = json.loads(self.state_path.read_text())
+            if self.state["seed"] != seed or self.state["suites"] != suites:
+                raise SystemExit(
+                    f"{path} holds a campaign with seed {self.state['seed']} "
+                    f"over {self.state['suites']}, use another --dir"
+                )
+        else:
+            self.state = {"seed": seed, "suites": suites, "rounds": {}}
+
+    def pending(self, rounds: int) -> list[int]:
+        return [n for n in range(rounds) if str(n) not in self.state["rounds"]]
+
+    def round_dir(self, n: int) -> Path:
+        return self.path / "rounds" / str(n)
+
+    def run_round(self, n: int) -> dict:
+        seed = derive_seed(self.state["seed"], n)
+        round_dir = self.round_dir(n)
+        round_dir.mkdir(parents=True, exist_ok=True)
+        cmd = [
+            sys.executable,
+            "-m",
+            "pytest",
+            *self.state["suites"],
+            "-q",
+            "--runxfail",
+            "-p",
+            "no:cacheprovider",
+            "-p",
+            "tests.fuzz.campaign_plugin",
+            f"--campaign-seed={seed}",
+            f"--campaign-database={self.path / 'examples'}",
+            f"--campaign-coverage={round_dir / 'coverage.json'}",
+        ]
+        start = time.monotonic()
+        with open(round_dir / "log.txt", "w") as log:
+            returncode = subprocess.call(
+                cmd, cwd=ROOT, stdout=log, stderr=subprocess.STDOUT
+            )
+        return {
+            "seed": seed,
+            "returncode": returncode,
+            "duration": round(time.monotonic() - start, 1),
+        }
+
+    def record(self, n: int, result: dict):
+        with self.lock:
+            self.state["rounds"][str(n)] = result
+            tmp = self.state_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.state, indent=2))
+            os.replace(tmp, self.state_path)
+
+    def coverage(self) -> dict:
+        examples = defaultdict(Counter)
+        events = defaultdict(Counter)
+        for n in self.state["rounds"]:
+            path = self.round_dir(int(n)) / "coverage.json"
+            if not path.exists():
+                continue
+            for test, data in json.loads(path.read_text()).items():
+                examples[test].update(data["examples"])
+                events[test].update(data["events"])
+        return {
+            test: {"examples": dict(examples[test]), "events": dict(events[test])}
+            for test in examples
+        }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--dir", default=".tmp/fuzz", help="Campaign directory (default: .tmp/fuzz)."
+    )
+    parser.add_argument(
+        "--rounds", type=int, required=True, help="Total number of rounds."
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Rounds run in parallel (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Campaign seed (default: 0)."
+    )
+    parser.add_argument(
+        "suites",
+        nargs="*",
+        default=list(SUITES),
+        help="pytest node ids to fuzz (default: stateful and bigfuzz suites).",
+    )
+    args = parser.parse_args()
+
+    path = Path(args.dir).resolve()
+    path.mkdir(parents=True, exist_ok=True)
+    campaign = Campaign(path, args.seed, args.suites)
+    pending = campaign.pending(args.rounds)
+    print(
+        f"{len(pending)} of {args.rounds} rounds to run in {path} with {args.jobs} jobs"
+    )
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {executor.submit(campaign.run_round, n): n for n in pending}
+        try:
+            for future in as_completed(futures):
+                n = futures[future]
+                result = future.result()
+                campaign.record(n, result)
+                status = "ok" if result["returncode"] == 0 else "FAILED"
+                print(f"round {n}: {status} in {result['duration']}s")
+        except KeyboardInterrupt:
+            # Unfinished rounds are not recorded and run again on resume
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    coverage = campaign.coverage()
+    (path / "coverage.json").write_text(json.dumps(coverage, indent=2, sort_keys=True))
+    for test, data in sorted(coverage.items()):
+        examples = data["examples"]
+        states = [e for e in data["events"] if e.startswith(STATE_EVENT)]
+        print(
+            f"{test}: {sum(examples.values())} examples, "
+            f"{examples.get('failed', 0)} failed, {len(states)} controller states"
+        )
+
+    failed = sorted(
+        int(n) for n, r in campaign.state["rounds"].items() if r["returncode"] != 0
+    )
+    for n in failed:
+        print(f"round {n} failed, see {campaign.round_dir(n) / 'log.txt'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
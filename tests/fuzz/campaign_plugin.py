@@ -0,0 +1,119 @@
+"""
+pytest plugin running one round of a fuzz campaign (see `tests.fuzz.campaign`).
+
+    pytest tests/fuzz/stateful -p tests.fuzz.campaign_plugin --campaign-seed 1 \
+        --campaign-database .tmp/fuzz/examples --campaign-coverage coverage.json
+
+`--campaign-seed` seeds every hypothesis test from the seed of the round and
+the test node id.
+
+`--campaign-database` makes every hypothesis test read and write the shared
+example database of the campaign, so failures found by any round are replayed
+first by the following ones (and by the command above).
+
+`--campaign-coverage` writes, for every hypothesis test, how many examples
+passed/failed and how many of them reported each `hypothesis.event()`, e.g. the
+controller states reached (see `tests.fuzz.states`).
+"""
+
+import hashlib
+import json
+from collections import Counter, defaultdict
+from pathlib import Path
+from random import Random
+
+import pytest
+from hypothesis import core, settings
+from hypothesis.database import DirectoryBasedExampleDatabase
+from hypothesis.internal import observability
+
+coverage_key = pytest.StashKey["StateCoverage"]()
+
+
+def derive_seed(*parts) -> int:
+    digest = hashlib.sha256(":".join(map(str, parts)).encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("fuzz-campaign")
+    group.addoption(
+        "--campaign-seed",
+        type=int,
+        help="Seed every hypothesis test with a hash of this seed and its node id.",
+    )
+    group.addoption(
+        "--campaign-database",
+        help="Directory of the hypothesis example database shared by the campaign.",
+    )
+    group.addoption(
+        "--campaign-coverage",
+        help="Write the examples run and the events they reported to this JSON file.",
+    )
+
+
+class StateCoverage:
+    def __init__(self, path: Path):
+        self.path = path
+        self.examples = defaultdict(Counter)
+        self.events = defaultdict(Counter)
+
+    def __call__(self, observation):
+        if observation.type != "test_case":
+            return
+        self.examples[observation.property][observation.status] += 1
+        self.events[observation.property].update(observation.features.keys())
+
+    def dump(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(
+            json.dumps(
+                {
+                    test: {
+                        "examples": dict(self.examples[test]),
+                        "events": dict(self.events[test]),
+                    }
+                    for test in self.examples
+                },
+                indent=2,
+                sort_keys=True,
+            )
+        )
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_configure(config):
+    # After conftest and the hypothesis plugin have loaded their profile
+    database = config.getoption("campaign_database")
+    if database is not None:
+        settings.register_profile(
+            "campaign",
+            parent=settings.default,
+            database=DirectoryBasedExampleDatabase(database),
+        )
+        settings.load_profile("campaign")
+
+    path = config.getoption("campaign_coverage")
+    if path is not None:
+        coverage = config.stash[coverage_key] = StateCoverage(Path(path))
+        # Only events are needed, line coverage would slow every example down
+        observability.OBSERVABILITY_COLLECT_COVERAGE = False
+        observability.add_observability_callback(coverage)
+
+
+def pytest_runtest_setup(item):
+    # Unlike --hypothesis-seed this keeps the example database in use (hypothesis
+    # ignores it for forced seeds) and parametrized copies of a test (e.g. the
+    # chunks of the stableborrow bigfuzz) do not run the same examples
+    seed = item.config.getoption("campaign_seed")
+    if seed is not None:
+        core.threadlocal._hypothesis_global_random = Random(
+            derive_seed(seed, item.nodeid)
+        )
+
+
+def pytest_unconfigure(config):
+    coverage = config.stash.get(coverage_key, None)
+    if coverage is not None:
+        observability.remove_observability_callback(coverage)
+        coverage.dump()
@@ -18,6 +18,7 @@ from hypothesis.stateful import (
 
 import boa
 
+from tests.fuzz.states import record_controller_state
 from tests.fuzz.strategies import mint_markets, ticks
 from tests.utils.deployers import AMM_DEPLOYER, ERC20_MOCK_DEPLOYER, STABLECOIN_DEPLOYER
 from tests.utils.constants import (
@@ -275,6 +276,10 @@ class ControllerStateful(RuleBasedStateMachine):
         for u in self.users:
             assert self.controller.loan_exists(u)
 
+    @invariant()
+    def record_state(self):
+        record_controller_state(self.controller, self.users)
+
     @precondition(lambda self: len(self.users) > 0)
     @invariant()
     def liquidate(self):
@@ -0,0 +1,29 @@
+from hypothesis import event
+
+STATE_EVENT = "controller state"
+
+
+def controller_state(controller, users) -> str:
+    """
+    Coarse state of a market: which kinds of loans are open among `users`.
+
+    A loan is either healthy, in soft liquidation (part of its collateral is
+    converted in the AMM) or underwater (negative health). The state is the
+    sorted combination of the kinds present, "empty" if there are no loans.
+    """
+    kinds = set()
+    for user in users:
+        if not controller.loan_exists(user):
+            continue
+        if controller.health(user) < 0:
+            kinds.add("underwater")
+        elif controller.user_state(user)[1] > 0:
+            kinds.add("soft-liquidation")
+        else:
+            kinds.add("healthy")
+    return "+".join(sorted(kinds)) or "empty"
+
+
+def record_controller_state(controller, users):
+    """Report the state reached as a hypothesis event (see `tests.fuzz.campaign`)."""
+    event(f"{STATE_EVENT}: {controller_state(controller, users)}")
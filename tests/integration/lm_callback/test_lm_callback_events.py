@@ -42,6 +42,31 @@ def test_checkpoint_band(collateral_token, controller, amm, lm_callback):
             assert log.collateral_per_share == lm_callback.collateral_per_share(log.n)
 
 
+def test_checkpoint_band_on_exchange(
+    admin, collateral_token, controller, amm, price_oracle, trader, lm_callback
+):
+    with boa.env.anchor():
+        borrower = _create_loan(collateral_token, controller)
+        n1, n2 = amm.read_user_tick_numbers(borrower)
+        boa.env.time_travel(WEEK)
+
+        # Converts the top band of the loan and a part of the next one
+        p = (amm.p_oracle_up(n1 + 1) + amm.p_oracle_down(n1 + 1)) // 2
+        price_oracle.set_price(p, sender=admin)
+        cps = {n: lm_callback.collateral_per_share(n) for n in range(n1, n2 + 1)}
+        amount, _ = amm.get_amount_for_price(p)
+        amm.exchange(0, 1, amount, 0, sender=trader)
+
+        # Bands whose collateral per share didn't change are left stale
+        logs = filter_logs(lm_callback, "CheckpointBand", amm._computation)
+        changed = [n for n in cps if lm_callback.collateral_per_share(n) != cps[n]]
+        assert changed == [n1, n1 + 1]
+        assert [log.n for log in logs] == changed
+        for log in logs:
+            assert log.collateral_per_share == cps[log.n]
+            assert lm_callback.I_rps(log.n) == (log.rps, lm_callback.I_rpc()[0])
+
+
 def test_checkpoint_user(collateral_token, controller, lm_callback):
     with boa.env.anchor():
         borrower = _create_loan(collateral_token, controller)
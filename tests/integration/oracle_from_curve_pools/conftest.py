@@ -38,6 +38,10 @@ def __init__(n: uint256, prices: DynArray[uint256, 8]):
 def price_oracle(i: uint256) -> uint256:
     assert i + 1 < self.n_coins  # valid indices are 0 .. n_coins-2, like real pools
     return self.prices[i]
+
+@external
+def set_price(i: uint256, price: uint256):
+    self.prices[i] = price
 """
 
 # 2-coin pool exposing only the argument-less price_oracle(). It intentionally
@@ -181,6 +181,41 @@ def test_price_w_matches_price(make_arg_pool, deploy_oracle):
     assert oracle.price_w() == oracle.price()
 
 
+# Moves the pool price after a price_w() and reads the oracle again, all in
+# one transaction.
+MOVE_AFTER_PRICE_W_SOURCE = """
+# pragma version 0.4.3
+
+interface Oracle:
+    def price() -> uint256: view
+    def price_w() -> uint256: nonpayable
+
+interface Pool:
+    def set_price(i: uint256, price: uint256): nonpayable
+
+@external
+def move_after_price_w(oracle: Oracle, pool: Pool, price: uint256) -> uint256[3]:
+    p: uint256 = extcall oracle.price_w()
+    extcall pool.set_price(0, price)
+    return [p, extcall oracle.price_w(), staticcall oracle.price()]
+"""
+
+
+def test_price_w_cached_for_transaction(make_arg_pool, deploy_oracle):
+    pool = make_arg_pool(2, [P])
+    oracle = deploy_oracle([pool], [0], [1])
+    caller = boa.loads(MOVE_AFTER_PRICE_W_SOURCE)
+
+    # The pool is only read by the first price_w() of the transaction
+    assert caller.move_after_price_w(oracle, pool, 2 * P) == [P, P, P]
+
+    # The next transaction reads the pool again. boa does not reset transient
+    # storage between calls like the end of a transaction does
+    boa.env.evm.vm.state.clear_transient_storage()
+    assert oracle.price() == 2 * P
+    assert oracle.price_w() == 2 * P
+
+
 def test_public_config_getters(make_arg_pool, make_noarg_pool, deploy_oracle):
     pool0 = make_arg_pool(3, [P1, P2])
     pool1 = make_noarg_pool(Q)
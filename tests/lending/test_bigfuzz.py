@@ -11,6 +11,7 @@ from hypothesis.stateful import (
     invariant,
 )
 
+from tests.fuzz.states import record_controller_state
 from tests.utils.constants import ZERO_ADDRESS
 
 
@@ -498,6 +499,10 @@ class BigFuzz(RuleBasedStateMachine):
             >= self.controller.lent()
         )
 
+    @invariant()
+    def record_state(self):
+        record_controller_state(self.controller, self.accounts)
+
 
 def test_big_fuzz(
     vault,
@@ -11,6 +11,7 @@ from hypothesis.stateful import (
     invariant,
 )
 
+from tests.fuzz.states import record_controller_state
 from tests.utils.deployers import AMM_DEPLOYER, MINT_CONTROLLER_DEPLOYER
 
 # Variables and methods to check
@@ -488,6 +489,10 @@ class BigFuzz(RuleBasedStateMachine):
             >= self.market_controller.minted()
         )
 
+    @invariant()
+    def record_state(self):
+        record_controller_state(self.market_controller, self.accounts)
+
     # Debt ceiling
     @rule(d_ceil=debt_ceiling_change)
     def change_debt_ceiling(self, d_ceil):
@@ -0,0 +1,100 @@
+from fractions import Fraction
+from math import isqrt
+from textwrap import dedent
+
+import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from tests.utils.constants import DEAD_SHARES, MAX_A, MAX_TICKS, MIN_A, MIN_TICKS, WAD
+
+
+@pytest.fixture(scope="module", autouse=True)
+def expose_internal(controller):
+    controller.inject_function(
+        dedent(
+            """
+        @external
+        @pure
+        def geometric_sum(_d: uint256, _N: uint256, _A: uint256) -> uint256:
+            return core._geometric_sum(_d, _N, _A)
+        """
+        )
+    )
+    controller.inject_function(
+        dedent(
+            """
+        @external
+        @pure
+        def get_y_effective(
+            _collateral: uint256,
+            _N: uint256,
+            _discount: uint256,
+            _SQRT_BAND_RATIO: uint256,
+            _A: uint256,
+        ) -> uint256:
+            return core._get_y_effective(_collateral, _N, _discount, _SQRT_BAND_RATIO, _A)
+        """
+        )
+    )
+
+
+def geometric_sum_loop(d, N, A):
+    # Summation term by term which was used before the closed form
+    y = d
+    for _ in range(1, N):
+        d = d * (A - 1) // A
+        y += d
+    return y
+
+
+def geometric_sum_exact(d, N, A):
+    r = Fraction(A - 1, A)
+    return d * A * (1 - r**N)
+
+
+@given(
+    d=st.integers(min_value=0, max_value=10**40),
+    N=st.integers(min_value=1, max_value=MAX_TICKS),
+    A=st.integers(min_value=MIN_A, max_value=MAX_A),
+)
+@settings(max_examples=500)
+def test_geometric_sum(controller, d, N, A):
+    result = controller.inject.geometric_sum(d, N, A)
+
+    # Never above the exact sum
+    exact = geometric_sum_exact(d, N, A)
+    error = Fraction(2 * d, WAD) + 1
+    assert exact - error <= result <= exact
+
+    # Summing term by term rounds every term down
+    loop = geometric_sum_loop(d, N, A)
+    assert exact - N * (N - 1) // 2 <= loop <= exact
+    assert -error <= result - loop <= N * (N - 1) // 2
+
+
+@given(
+    collateral=st.integers(min_value=0, max_value=10**36),
+    N=st.integers(min_value=MIN_TICKS, max_value=MAX_TICKS),
+    discount=st.integers(min_value=0, max_value=WAD),
+    A=st.integers(min_value=MIN_A, max_value=MAX_A),
+)
+@settings(max_examples=200)
+def test_get_y_effective(controller, collateral, N, discount, A):
+    sqrt_band_ratio = isqrt(10**36 * A // (A - 1))
+    d = (
+        collateral
+        * (
+            WAD
+            - min(
+                discount + DEAD_SHARES * WAD // max(collateral // N, DEAD_SHARES), WAD
+            )
+        )
+        // (sqrt_band_ratio * N)
+    )
+    loop = geometric_sum_loop(d, N, A)
+
+    result = controller.inject.get_y_effective(
+        collateral, N, discount, sqrt_band_ratio, A
+    )
+    assert -(Fraction(2 * d, WAD) + 1) <= result - loop <= N * (N - 1) // 2
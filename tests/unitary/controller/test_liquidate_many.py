@@ -0,0 +1,152 @@
+import boa
+import pytest
+from tests.utils import max_approve, filter_logs
+
+N_BANDS = 6
+N_USERS = 4
+
+
+@pytest.fixture(scope="module")
+def seed_liquidity(borrowed_token):
+    return 10**6 * 10 ** borrowed_token.decimals()
+
+
+@pytest.fixture(scope="module")
+def create_loans(controller, collateral_token, borrowed_token):
+    def fn():
+        borrowers = []
+        for i in range(N_USERS):
+            borrower = boa.env.generate_address()
+            collateral_amount = (i + 1) * 10 ** collateral_token.decimals() // 10
+            boa.deal(collateral_token, borrower, collateral_amount)
+            with boa.env.prank(borrower):
+                max_approve(collateral_token, controller)
+                max_approve(borrowed_token, controller)
+                debt = controller.max_borrowable(collateral_amount, N_BANDS + i)
+                controller.create_loan(collateral_amount, debt, N_BANDS + i)
+            borrowers.append(borrower)
+        return borrowers
+
+    return fn
+
+
+@pytest.fixture(scope="module")
+def liquidator(controller, borrowed_token):
+    liquidator = boa.env.generate_address()
+    max_approve(borrowed_token, controller, sender=liquidator)
+    return liquidator
+
+
+def liquidation_state(controller, borrowed_token, collateral_token, users, liquidator):
+    return {
+        "debts": [controller.debt(user) for user in users],
+        "states": [controller.user_state(user) for user in users],
+        "total_debt": controller.total_debt(),
+        "repaid": controller.eval("core.repaid"),
+        "n_loans": controller.n_loans(),
+        "liquidator_borrowed": borrowed_token.balanceOf(liquidator),
+        "liquidator_collateral": collateral_token.balanceOf(liquidator),
+        "controller_borrowed": borrowed_token.balanceOf(controller),
+    }
+
+
+@pytest.mark.parametrize("frac", [10**18, 4 * 10**17])
+def test_liquidate_many_matches_liquidate(
+    controller,
+    price_oracle,
+    admin,
+    borrowed_token,
+    collateral_token,
+    create_loans,
+    liquidator,
+    frac,
+):
+    """
+    Liquidating a batch ends in the same state as liquidating the same users
+    one by one. Healthy users and users without a loan are skipped.
+    """
+    borrowers = create_loans()
+    price_oracle.set_price(price_oracle.price() // 2, sender=admin)
+    for user in borrowers:
+        assert controller.health(user) < 0
+
+    healthy = boa.env.generate_address()
+    boa.deal(collateral_token, healthy, 10 ** collateral_token.decimals())
+    with boa.env.prank(healthy):
+        max_approve(collateral_token, controller)
+        controller.create_loan(
+            10 ** collateral_token.decimals(),
+            controller.max_borrowable(10 ** collateral_token.decimals(), N_BANDS) // 10,
+            N_BANDS,
+        )
+    assert controller.health(healthy) > 0
+    no_loan = boa.env.generate_address()
+
+    users = borrowers + [healthy, no_loan]
+    boa.deal(
+        borrowed_token,
+        liquidator,
+        sum(controller.tokens_to_liquidate(user, frac) for user in borrowers),
+    )
+
+    with boa.env.anchor():
+        for user in borrowers:
+            controller.liquidate(user, 0, frac, sender=liquidator)
+        expected = liquidation_state(
+            controller, borrowed_token, collateral_token, users, liquidator
+        )
+
+    controller.liquidate_many(users, [0] * len(users), frac, sender=liquidator)
+    liquidate_logs = filter_logs(controller, "Liquidate")
+    assert [log.user for log in liquidate_logs] == borrowers
+
+    assert (
+        liquidation_state(
+            controller, borrowed_token, collateral_token, users, liquidator
+        )
+        == expected
+    )
+    assert controller.health(healthy) > 0
+
+
+def test_liquidate_many_slippage(
+    controller,
+    amm,
+    price_oracle,
+    admin,
+    borrowed_token,
+    create_loans,
+    liquidator,
+):
+    borrowers = create_loans()
+    price_oracle.set_price(price_oracle.price() // 2, sender=admin)
+    boa.deal(
+        borrowed_token,
+        liquidator,
+        sum(controller.tokens_to_liquidate(user) for user in borrowers),
+    )
+
+    min_xs = [amm.get_sum_xy(user)[0] for user in borrowers]
+    min_xs[-1] += 1
+    with boa.reverts("Slippage"):
+        controller.liquidate_many(borrowers, min_xs, sender=liquidator)
+
+    min_xs[-1] -= 1
+    controller.liquidate_many(borrowers, min_xs, sender=liquidator)
+    for user in borrowers:
+        assert not controller.loan_exists(user)
+
+
+def test_liquidate_many_nothing_to_liquidate(
+    controller, borrowed_token, create_loans, liquidator
+):
+    borrowers = create_loans()
+    total_debt = controller.total_debt()
+
+    controller.liquidate_many([], [], sender=liquidator)
+    controller.liquidate_many(borrowers, [0] * len(borrowers), sender=liquidator)
+    assert len(filter_logs(controller, "Liquidate")) == 0
+
+    assert controller.total_debt() == total_debt
+    for user in borrowers:
+        assert controller.loan_exists(user)
@@ -0,0 +1,69 @@
+import boa
+import pytest
+
+from curve_stablecoin.sim import llamma
+from curve_stablecoin.sim.scanner import LiquidationScanner, cold_error
+from tests.utils import max_approve
+
+N_LOANS = 12
+
+
+@pytest.fixture(scope="module")
+def seed_liquidity(borrowed_token):
+    return 1000 * 18**6 * 10 ** borrowed_token.decimals()
+
+
+@pytest.fixture(scope="module")
+def borrowers(controller, collateral_token):
+    users = []
+    for i in range(N_LOANS):
+        borrower = boa.env.generate_address()
+        collateral_amount = (i + 1) * 10 ** collateral_token.decimals() // 10
+        boa.deal(collateral_token, borrower, collateral_amount)
+        with boa.env.prank(borrower):
+            max_approve(collateral_token, controller)
+            n = 4 + i * 3
+            debt = controller.max_borrowable(collateral_amount, n) * (10 - i % 4) // 10
+            controller.create_loan(collateral_amount, debt, n)
+        users.append(borrower)
+    return users
+
+
+def _assert_matches(scanner, controller):
+    # Cold positions are estimated, reported ones are exact
+    for user, pos in scanner.positions.items():
+        assert abs(pos.health - controller.health(user, True)) <= cold_error(pos)
+    positions = scanner.users_to_liquidate()
+    for pos in positions:
+        assert pos.health == controller.health(pos.user, True)
+    assert [p.user for p in positions] == sorted(
+        (u for u in scanner.positions if controller.health(u, True) < 0),
+        key=lambda u: controller.health(u, True),
+    )
+
+
+def test_scanner_matches_controller(
+    controller, amm, borrowers, collateral_token, price_oracle, admin
+):
+    scanner = LiquidationScanner.from_boa(controller, amm)
+    assert len(scanner.positions) == N_LOANS
+    _assert_matches(scanner, controller)
+
+    # Price drops into some of the bands
+    price_oracle.set_price(price_oracle.price() * 85 // 100, sender=admin)
+    trader = boa.env.generate_address()
+    boa.deal(collateral_token, trader, 10 ** collateral_token.decimals())
+    with boa.env.prank(trader):
+        max_approve(collateral_token, amm)
+        amm.exchange(1, 0, 10 ** collateral_token.decimals() // 2, 0)
+    boa.env.time_travel(7 * 86400)
+
+    evaluations = scanner.evaluations
+    scanner.update(
+        llamma.AMMState.from_boa(amm),
+        debts={u: controller.debt(u) for u in borrowers},
+    )
+    _assert_matches(scanner, controller)
+    # Only positions reached by the price needed a band walk
+    assert scanner.evaluations - evaluations < N_LOANS
+    assert len(scanner.users_to_liquidate()) > 0
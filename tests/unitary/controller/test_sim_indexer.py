@@ -0,0 +1,233 @@
+import json
+
+import boa
+import pytest
+from boa.contracts.event_decoder import RawLogEntry
+
+from curve_stablecoin.sim import llamma
+from curve_stablecoin.sim.indexer import Indexer, IndexerError, MarketConfig
+from tests.utils import max_approve
+from tests.utils.deployers import ERC20_MOCK_DEPLOYER
+
+N_LOANS = 4
+
+
+@pytest.fixture(scope="module")
+def collateral_token(collateral_decimals, borrowed_decimals):
+    # A new token for every parametrization, so that every market starts empty
+    return ERC20_MOCK_DEPLOYER.deploy(collateral_decimals)
+
+
+@pytest.fixture(scope="module")
+def seed_liquidity(borrowed_token):
+    return 10**6 * 10 ** borrowed_token.decimals()
+
+
+class Recorder:
+    """Sends transactions and dumps their logs the way a log indexer would."""
+
+    def __init__(self, amm, price_oracle, path):
+        self.amm = amm
+        self.price_oracle = price_oracle
+        self.path = path
+        self.block = 0
+
+    def p_o(self):
+        # What the AMM's `_price_oracle_w` is about to return
+        storage = self.amm._storage
+        return llamma.limit_p_o(
+            self.price_oracle.price(),
+            storage.old_p_o.get(),
+            storage.old_dfee.get(),
+            boa.env.evm.patch.timestamp - storage.prev_p_o_time.get(),
+        )
+
+    def __call__(self, contract, method: str, *args, hints=None, **kwargs):
+        p_o = self.p_o()
+        getattr(contract, method)(*args, **kwargs)
+        self.block += 1
+        records = []
+        for i, log in enumerate(contract.get_logs(strict=False)):
+            if isinstance(log, RawLogEntry):
+                continue
+            args = log._asdict()
+            address = args.pop("address")
+            record = {
+                "block": self.block,
+                "log_index": i,
+                "timestamp": boa.env.evm.patch.timestamp,
+                "address": str(address),
+                "event": type(log).__name__,
+                # Large integers as strings, like most dumps have them
+                "args": {k: str(v) for k, v in args.items()},
+            }
+            if record["event"] == "TokenExchange":
+                record["p_o"] = [str(p) for p in p_o]
+            # Fields a dump would take from call traces
+            record |= (hints or {}).get(record["event"], {})
+            records.append(record)
+        with open(self.path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+
+def _assert_matches(indexer, amm, controller, users):
+    m = indexer.market(amm.address)
+    ts = boa.env.evm.patch.timestamp
+    state = llamma.AMMState.from_boa(amm)
+
+    def nonzero(d):
+        return {k: v for k, v in d.items() if v}
+
+    assert m.fee == state.fee
+    assert m.rate == amm.rate()
+    assert m.get_rate_mul(ts) == amm.get_rate_mul()
+    assert m.amm_state(state.p_o, ts).base_price == state.base_price
+    assert (m.active_band, m.min_band, m.max_band) == (
+        state.active_band,
+        state.min_band,
+        state.max_band,
+    )
+    assert m.bands_x == nonzero(state.bands_x)
+    assert m.bands_y == nonzero(state.bands_y)
+    assert m.total_shares == nonzero(state.total_shares)
+
+    user_shares = amm._storage._user_shares.get()
+    for user in users:
+        user = str(user)
+        ns, ticks = m.user_ticks(user)
+        if amm.has_liquidity(user):
+            stored = user_shares[user]
+            assert ns == llamma.unpack_ns(stored["ns"])
+            assert ticks == llamma.unpack_ticks(stored["ticks"], ns)
+        else:
+            assert ticks == []
+        assert m.debt(user, ts) == controller.debt(user)
+        if controller.loan_exists(user):
+            discount = controller.liquidation_discounts(user)
+            assert m.loans[user].liquidation_discount == discount
+        else:
+            assert user not in m.loans
+    assert len(m.loans) == controller.n_loans()
+
+
+def test_replay_and_resume(
+    controller,
+    amm,
+    collateral_token,
+    borrowed_token,
+    price_oracle,
+    configurator,
+    admin,
+    tmp_path,
+):
+    dump = tmp_path / "logs.jsonl"
+    checkpoint = tmp_path / "checkpoint.json"
+    record = Recorder(amm, price_oracle, dump)
+    config = MarketConfig.from_boa(amm, controller)
+
+    borrowers = []
+    for i in range(N_LOANS):
+        borrower = boa.env.generate_address()
+        collateral = (i + 1) * 10 ** collateral_token.decimals()
+        boa.deal(collateral_token, borrower, 2 * collateral)
+        with boa.env.prank(borrower):
+            max_approve(collateral_token, controller)
+            max_approve(borrowed_token, controller)
+            max_approve(collateral_token, amm)
+            max_approve(borrowed_token, amm)
+        n = 4 + 3 * i
+        debt = controller.max_borrowable(collateral, n) // 2
+        record(controller, "create_loan", collateral, debt, n, sender=borrower)
+        borrowers.append(borrower)
+
+    boa.env.time_travel(7 * 86400)
+    b0, b1, b2, b3 = borrowers
+    record(controller, "add_collateral", 10 ** collateral_token.decimals(), sender=b0)
+    record(controller, "borrow_more", 0, controller.debt(b0) // 10, sender=b0)
+    record(
+        controller,
+        "remove_collateral",
+        10 ** collateral_token.decimals() // 2,
+        sender=b1,
+    )
+    record(controller, "repay", controller.debt(b1) // 3, sender=b1)
+
+    indexer = Indexer.resume(checkpoint, [config])
+    assert indexer.sync(dump, checkpoint) == len(dump.read_text().splitlines())
+    _assert_matches(indexer, amm, controller, borrowers)
+
+    # Price drops into the bands, the loans are soft-liquidated
+    n_lines = len(dump.read_text().splitlines())
+    n_top = min(amm.read_user_tick_numbers(b)[0] for b in borrowers)
+    price_oracle.set_price(amm.p_oracle_down(n_top + 1), sender=admin)
+    boa.env.time_travel(600)
+    # Amounts rounded to 2 decimals don't tell exchange from exchange_dy, or
+    # the fraction of a partial liquidation: then the dump has to have them
+    rounded = min(borrowed_token.decimals(), collateral_token.decimals()) < 18
+
+    # Soft liquidation and back
+    record(amm, "exchange", 0, 1, borrowed_token.balanceOf(b3) // 4, 0, sender=b3)
+    record(amm, "exchange", 1, 0, 10 ** collateral_token.decimals() // 10, 0, sender=b3)
+    # Same block: the antisandwich fee applies
+    price_oracle.set_price(price_oracle.price() * 99 // 100, sender=admin)
+    collateral_out = 10 ** collateral_token.decimals() // 20
+    hints = {"TokenExchange": {"use_in_amount": False}} if rounded else None
+    record(amm, "exchange_dy", 0, 1, collateral_out, 2**255, sender=b3, hints=hints)
+    boa.env.time_travel(3600)
+    record(configurator, "set_amm_fee", controller, 2 * amm.fee(), sender=admin)
+    record(amm, "exchange", 0, 1, borrowed_token.balanceOf(b3) // 10, 0, sender=b3)
+
+    # Partial self-liquidation
+    frac = 3 * 10**17
+    hints = {"Withdraw": {"frac": str(frac)}} if rounded else None
+    record(controller, "liquidate", b0, 0, frac, sender=b0, hints=hints)
+    boa.deal(borrowed_token, b2, controller.debt(b2))
+    record(controller, "repay", controller.debt(b2), sender=b2)
+    boa.env.time_travel(86400)
+
+    # Restart from the checkpoint, only the new logs are read
+    n_new = len(dump.read_text().splitlines()) - n_lines
+    indexer = Indexer.resume(checkpoint, [config])
+    assert indexer.sync(dump, checkpoint) == n_new
+    assert indexer.sync(dump, checkpoint) == 0
+    _assert_matches(indexer, amm, controller, borrowers)
+
+    # Replaying the whole dump again skips the logs already applied
+    indexer.offsets.clear()
+    m = indexer.market(amm.address).to_dict()
+    indexer.sync(dump)
+    assert indexer.market(amm.address).to_dict() == m
+
+    positions = indexer.market(amm.address).positions(boa.env.evm.patch.timestamp)
+    assert {p.user for p in positions} == {str(b0), str(b1), str(b3)}
+
+
+def test_replay_errors(controller, amm, price_oracle):
+    market = Indexer([MarketConfig.from_boa(amm, controller)]).market(amm.address)
+    user = str(boa.env.generate_address())
+    withdraw = {
+        "event": "Withdraw",
+        "args": {"provider": user, "amount_borrowed": 0, "amount_collateral": 1},
+    }
+    with pytest.raises(IndexerError, match="no liquidity"):
+        market.apply(withdraw)
+    market.apply(
+        {
+            "event": "Deposit",
+            "args": {"provider": user, "amount": 10**18, "n1": 1, "n2": 4},
+        }
+    )
+    with pytest.raises(IndexerError, match="replayed"):
+        market.apply(
+            withdraw | {"args": {**withdraw["args"], "amount_collateral": 2 * 10**18}}
+        )
+    exchange = {
+        "event": "TokenExchange",
+        "timestamp": 0,
+        "args": {"sold_id": 0, "tokens_sold": 10, "bought_id": 1, "tokens_bought": 10},
+    }
+    with pytest.raises(IndexerError, match="without p_o"):
+        market.apply(exchange)
+    with pytest.raises(IndexerError, match="can't be replayed"):
+        market.apply(exchange | {"p_o": price_oracle.price()})
@@ -0,0 +1,54 @@
+import boa
+import pytest
+from tests.utils import max_approve
+
+N_BANDS = 6
+
+
+@pytest.fixture(scope="module")
+def seed_liquidity(borrowed_token):
+    return 1000 * 18**6 * 10 ** borrowed_token.decimals()
+
+
+def test_users_to_liquidate_matches_health(
+    controller,
+    amm,
+    collateral_token,
+    borrowed_token,
+    price_oracle,
+    admin,
+):
+    """
+    The inline health computation in users_with_health must agree with
+    controller.health(user, True) for every loan, both for positions in
+    soft-liquidation and for ones still above the active band.
+    """
+    for i in range(8):
+        borrower = boa.env.generate_address()
+        collateral_amount = (i + 1) * 10 ** collateral_token.decimals() // 10
+        boa.deal(collateral_token, borrower, collateral_amount)
+        with boa.env.prank(borrower):
+            max_approve(collateral_token, controller)
+            n = N_BANDS + i
+            debt = controller.max_borrowable(collateral_amount, n) * (10 - i % 3) // 10
+            controller.create_loan(collateral_amount, debt, n)
+
+    # Push some positions into soft-liquidation and below zero health
+    price_oracle.set_price(price_oracle.price() * 9 // 10, sender=admin)
+    trader = boa.env.generate_address()
+    boa.deal(collateral_token, trader, 10 * 10 ** collateral_token.decimals())
+    with boa.env.prank(trader):
+        max_approve(collateral_token, amm)
+        amm.exchange(1, 0, 10 ** collateral_token.decimals() // 10, 0)
+    boa.env.time_travel(86400)
+
+    expected = []
+    for i in range(controller.n_loans()):
+        user = controller.loans(i)
+        health = controller.health(user, True)
+        if health < 0:
+            xy = amm.get_sum_xy(user)
+            expected.append((user, xy[0], xy[1], controller.debt(user), health))
+    assert 0 < len(expected) < controller.n_loans()
+
+    assert [tuple(p) for p in controller.users_to_liquidate()] == expected
@@ -0,0 +1,16 @@
+def test_default_behavior(controller):
+    assert controller.vault_state() == (
+        controller.available_balance(),
+        controller.total_debt(),
+        controller.admin_fees(),
+    )
+
+
+def test_with_debt_and_admin_fees(controller, admin_percentage, make_debt):
+    available_balance, total_debt, admin_fees = controller.vault_state()
+
+    assert available_balance == controller.available_balance()
+    assert total_debt == controller.total_debt()
+    assert admin_fees == controller.admin_fees()
+    assert total_debt > 0
+    assert admin_fees > 0
@@ -0,0 +1,138 @@
+import boa
+import pytest
+
+from curve_stablecoin.sim import lens as decoder
+from tests.utils import max_approve
+from tests.utils.constants import ZERO_ADDRESS
+from tests.utils.deployers import MARKET_LENS_DEPLOYER
+
+N_LOANS = 4
+N_BANDS = 5
+
+
+@pytest.fixture(scope="module")
+def lens():
+    return MARKET_LENS_DEPLOYER.deploy()
+
+
+@pytest.fixture(scope="module")
+def borrowers(controller, collateral_token):
+    users = []
+    for i in range(N_LOANS):
+        borrower = boa.env.generate_address()
+        collateral_amount = (i + 1) * 10 ** collateral_token.decimals()
+        boa.deal(collateral_token, borrower, collateral_amount)
+        with boa.env.prank(borrower):
+            max_approve(collateral_token, controller)
+            n = 4 + i * 3
+            debt = controller.max_borrowable(collateral_amount, n) // 2
+            controller.create_loan(collateral_amount, debt, n)
+        users.append(borrower)
+    return users
+
+
+def _call(lens, data: bytes) -> bytes:
+    computation = boa.env.raw_call(lens.address, data=data)
+    assert not computation.is_error
+    return computation.output
+
+
+def _abi_type(component) -> str:
+    if component["type"].startswith("tuple"):
+        inner = ",".join(_abi_type(c) for c in component["components"])
+        return f"({inner}){component['type'][len('tuple') :]}"
+    return component["type"]
+
+
+def test_abi_types(lens):
+    outputs = {f["name"]: f["outputs"][0] for f in lens.abi if f["type"] == "function"}
+    for name in ("markets", "lend_markets", "mint_markets"):
+        assert _abi_type(outputs[name]) == decoder.MARKET_SNAPSHOT_TYPE + "[]"
+        assert [c["name"] for c in outputs[name]["components"]] == list(
+            decoder.MarketSnapshot.__dataclass_fields__
+        )
+    assert _abi_type(outputs["users"]) == decoder.USER_SNAPSHOT_TYPE + "[]"
+    assert [c["name"] for c in outputs["users"]["components"]] == list(
+        decoder.UserSnapshot.__dataclass_fields__
+    )
+
+
+def test_markets(lens, controller, amm, vault, borrowers):
+    (m,) = decoder.decode_markets(
+        _call(lens, decoder.encode_markets([controller.address], N_BANDS))
+    )
+
+    assert m.controller == controller.address
+    assert m.amm == amm.address
+    if vault is None:
+        assert m.vault == ZERO_ADDRESS
+        assert m.vault_total_supply == 0
+    else:
+        assert m.vault == vault.address
+        assert m.vault_total_supply == vault.totalSupply()
+    assert m.price_oracle == amm.price_oracle()
+    assert m.amm_price == amm.get_p()
+    assert m.base_price == amm.get_base_price()
+    assert m.fee == amm.fee()
+    assert m.rate == amm.rate()
+    assert m.rate_mul == amm.get_rate_mul()
+    assert m.active_band == amm.active_band()
+    assert m.min_band == amm.min_band()
+    assert m.max_band == amm.max_band()
+    assert m.total_debt == controller.total_debt()
+    assert m.n_loans == controller.n_loans()
+    assert m.available_balance == controller.available_balance()
+    assert m.admin_fees == controller.admin_fees()
+
+    # Bands around the active band, clipped to the bands with liquidity
+    assert m.band_from == max(m.active_band - N_BANDS, m.min_band)
+    band_to = min(m.active_band + N_BANDS, m.max_band)
+    assert len(m.bands_x) == len(m.bands_y) == band_to - m.band_from + 1
+    for n in range(m.band_from - 1, band_to + 2):
+        if m.band_from <= n <= band_to:
+            assert m.band(n) == (amm.bands_x(n), amm.bands_y(n))
+        else:
+            assert m.band(n) == (0, 0)
+
+
+def test_factory_markets(
+    lens, controller, market_type, factory, mint_factory, borrowers
+):
+    if market_type == "lending":
+        data = decoder.encode_lend_markets(factory.address, 0, 50, 0)
+    else:
+        data = decoder.encode_mint_markets(mint_factory.address, 0, 50, 0)
+    markets = decoder.decode_markets(_call(lens, data))
+
+    (m,) = [m for m in markets if m.controller == controller.address]
+    assert m.total_debt == controller.total_debt()
+    assert m.bands_x == [] or m.band_from == m.active_band
+
+
+def test_users(lens, controller, amm, borrowers):
+    no_loan = boa.env.generate_address()
+    users = [*borrowers, no_loan]
+    snapshots = decoder.decode_users(
+        _call(lens, decoder.encode_users([controller.address] * len(users), users))
+    )
+
+    assert [s.user for s in snapshots] == users
+    for s in snapshots[:-1]:
+        assert s.controller == controller.address
+        assert s.loan_exists
+        assert [s.collateral, s.borrowed, s.debt, s.N] == list(
+            controller.user_state(s.user)
+        )
+        assert [s.n1, s.n2] == list(amm.read_user_tick_numbers(s.user))
+        assert [s.p_up, s.p_down] == list(controller.user_prices(s.user))
+        assert s.health == controller.health(s.user, True)
+    assert snapshots[-1] == decoder.UserSnapshot(
+        controller.address, no_loan, False, 0, 0, 0, 0, 0, 0, 0, 0, 0
+    )
+
+
+def test_reverts(lens, controller):
+    with boa.reverts("Too many bands"):
+        lens.markets([controller.address], 51)
+    with boa.reverts("Length mismatch"):
+        lens.users([controller.address], [])
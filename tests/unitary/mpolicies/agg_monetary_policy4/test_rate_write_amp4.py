@@ -3,9 +3,97 @@
 import boa
 
 from tests.utils.constants import ZERO_ADDRESS
+from tests.utils.deployers import MOCK_MARKET_DEPLOYER
 
 
 def test_revert_zero_address(mp):
     """rate_write rejects the zero address controller key."""
     with boa.reverts(dev="invalid controller"):
         mp.rate_write(ZERO_ADDRESS)
+
+
+def _add_markets(admin, mock_factory, debts):
+    markets = []
+    with boa.env.prank(admin):
+        for debt in debts:
+            market = MOCK_MARKET_DEPLOYER.deploy()
+            mock_factory.add_market(market.address, 10**30)
+            mock_factory.set_debt(market.address, debt)
+            markets.append(market)
+    return markets
+
+
+def test_caches_controller_debts(admin, mock_factory, mp):
+    """rate_write caches the debts of all controllers of the factory."""
+    markets = _add_markets(admin, mock_factory, [10**24, 2 * 10**24, 3 * 10**24])
+
+    mp.rate_write(markets[0].address)
+
+    assert mp.n_controllers() == 3
+    assert mp.cached_total_debt() == 6 * 10**24
+    for market in markets:
+        assert mp.controller_debts(market.address) == market.total_debt()
+    assert mp.last_debt_refresh() == boa.env.evm.patch.timestamp
+
+
+def test_reads_only_own_debt_until_refresh(admin, mock_factory, mp):
+    """Between refreshes only the debt of the calling controller is updated."""
+    markets = _add_markets(admin, mock_factory, [10**24, 2 * 10**24])
+    mp.rate_write(markets[0].address)
+
+    # The other controller is not re-read until the cache is refreshed
+    with boa.env.prank(admin):
+        mock_factory.set_debt(markets[0].address, 5 * 10**24)
+        mock_factory.set_debt(markets[1].address, 7 * 10**24)
+    assert mp.eval(f"self.get_cached_total_debt({markets[0].address})") == (
+        7 * 10**24,
+        5 * 10**24,
+    )
+    mp.rate_write(markets[0].address)
+
+    assert mp.cached_total_debt() == 7 * 10**24
+    assert mp.controller_debts(markets[0].address) == 5 * 10**24
+    assert mp.controller_debts(markets[1].address) == 2 * 10**24
+
+    # All controllers are re-read once the cache is older than debt_refresh_time
+    boa.env.time_travel(seconds=mp.debt_refresh_time())
+    assert mp.eval(f"self.get_cached_total_debt({markets[0].address})") == (
+        12 * 10**24,
+        5 * 10**24,
+    )
+    mp.rate_write(markets[0].address)
+
+    assert mp.cached_total_debt() == 12 * 10**24
+    assert mp.controller_debts(markets[1].address) == 7 * 10**24
+
+
+def test_adds_new_controllers(admin, mock_factory, mp):
+    """Controllers added to the factory are cached with their debt by the next call."""
+    markets = _add_markets(admin, mock_factory, [10**24])
+    mp.rate_write(markets[0].address)
+
+    markets += _add_markets(admin, mock_factory, [4 * 10**24])
+    assert mp.eval(f"self.get_cached_total_debt({markets[1].address})") == (
+        5 * 10**24,
+        4 * 10**24,
+    )
+    mp.rate_write(markets[0].address)
+
+    assert mp.n_controllers() == 2
+    assert mp.controllers(1) == markets[1].address
+    assert mp.cached_total_debt() == 5 * 10**24
+    assert mp.controller_debts(markets[1].address) == 4 * 10**24
+
+
+def test_unknown_controller_has_no_debt(admin, mock_factory, mp):
+    """Debt of a controller which is not in the factory is not counted."""
+    markets = _add_markets(admin, mock_factory, [10**24])
+    stranger = MOCK_MARKET_DEPLOYER.deploy()
+    stranger.set_debt(10**24)
+
+    mp.rate_write(markets[0].address)
+    boa.env.time_travel(seconds=60)
+    mp.rate_write(stranger.address)
+
+    assert mp.cached_total_debt() == 10**24
+    assert mp.controller_debts(stranger.address) == 0
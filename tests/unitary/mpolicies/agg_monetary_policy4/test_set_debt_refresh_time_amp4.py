@@ -0,0 +1,48 @@
+"""Tests for AggMonetaryPolicy4.set_debt_refresh_time"""
+
+import boa
+
+from tests.utils import filter_logs
+
+DEFAULT_DEBT_REFRESH_TIME = 3600
+MAX_DEBT_REFRESH_TIME = 86400 // 2  # DEBT_CANDLE_TIME
+
+
+def test_default_value(mp):
+    """Debt refresh time defaults to one hour."""
+    assert mp.debt_refresh_time() == DEFAULT_DEBT_REFRESH_TIME
+
+
+def test_default_behavior(mp, admin):
+    """Admin can set new debt refresh time and SetDebtRefreshTime event is emitted."""
+    with boa.env.prank(admin):
+        mp.set_debt_refresh_time(600)
+    logs = filter_logs(mp, "SetDebtRefreshTime")
+
+    assert mp.debt_refresh_time() == 600
+    assert len(logs) == 1
+    assert logs[0].debt_refresh_time == 600
+
+
+def test_default_behavior_max_time(mp, admin):
+    """Can set debt refresh time to MAX_DEBT_REFRESH_TIME."""
+    with boa.env.prank(admin):
+        mp.set_debt_refresh_time(MAX_DEBT_REFRESH_TIME)
+
+    assert mp.debt_refresh_time() == MAX_DEBT_REFRESH_TIME
+
+
+def test_revert_unauthorized(mp):
+    """Non-admin cannot set debt refresh time."""
+    unauthorized = boa.env.generate_address("unauthorized")
+
+    with boa.env.prank(unauthorized):
+        with boa.reverts(dev="only admin"):
+            mp.set_debt_refresh_time(600)
+
+
+def test_revert_too_high(mp, admin):
+    """Cannot set debt refresh time above MAX_DEBT_REFRESH_TIME."""
+    with boa.env.prank(admin):
+        with boa.reverts(dev="debt refresh time too high"):
+            mp.set_debt_refresh_time(MAX_DEBT_REFRESH_TIME + 1)
@@ -0,0 +1,200 @@
+"""Tests for the vectorized monetary policy models in `curve_stablecoin.sim.mpolicy`."""
+
+import boa
+import numpy as np
+import pytest
+
+from curve_stablecoin.sim import mpolicy
+from tests.utils import hyperbolic_mp_reference as ref
+from tests.utils.constants import ZERO_ADDRESS
+from tests.utils.deployers import (
+    AGG_MONETARY_POLICY4_DEPLOYER,
+    DUMMY_PRICE_ORACLE_DEPLOYER,
+    ERC20_MOCK_DEPLOYER,
+    MOCK_FACTORY_DEPLOYER,
+    MOCK_MARKET_DEPLOYER,
+    MOCK_PEG_KEEPER_DEPLOYER,
+    MOCK_RATE_SETTER_DEPLOYER,
+    SECONDARY_MONETARY_POLICY_DEPLOYER,
+    SEMILOG_MONETARY_POLICY_DEPLOYER,
+)
+
+# The contracts truncate rates to integers
+RTOL = 1e-9
+ATOL = 2
+WAD = 10**18
+
+
+@pytest.fixture(scope="module")
+def borrowed_token():
+    return ERC20_MOCK_DEPLOYER.deploy(18)
+
+
+@pytest.fixture(scope="module")
+def factory():
+    return MOCK_FACTORY_DEPLOYER.deploy()
+
+
+@pytest.fixture(scope="module")
+def controller():
+    return MOCK_MARKET_DEPLOYER.deploy()
+
+
+def _reserves(controller, borrowed_token):
+    # (debt, balance) pairs covering empty, idle, typical and fully used markets
+    states = [(0, 0), (0, 10**24), (10**24, 9 * 10**24), (85 * 10**22, 15 * 10**22)]
+    states += [(10**24, 0), (7 * 10**21, 3 * 10**19)]
+    for debt, balance in states:
+        controller.set_debt(debt)
+        boa.deal(borrowed_token, controller.address, balance)
+        yield debt, balance
+
+
+@pytest.mark.parametrize(
+    "target_utilization, low_ratio, high_ratio",
+    [
+        (85 * 10**16, 5 * 10**17, 2 * WAD),
+        (10**16, 10**16, 100 * WAD),
+        (99 * 10**16, 9 * 10**17, 11 * 10**17),
+    ],
+)
+def test_curve_params(target_utilization, low_ratio, high_ratio):
+    assert mpolicy.CurveParams.from_ratios(
+        target_utilization, low_ratio, high_ratio
+    ) == ref.get_params(target_utilization, low_ratio, high_ratio)
+
+
+def test_hyperbolic_dynamic_rate():
+    params = mpolicy.CurveParams.from_ratios(
+        ref.DEFAULT_TARGET_UTILIZATION, ref.DEFAULT_LOW_RATIO, ref.DEFAULT_HIGH_RATIO
+    )
+    u = np.linspace(0, 1.2 * WAD, 25).astype(object)
+    target_rate = [0, ref.DEFAULT_RATE, 10**12]
+    for r0 in target_rate:
+        for shift in [0, 10**9]:
+            expected = [
+                ref.calculate_rate(
+                    params,
+                    min(int(x), WAD),
+                    min(max(r0, ref.MIN_TARGET_RATE), ref.MAX_TARGET_RATE),
+                    shift,
+                )
+                for x in u
+            ]
+            np.testing.assert_allclose(
+                mpolicy.hyperbolic_dynamic_rate(u, params, r0, shift),
+                expected,
+                rtol=RTOL,
+                atol=ATOL,
+            )
+
+
+def test_semilog_rate(factory, controller, borrowed_token):
+    min_rate, max_rate = 10**15 // (365 * 86400), 10**18 // (365 * 86400)
+    mp = SEMILOG_MONETARY_POLICY_DEPLOYER.deploy(
+        borrowed_token, min_rate, max_rate, factory
+    )
+    for debt, balance in _reserves(controller, borrowed_token):
+        u = mpolicy.utilization(debt, debt + balance)
+        assert mpolicy.semilog_rate(u, min_rate, max_rate) == pytest.approx(
+            mp.rate(controller.address), rel=RTOL, abs=ATOL
+        )
+
+
+def test_secondary_rate(factory, controller, borrowed_token):
+    amm_rate = 10**17 // (365 * 86400)
+    amm = MOCK_RATE_SETTER_DEPLOYER.deploy(amm_rate)
+    ratios = (85 * 10**16, 5 * 10**17, 3 * WAD)
+    mp = SECONDARY_MONETARY_POLICY_DEPLOYER.deploy(
+        factory, amm, borrowed_token, *ratios, 10**8
+    )
+    params = mpolicy.CurveParams.from_ratios(*ratios)
+    assert params == tuple(mp.parameters())[:3]
+    for debt, balance in _reserves(controller, borrowed_token):
+        u = mpolicy.utilization(debt, debt + balance)
+        assert mpolicy.secondary_rate(u, params, amm_rate, 10**8) == pytest.approx(
+            mp.rate(controller.address), rel=RTOL, abs=ATOL
+        )
+
+
+def test_ema_rate():
+    rng = np.random.default_rng(0)
+    t = np.cumsum(rng.integers(0, 3 * mpolicy.TEXP, 500))
+    # Long stretches above MAX_EMA_RATE and below MIN_EMA_RATE to hit the clamp
+    raw_rate = rng.uniform(0, 2, 500) * mpolicy.MAX_EMA_RATE
+    raw_rate[100:200] = 0
+    raw_rate[300:400] = 10 * mpolicy.MAX_EMA_RATE
+
+    expected = []
+    ema, last = float(mpolicy.MIN_EMA_RATE), t[0]
+    for ts, r in zip(t, raw_rate):
+        if ts != last:
+            alpha = np.exp(-(ts - last) / mpolicy.TEXP)
+            ema = r * (1 - alpha) + ema * alpha
+            ema = min(max(ema, mpolicy.MIN_EMA_RATE), mpolicy.MAX_EMA_RATE)
+            last = ts
+        expected.append(ema)
+
+    np.testing.assert_allclose(
+        mpolicy.ema_rate(t, raw_rate, mpolicy.MIN_EMA_RATE),
+        expected,
+        rtol=RTOL,
+        atol=ATOL,
+    )
+
+
+def test_agg_rate(factory):
+    rate0, sigma, target_debt_fraction = 634195839, 2 * 10**16, 10**17
+    market, other = MOCK_MARKET_DEPLOYER.deploy(), MOCK_MARKET_DEPLOYER.deploy()
+    factory.add_market(market.address, 10**25)
+    factory.add_market(other.address, 10**30)
+    pk = MOCK_PEG_KEEPER_DEPLOYER.deploy(WAD, ZERO_ADDRESS)
+    admin = boa.env.generate_address("admin")
+    oracle = DUMMY_PRICE_ORACLE_DEPLOYER.deploy(admin, WAD)
+    mp = AGG_MONETARY_POLICY4_DEPLOYER.deploy(
+        admin,
+        oracle,
+        factory,
+        [pk.address] + [ZERO_ADDRESS] * 4,
+        rate0,
+        sigma,
+        target_debt_fraction,
+        0,
+        86400,
+    )
+
+    # The total debt and the peg keeper debt stay constant so that the debt
+    # ratio EMA stays at its initial value
+    total_debt = 2 * 10**25
+    pk.set_debt(total_debt // 10)
+    rng = np.random.default_rng(1)
+    n = 40
+    dt = rng.integers(0, 20000, n)
+    dt[20] = 3 * 86400
+    price = rng.integers(99 * 10**16, 101 * 10**16, n)
+    debt_for = [int(x) * 10**19 for x in rng.integers(1, 10**6, n)]
+    t, rates = [], []
+    for i in range(n):
+        boa.env.time_travel(seconds=int(dt[i]))
+        factory.set_debt(market.address, debt_for[i])
+        factory.set_debt(other.address, total_debt - debt_for[i])
+        oracle.set_price(int(price[i]), sender=admin)
+        t.append(boa.env.evm.patch.timestamp)
+        rates.append(mp.rate_write(market.address))
+
+    np.testing.assert_allclose(
+        mpolicy.agg_rate(
+            t,
+            price,
+            total_debt // 10,
+            total_debt,
+            debt_for,
+            rate0,
+            sigma,
+            target_debt_fraction,
+            debt_ceiling=10**25,
+        ),
+        rates,
+        rtol=RTOL,
+        atol=ATOL,
+    )
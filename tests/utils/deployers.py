@@ -1,13 +1,26 @@
 """
 Centralized deployers for all contracts used in tests.
-Each deployer is a VyperDeployer object returned using boa.load_partial().
+Each deployer is a VyperDeployer object returned by load_partial().
+
+Deployers are compiled on first access (see __getattr__ at the bottom), so
+importing one of them doesn't compile the others. Compiled contracts are
+cached on disk by the hash of their source and of every source they import,
+so a warm cache doesn't parse and analyze the contract at all.
 """
 
+import gc
+import hashlib
+import pickle
+import re
+
 import curve_stablecoin
 import stableswap_ng
 from pathlib import Path
 
 import boa
+import boa.interpret
+import vyper
+from boa.contracts.vyper.vyper_contract import VyperDeployer
 from vyper.compiler.settings import OptimizationLevel
 
 # Base compiler args
@@ -44,297 +57,431 @@ ZAPS_CONTRACT_PATH = _PACKAGE_ROOT / "zaps"
 # Contracts shipped by the installed `stableswap-ng` dependency (namespace package)
 STABLESWAP_NG_PACKAGE_PATH = Path(list(stableswap_ng.__path__)[0])
 
+
+# Modules which are shipped with the compiler itself
+_BUILTIN_MODULES = ("ethereum", "vyper")
+_IMPORT_LINE = re.compile(r"^(?:from\s+([\w.]+)\s+)?import\s+(.+)$")
+
+
+def _imported_modules(source: str) -> list[str]:
+    modules = []
+    for line in source.splitlines():
+        match = _IMPORT_LINE.match(line.split("#")[0].strip())
+        if match is None:
+            continue
+        base, names = match.groups()
+        for name in names.strip("() ").split(","):
+            name = name.split(" as ")[0].strip()
+            modules.append(f"{base}.{name}" if base else name)
+    return modules
+
+
+def _source_fingerprint(
+    path: Path, source: str | None = None, seen: dict[Path, str] | None = None
+) -> str | None:
+    """
+    Hash of a contract source together with the sources of everything it
+    imports (recursively). Imports are resolved the way the compiler does:
+    next to the importing file first, then on the search path. Every file an
+    import could resolve to is hashed, so shadowing can't produce a stale hit.
+    Returns None if some import can't be found on disk.
+    """
+    seen = {} if seen is None else seen
+    path = path.resolve()
+    if source is None:
+        if path in seen:
+            return seen[path]
+        seen[path] = ""  # import cycles are reported by the compiler
+        source = path.read_text()
+
+    search_paths = [path.parent] + boa.interpret.get_search_paths(
+        boa.interpret._search_path
+    )
+    fingerprints = [str(path), hashlib.sha256(source.encode()).hexdigest()]
+    for module in _imported_modules(source):
+        candidates = sorted(
+            {
+                (search_path / module.replace(".", "/")).with_suffix(suffix).resolve()
+                for search_path in search_paths
+                for suffix in (".vy", ".vyi", ".json")
+            }
+        )
+        found = [candidate for candidate in candidates if candidate.is_file()]
+        if not found:
+            if module.split(".")[0] in _BUILTIN_MODULES:
+                continue
+            return None
+        for dependency in found:
+            if dependency.suffix == ".json":
+                fingerprint = hashlib.sha256(dependency.read_bytes()).hexdigest()
+            else:
+                fingerprint = _source_fingerprint(dependency, seen=seen)
+            if fingerprint is None:
+                return None
+            fingerprints.append(fingerprint)
+
+    fingerprint = hashlib.sha256("".join(fingerprints).encode()).hexdigest()
+    if path in seen:
+        seen[path] = fingerprint
+    return fingerprint
+
+
+def loads_partial(source: str, path: Path, compiler_args: dict | None = None):
+    """
+    Same as boa.loads_partial(), but with the compiled contract cached on disk
+    under a key which is known before parsing the source: the hashes of the
+    contract and of its imports, the compiler version (boa's cache is salted
+    with it) and the compiler args.
+    `path` is where the source is (or would be) located, imports are resolved
+    relative to it.
+    """
+    compiler_args = compiler_args or {}
+    cache = boa.interpret._disk_cache
+
+    def _compile():
+        return boa.loads_partial(
+            source, name=str(path), filename=str(path), compiler_args=compiler_args
+        )
+
+    specifier_set = boa.interpret.detect_version_specifier_set(source)
+    if (
+        cache is None
+        # Contracts for other compiler versions are compiled (and cached) by vvm
+        or (specifier_set is not None and not specifier_set.contains(vyper.__version__))
+    ):
+        return _compile()
+
+    fingerprint = _source_fingerprint(path, source)
+    if fingerprint is None:
+        return _compile()
+
+    key = str(("deployers", fingerprint, sorted(compiler_args.items(), key=str)))
+    artifact = cache.cal(key)
+    if artifact.is_file():
+        # Unpickling the compiler data creates lots of objects which the
+        # garbage collector would otherwise scan over and over again
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            data = pickle.loads(artifact.read_bytes())
+        finally:
+            if gc_enabled:
+                gc.enable()
+    else:
+        data = cache.caching_lookup(key, lambda: _compile().compiler_data)
+    return VyperDeployer(data, filename=str(path))
+
+
+def load_partial(path: Path, compiler_args: dict | None = None):
+    """
+    Same as boa.load_partial(), cached like loads_partial()
+    """
+    return loads_partial(path.read_text(), path, compiler_args=compiler_args)
+
+
+class _Deferred:
+    def __init__(self, path: Path, compiler_args: dict | None = None):
+        self.path = path
+        self.compiler_args = compiler_args
+
+
 # Constants contract (for accessing constants)
-CONSTANTS_DEPLOYER = boa.load_partial(
+CONSTANTS_DEPLOYER = _Deferred(
     BASE_CONTRACT_PATH / "constants.vy", compiler_args=compiler_args_default
 )
 
 # Core contracts
-AMM_DEPLOYER = boa.load_partial(
+AMM_DEPLOYER = _Deferred(
     BASE_CONTRACT_PATH / "AMM.vy", compiler_args=compiler_args_codesize
 )
-CONTROLLER_DEPLOYER = boa.load_partial(
+AMM_PACKED_DEPLOYER = _Deferred(
+    BASE_CONTRACT_PATH / "AMMPacked.vy", compiler_args=compiler_args_codesize
+)
+CONTROLLER_DEPLOYER = _Deferred(
     BASE_CONTRACT_PATH / "controller.vy", compiler_args=compiler_args_codesize
 )
-CONTROLLER_VIEW_DEPLOYER = boa.load_partial(
+CONTROLLER_VIEW_DEPLOYER = _Deferred(
     BASE_CONTRACT_PATH / "ControllerView.vy", compiler_args=compiler_args_codesize
 )
-MINT_CONTROLLER_DEPLOYER = boa.load_partial(
+MINT_CONTROLLER_DEPLOYER = _Deferred(
     BASE_CONTRACT_PATH / "MintController.vy", compiler_args=compiler_args_codesize
 )
-CONTROLLER_FACTORY_DEPLOYER = boa.load_partial(
+CONTROLLER_FACTORY_DEPLOYER = _Deferred(
     BASE_CONTRACT_PATH / "ControllerFactory.vy", compiler_args=compiler_args_default
 )
-CONFIGURATOR_DEPLOYER = boa.load_partial(
+CONFIGURATOR_DEPLOYER = _Deferred(
     BASE_CONTRACT_PATH / "Configurator.vy", compiler_args=compiler_args_default
 )
-STABLECOIN_DEPLOYER = boa.load_partial(
+STABLECOIN_DEPLOYER = _Deferred(
     BASE_CONTRACT_PATH / "Stablecoin.vy", compiler_args=compiler_args_default
 )
-# STABLESWAP_DEPLOYER = boa.load_partial(
+MARKET_LENS_DEPLOYER = _Deferred(
+    BASE_CONTRACT_PATH / "MarketLens.vy", compiler_args=compiler_args_default
+)
+# STABLESWAP_DEPLOYER = _Deferred(
 #     BASE_CONTRACT_PATH + "Stableswap.vy", compiler_args=compiler_args_default
 # )
 
 # Lending contracts - all have #pragma optimize codesize
-VAULT_DEPLOYER = boa.load_partial(
+VAULT_DEPLOYER = _Deferred(
     LENDING_CONTRACT_PATH / "Vault.vy", compiler_args=compiler_args_codesize
 )
-LEND_CONTROLLER_DEPLOYER = boa.load_partial(
+LEND_CONTROLLER_DEPLOYER = _Deferred(
     LENDING_CONTRACT_PATH / "LendController.vy", compiler_args=compiler_args_codesize
 )
-LEND_CONTROLLER_VIEW_DEPLOYER = boa.load_partial(
+LEND_CONTROLLER_VIEW_DEPLOYER = _Deferred(
     LENDING_CONTRACT_PATH / "LendControllerView.vy", compiler_args=compiler_args_default
 )
-LENDING_FACTORY_DEPLOYER = boa.load_partial(
+LENDING_FACTORY_DEPLOYER = _Deferred(
     LENDING_CONTRACT_PATH / "LendFactory.vy", compiler_args=compiler_args_codesize
 )
 
 # Flashloan contracts
-FLASH_LENDER_DEPLOYER = boa.load_partial(
+FLASH_LENDER_DEPLOYER = _Deferred(
     FLASHLOAN_CONTRACT_PATH / "FlashLender.vy", compiler_args=compiler_args_default
 )
 
-PARTIAL_REPAY_ZAP_MINT_DEPLOYER = boa.load_partial(
+PARTIAL_REPAY_ZAP_MINT_DEPLOYER = _Deferred(
     ZAPS_CONTRACT_PATH / "PartialRepayZapMint.vy",
     compiler_args=compiler_args_default,
 )
-PARTIAL_REPAY_ZAP_LENDING_DEPLOYER = boa.load_partial(
+PARTIAL_REPAY_ZAP_LENDING_DEPLOYER = _Deferred(
     ZAPS_CONTRACT_PATH / "PartialRepayZapLending.vy",
     compiler_args=compiler_args_default,
 )
 
 # Monetary policies - all have no pragma
-CONSTANT_MONETARY_POLICY_DEPLOYER = boa.load_partial(
+CONSTANT_MONETARY_POLICY_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "ConstantMonetaryPolicy.vy",
     compiler_args=compiler_args_default,
 )
-CONSTANT_MONETARY_POLICY_LENDING_DEPLOYER = boa.load_partial(
+CONSTANT_MONETARY_POLICY_LENDING_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "ConstantMonetaryPolicyLending.vy",
     compiler_args=compiler_args_default,
 )
-SEMILOG_MONETARY_POLICY_DEPLOYER = boa.load_partial(
+SEMILOG_MONETARY_POLICY_DEPLOYER = _Deferred(
     MPOLICIES_CONTRACT_PATH / "SemilogMonetaryPolicy.vy",
     compiler_args=compiler_args_default,
 )
-SECONDARY_MONETARY_POLICY_DEPLOYER = boa.load_partial(
+SECONDARY_MONETARY_POLICY_DEPLOYER = _Deferred(
     MPOLICIES_CONTRACT_PATH / "SecondaryMonetaryPolicy.vy",
     compiler_args=compiler_args_default,
 )
-AGG_MONETARY_POLICY4_DEPLOYER = boa.load_partial(
+AGG_MONETARY_POLICY4_DEPLOYER = _Deferred(
     MPOLICIES_CONTRACT_PATH / "AggMonetaryPolicy4.vy",
     compiler_args=compiler_args_default,
 )
-HYPERBOLIC_DYNAMIC_MP_DEPLOYER = boa.load_partial(
+HYPERBOLIC_DYNAMIC_MP_DEPLOYER = _Deferred(
     MPOLICIES_CONTRACT_PATH / "v2" / "HyperbolicDynamicMP.vy",
     compiler_args=compiler_args_default,
 )
-HYPERBOLIC_MP_DEPLOYER = boa.load_partial(
+HYPERBOLIC_MP_DEPLOYER = _Deferred(
     MPOLICIES_CONTRACT_PATH / "v2" / "HyperbolicMP.vy",
     compiler_args=compiler_args_default,
 )
-SYRUP_USDC_RATE_CALCULATOR_DEPLOYER = boa.load_partial(
+SYRUP_USDC_RATE_CALCULATOR_DEPLOYER = _Deferred(
     MPOLICIES_CONTRACT_PATH / "v2" / "rate_calculators" / "SyrupUSDCRateCalculator.vy",
     compiler_args=compiler_args_default,
 )
 
 # Price oracles
-DUMMY_PRICE_ORACLE_DEPLOYER = boa.load_partial(
+DUMMY_PRICE_ORACLE_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "DummyPriceOracle.vy", compiler_args=compiler_args_default
 )
-BROKEN_PRICE_ORACLE_DEPLOYER = boa.load_partial(
+BROKEN_PRICE_ORACLE_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "BrokenPriceOracle.vy", compiler_args=compiler_args_default
 )
-CRYPTO_FROM_POOL_DEPLOYER = boa.load_partial(
+CRYPTO_FROM_POOL_DEPLOYER = _Deferred(
     PRICE_ORACLES_CONTRACT_PATH / "CryptoFromPool.vy",
     compiler_args=compiler_args_default,
 )
-ERC4626_EMA_WRAPPER_DEPLOYER = boa.load_partial(
+ERC4626_EMA_WRAPPER_DEPLOYER = _Deferred(
     PRICE_ORACLES_CONTRACT_PATH / "v2" / "ERC4626EMAWrapper.vy",
     compiler_args=compiler_args_default,
 )
-EMA_PRICE_ORACLE_DEPLOYER = boa.load_partial(
+EMA_PRICE_ORACLE_DEPLOYER = _Deferred(
     PRICE_ORACLES_CONTRACT_PATH / "EmaPriceOracle.vy",
     compiler_args=compiler_args_default,
 )
-AGGREGATE_STABLE_PRICE3_DEPLOYER = boa.load_partial(
+AGGREGATE_STABLE_PRICE3_DEPLOYER = _Deferred(
     PRICE_ORACLES_CONTRACT_PATH / "AggregateStablePrice3.vy",
     compiler_args=compiler_args_default,
 )
-CRYPTO_WITH_STABLE_PRICE_DEPLOYER = boa.load_partial(
+CRYPTO_WITH_STABLE_PRICE_DEPLOYER = _Deferred(
     PRICE_ORACLES_CONTRACT_PATH / "CryptoWithStablePrice.vy",
     compiler_args=compiler_args_default,
 )
-CRYPTO_WITH_STABLE_PRICE_AND_CHAINLINK_DEPLOYER = boa.load_partial(
+CRYPTO_WITH_STABLE_PRICE_AND_CHAINLINK_DEPLOYER = _Deferred(
     PRICE_ORACLES_CONTRACT_PATH / "CryptoWithStablePriceAndChainlink.vy",
     compiler_args=compiler_args_default,
 )
-ORACLE_FROM_CURVE_POOLS_DEPLOYER = boa.load_partial(
+ORACLE_FROM_CURVE_POOLS_DEPLOYER = _Deferred(
     PRICE_ORACLES_CONTRACT_PATH / "v2" / "OracleFromCurvePools.vy",
     compiler_args=compiler_args_default,
 )
 
 # Proxy oracle contracts - have #pragma optimize gas
-PROXY_ORACLE_DEPLOYER = boa.load_partial(
+PROXY_ORACLE_DEPLOYER = _Deferred(
     PRICE_ORACLES_CONTRACT_PATH / "proxy" / "ProxyOracle.vy",
     compiler_args=compiler_args_gas,
 )
-PROXY_ORACLE_FACTORY_DEPLOYER = boa.load_partial(
+PROXY_ORACLE_FACTORY_DEPLOYER = _Deferred(
     PRICE_ORACLES_CONTRACT_PATH / "proxy" / "ProxyOracleFactory.vy",
     compiler_args=compiler_args_gas,
 )
 
 # LP oracle contracts
-LP_ORACLE_STABLE_DEPLOYER = boa.load_partial(
+LP_ORACLE_STABLE_DEPLOYER = _Deferred(
     PRICE_ORACLES_CONTRACT_PATH / "lp-oracles" / "LPOracleStable.vy",
     compiler_args=compiler_args_default,
 )
-LP_ORACLE_CRYPTO_DEPLOYER = boa.load_partial(
+LP_ORACLE_CRYPTO_DEPLOYER = _Deferred(
     PRICE_ORACLES_CONTRACT_PATH / "lp-oracles" / "LPOracleCrypto.vy",
     compiler_args=compiler_args_default,
 )
 # LPOracleFactory.vy has #pragma optimize gas
-LP_ORACLE_FACTORY_DEPLOYER = boa.load_partial(
+LP_ORACLE_FACTORY_DEPLOYER = _Deferred(
     PRICE_ORACLES_CONTRACT_PATH / "lp-oracles" / "LPOracleFactory.vy",
     compiler_args=compiler_args_gas,
 )
 # StableSwapNGLPOracle.vy has #pragma optimize codesize
-LP_ORACLE_STABLESWAP_NG_DEPLOYER = boa.load_partial(
+LP_ORACLE_STABLESWAP_NG_DEPLOYER = _Deferred(
     PRICE_ORACLES_CONTRACT_PATH / "v2" / "StableSwapNGLPOracle.vy",
     compiler_args=compiler_args_codesize,
 )
 # Upstream (stableswap-ng package) LP oracle reading the pool's *spot* virtual
 # price - the un-hardened counterpart of StableSwapNGLPOracle.
 # It has #pragma optimize gas.
-STABLESWAP_NG_SPOT_LP_ORACLE_DEPLOYER = boa.load_partial(
+STABLESWAP_NG_SPOT_LP_ORACLE_DEPLOYER = _Deferred(
     STABLESWAP_NG_PACKAGE_PATH / "LPOracle.vy",
     compiler_args=compiler_args_gas,
 )
 
 # Stabilizer contracts
-PEG_KEEPER_V2_DEPLOYER = boa.load_partial(
+PEG_KEEPER_V2_DEPLOYER = _Deferred(
     STABILIZER_CONTRACT_PATH / "PegKeeperV2.vy", compiler_args=compiler_args_default
 )
-PEG_KEEPER_REGULATOR_DEPLOYER = boa.load_partial(
+PEG_KEEPER_REGULATOR_DEPLOYER = _Deferred(
     STABILIZER_CONTRACT_PATH / "PegKeeperRegulator.vy",
     compiler_args=compiler_args_default,
 )
-PEG_KEEPER_OFFBOARDING_DEPLOYER = boa.load_partial(
+PEG_KEEPER_OFFBOARDING_DEPLOYER = _Deferred(
     STABILIZER_CONTRACT_PATH / "PegKeeperOffboarding.vy",
     compiler_args=compiler_args_default,
 )
 
 # LMCallback contracts
-LM_CALLBACK_DEPLOYER = boa.load_partial(
+LM_CALLBACK_DEPLOYER = _Deferred(
     LM_CALLBACK_CONTRACT_PATH / "LMCallback.vy",
     compiler_args=compiler_args_default,
 )
 
-LM_CALLBACK_FACTORY_DEPLOYER = boa.load_partial(
+LM_CALLBACK_FACTORY_DEPLOYER = _Deferred(
     LM_CALLBACK_CONTRACT_PATH / "LMCallbackFactory.vy",
     compiler_args=compiler_args_default,
 )
 
 
 # Testing/Mock contracts
-ERC20_MOCK_DEPLOYER = boa.load_partial(
+ERC20_MOCK_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "ERC20Mock.vy", compiler_args=compiler_args_default
 )
-ERC20_CRV_DEPLOYER = boa.load_partial(
+ERC20_CRV_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "ERC20CRV.vy", compiler_args=compiler_args_default
 )
-WETH_DEPLOYER = boa.load_partial(
+WETH_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "WETH.vy", compiler_args=compiler_args_default
 )
-VOTING_ESCROW_DEPLOYER = boa.load_partial(
+VOTING_ESCROW_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "VotingEscrow.vy", compiler_args=compiler_args_default
 )
-GAUGE_CONTROLLER_DEPLOYER = boa.load_partial(
+GAUGE_CONTROLLER_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "GaugeController.vy", compiler_args=compiler_args_default
 )
-MINTER_DEPLOYER = boa.load_partial(
+MINTER_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "Minter.vy", compiler_args=compiler_args_default
 )
-FAKE_LEVERAGE_DEPLOYER = boa.load_partial(
+FAKE_LEVERAGE_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "FakeLeverage.vy", compiler_args=compiler_args_default
 )
-DUMMY_CALLBACK_DEPLOYER = boa.load_partial(
+DUMMY_CALLBACK_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "DummyCallback.vy", compiler_args=compiler_args_default
 )
-VAULT_REENTRANCY_CALLBACK_DEPLOYER = boa.load_partial(
+VAULT_REENTRANCY_CALLBACK_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "VaultReentrancyCallback.vy",
     compiler_args=compiler_args_default,
 )
-LEVERAGE_ZAP_LENDING_DEPLOYER = boa.load_partial(
+LEVERAGE_ZAP_LENDING_DEPLOYER = _Deferred(
     ZAPS_CONTRACT_PATH / "LeverageZapLend.vy",
     compiler_args=compiler_args_codesize,
 )
-LEVERAGE_ZAP_MINT_DEPLOYER = boa.load_partial(
+LEVERAGE_ZAP_MINT_DEPLOYER = _Deferred(
     ZAPS_CONTRACT_PATH / "LeverageZapMint.vy",
     compiler_args=compiler_args_codesize,
 )
 
-DUMMY_ROUTER_DEPLOYER = boa.load_partial(
+DUMMY_ROUTER_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "DummyRouter.vy",
 )
 
-DUMMY_FLASH_BORROWER_DEPLOYER = boa.load_partial(
+DUMMY_FLASH_BORROWER_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "DummyFlashBorrower.vy", compiler_args=compiler_args_default
 )
-DUMMY_LM_CALLBACK_DEPLOYER = boa.load_partial(
+DUMMY_LM_CALLBACK_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "DummyLMCallback.vy", compiler_args=compiler_args_default
 )
-LM_CALLBACK_WITH_REVERTS_DEPLOYER = boa.load_partial(
+LM_CALLBACK_WITH_REVERTS_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "LMCallbackWithReverts.vy",
     compiler_args=compiler_args_default,
 )
-MOCK_FACTORY_DEPLOYER = boa.load_partial(
+MOCK_FACTORY_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "MockFactory.vy", compiler_args=compiler_args_default
 )
-MOCK_MARKET_DEPLOYER = boa.load_partial(
+MOCK_MARKET_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "MockMarket.vy", compiler_args=compiler_args_default
 )
-MOCK_RATE_SETTER_DEPLOYER = boa.load_partial(
+MOCK_RATE_SETTER_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "MockRateSetter.vy", compiler_args=compiler_args_default
 )
-MOCK_RATE_CALCULATOR_DEPLOYER = boa.load_partial(
+MOCK_RATE_CALCULATOR_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "MockRateCalculator.vy", compiler_args=compiler_args_default
 )
-MOCK_CONTROLLER_MP_DEPLOYER = boa.load_partial(
+MOCK_CONTROLLER_MP_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "MockControllerMP.vy", compiler_args=compiler_args_default
 )
-MOCK_PEG_KEEPER_DEPLOYER = boa.load_partial(
+MOCK_PEG_KEEPER_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "MockPegKeeper.vy", compiler_args=compiler_args_default
 )
-MOCK_RATE_ORACLE_DEPLOYER = boa.load_partial(
+MOCK_RATE_ORACLE_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "MockRateOracle.vy", compiler_args=compiler_args_default
 )
-CHAINLINK_AGGREGATOR_MOCK_DEPLOYER = boa.load_partial(
+CHAINLINK_AGGREGATOR_MOCK_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "ChainlinkAggregatorMock.vy",
     compiler_args=compiler_args_default,
 )
-TRICRYPTO_MOCK_DEPLOYER = boa.load_partial(
+TRICRYPTO_MOCK_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "TricryptoMock.vy", compiler_args=compiler_args_default
 )
-MOCK_SWAP2_DEPLOYER = boa.load_partial(
+MOCK_SWAP2_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "MockSwap2.vy", compiler_args=compiler_args_default
 )
-MOCK_SWAP3_DEPLOYER = boa.load_partial(
+MOCK_SWAP3_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "MockSwap3.vy", compiler_args=compiler_args_default
 )
-SWAP_FACTORY_DEPLOYER = boa.load_partial(
+SWAP_FACTORY_DEPLOYER = _Deferred(
     TESTING_CONTRACT_PATH / "SwapFactory.vy", compiler_args=compiler_args_default
 )
 
 # LP oracle testing contracts
-MOCK_STABLE_SWAP_DEPLOYER = boa.load_partial(
+MOCK_STABLE_SWAP_DEPLOYER = _Deferred(
     PRICE_ORACLES_CONTRACT_PATH / "lp-oracles" / "testing" / "MockStableSwap.vy",
     compiler_args=compiler_args_default,
 )
-MOCK_CRYPTO_SWAP_DEPLOYER = boa.load_partial(
+MOCK_CRYPTO_SWAP_DEPLOYER = _Deferred(
     PRICE_ORACLES_CONTRACT_PATH / "lp-oracles" / "testing" / "MockCryptoSwap.vy",
     compiler_args=compiler_args_default,
 )
-MOCK_STABLE_SWAP_NO_ARGUMENT_DEPLOYER = boa.load_partial(
+MOCK_STABLE_SWAP_NO_ARGUMENT_DEPLOYER = _Deferred(
     PRICE_ORACLES_CONTRACT_PATH
     / "lp-oracles"
     / "testing"
@@ -344,19 +491,41 @@ MOCK_STABLE_SWAP_NO_ARGUMENT_DEPLOYER = boa.load_partial(
 
 # Stableswap NG contracts
 # TODO will fix
-# CURVE_STABLESWAP_FACTORY_NG_DEPLOYER = boa.load_partial(
+# CURVE_STABLESWAP_FACTORY_NG_DEPLOYER = _Deferred(
 #     STABLESWAP_NG_PATH + "CurveStableSwapFactoryNG.vy",
 #     compiler_args=compiler_args_default,
 # )
 # CurveStableSwapNG.vy has #pragma optimize codesize
-# CURVE_STABLESWAP_NG_DEPLOYER = boa.load_partial(
+# CURVE_STABLESWAP_NG_DEPLOYER = _Deferred(
 #     STABLESWAP_NG_PATH + "CurveStableSwapNG.vy", compiler_args=compiler_args_codesize
 # )
 # # CurveStableSwapNGMath.vy has #pragma optimize gas
-# CURVE_STABLESWAP_NG_MATH_DEPLOYER = boa.load_partial(
+# CURVE_STABLESWAP_NG_MATH_DEPLOYER = _Deferred(
 #     STABLESWAP_NG_PATH + "CurveStableSwapNGMath.vy", compiler_args=compiler_args_gas
 # )
-# CURVE_STABLESWAP_NG_VIEWS_DEPLOYER = boa.load_partial(
+# CURVE_STABLESWAP_NG_VIEWS_DEPLOYER = _Deferred(
 #     STABLESWAP_NG_PATH + "CurveStableSwapNGViews.vy",
 #     compiler_args=compiler_args_default,
 # )
+
+
+# Move the deferred deployers out of the module namespace, so that the first
+# access to each of them goes through __getattr__ and compiles it
+_DEFERRED = {
+    name: value for name, value in globals().items() if isinstance(value, _Deferred)
+}
+for _name in _DEFERRED:
+    del globals()[_name]
+
+
+def __getattr__(name: str):
+    if name not in _DEFERRED:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    deferred = _DEFERRED[name]
+    deployer = load_partial(deferred.path, compiler_args=deferred.compiler_args)
+    globals()[name] = deployer
+    return deployer
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_DEFERRED))
@@ -37,6 +37,8 @@ from tests.utils.deployers import (
     ERC20_MOCK_DEPLOYER,
     # Compiler flags
     compiler_args_codesize,
+    BASE_CONTRACT_PATH,
+    loads_partial,
 )
 
 
@@ -61,22 +63,28 @@ class Llamalend:
     Handles deployment of core infrastructure and creation of markets.
     """
 
-    def __init__(self, initial_price: int = 3000 * 10**18):
+    def __init__(
+        self,
+        initial_price: int = 3000 * 10**18,
+        amm_deployer: VyperDeployer = AMM_DEPLOYER,
+    ):
         """
         Deploy the complete llamalend protocol suite.
 
         Args:
             admin: Admin address for all contracts
             initial_price: Initial price for oracles (e.g., 3000 * 10**18)
+            amm_deployer: AMM implementation for all markets (e.g., AMM_PACKED_DEPLOYER)
         """
+        self._amm_deployer = amm_deployer
         self.admin = boa.env.generate_address("admin")
         self.fee_receiver = boa.env.generate_address("fee_receiver")
         self.configurator = CONFIGURATOR_DEPLOYER.deploy(self.admin)
 
         controller_view_blueprint = CONTROLLER_VIEW_DEPLOYER.deploy_as_blueprint()
 
-        with open("curve_stablecoin/MintController.vy", "r") as f:
-            mint_controller_code = f.read()
+        mint_controller_path = BASE_CONTRACT_PATH / "MintController.vy"
+        mint_controller_code = mint_controller_path.read_text()
         mint_controller_code = mint_controller_code.replace(
             "empty(address),  # to replace at deployment with view blueprint",
             f"{controller_view_blueprint.address},",
@@ -97,13 +105,15 @@ class Llamalend:
         # the constructor arguments of the MintController contract, we have to
         # manually patch the code to insert the correct address of the controller view
         # which is only known at runtime.
-        self._mint_controller_deployer = boa.loads_partial(
-            mint_controller_code, compiler_args=compiler_args_codesize
+        self._mint_controller_deployer = loads_partial(
+            mint_controller_code,
+            mint_controller_path,
+            compiler_args=compiler_args_codesize,
         )
 
         # Deploy all blueprints
         self.blueprints = Blueprints(
-            amm=AMM_DEPLOYER,
+            amm=amm_deployer,
             mint_controller=self._mint_controller_deployer,
             mint_controller_view=CONTROLLER_VIEW_DEPLOYER,
             lend_controller=LEND_CONTROLLER_DEPLOYER,
@@ -203,7 +213,7 @@ class Llamalend:
         amm_address = self.mint_factory.get_amm(collateral_token.address)
 
         controller = self._mint_controller_deployer.at(controller_address)
-        amm = AMM_DEPLOYER.at(amm_address)
+        amm = self._amm_deployer.at(amm_address)
 
         return {
             "controller": controller,
@@ -272,7 +282,7 @@ class Llamalend:
 
         vault = VAULT_DEPLOYER.at(result[0])
         controller = LEND_CONTROLLER_DEPLOYER.at(result[1])
-        amm = AMM_DEPLOYER.at(result[2])
+        amm = self._amm_deployer.at(result[2])
 
         # Seed lending markets by depositing borrowed token into the vault
         if seed_amount and seed_amount > 0: